@@ -61,6 +61,9 @@ def init_neon_database():
                         DEFAULT (REPLACE(gen_random_uuid()::text, '-', '')),
             "userId"    CHAR(32) NOT NULL,
             "corpusKey" VARCHAR(100) NOT NULL,
+            "embeddingModel"     VARCHAR(100) NOT NULL DEFAULT 'bge-small-en-v1.5',
+            "embeddingDimension" INT NOT NULL DEFAULT 384,
+            "vectorStorage"      VARCHAR(20) NOT NULL DEFAULT 'full',
             "createdAt" TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
             "updatedAt" TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
         );
@@ -90,13 +93,62 @@ def init_neon_database():
             "documentId"    CHAR(32) NOT NULL,
             "chunkIndex"    INT NOT NULL,
             "chunkText"     TEXT NOT NULL,
-            "embeddingData" vector(1024),
+            "embeddingData" vector(384),
+            "embeddingVoyage3Large" vector(1024),
+            "embeddingHalf" halfvec(384),
+            "embeddingVoyage3LargeHalf" halfvec(1024),
+            "embeddingModel"     VARCHAR(100) DEFAULT 'bge-small-en-v1.5',
+            "embeddingDimension" INT DEFAULT 384,
             "metaData"      JSONB,
             "createdAt"     TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
             "updatedAt"     TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
         );
         """)
         
+        # Add embedding space columns to databases created before they existed
+        logger.info("Migrating embedding space columns...")
+        cur.execute("""
+        ALTER TABLE "Corpora"
+            ADD COLUMN IF NOT EXISTS "embeddingModel" VARCHAR(100) NOT NULL DEFAULT 'bge-small-en-v1.5',
+            ADD COLUMN IF NOT EXISTS "embeddingDimension" INT NOT NULL DEFAULT 384,
+            ADD COLUMN IF NOT EXISTS "vectorStorage" VARCHAR(20) NOT NULL DEFAULT 'full';
+        """)
+        cur.execute("""
+        ALTER TABLE "DocumentChunks"
+            ADD COLUMN IF NOT EXISTS "embeddingVoyage3Large" vector(1024),
+            ADD COLUMN IF NOT EXISTS "embeddingHalf" halfvec(384),
+            ADD COLUMN IF NOT EXISTS "embeddingVoyage3LargeHalf" halfvec(1024),
+            ADD COLUMN IF NOT EXISTS "embeddingModel" VARCHAR(100) DEFAULT 'bge-small-en-v1.5',
+            ADD COLUMN IF NOT EXISTS "embeddingDimension" INT DEFAULT 384;
+        """)
+        
+        # Databases created before the embedding spaces stored voyage-3-large vectors in a
+        # vector(1024) "embeddingData"; move them to their own column and corpora to that
+        # model, then narrow "embeddingData" to bge-small-en-v1.5 (re-embed to switch back)
+        logger.info("Migrating vector(1024) embeddingData to embeddingVoyage3Large...")
+        cur.execute("""
+        DO $$
+        BEGIN
+            IF (SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+                WHERE attrelid = '"DocumentChunks"'::regclass AND attname = 'embeddingData') = 'vector(1024)' THEN
+                UPDATE "DocumentChunks"
+                SET "embeddingVoyage3Large" = COALESCE("embeddingVoyage3Large", "embeddingData"),
+                    "embeddingModel" = 'voyage-3-large',
+                    "embeddingDimension" = 1024
+                WHERE "embeddingData" IS NOT NULL;
+                UPDATE "Corpora" c
+                SET "embeddingModel" = 'voyage-3-large',
+                    "embeddingDimension" = 1024
+                WHERE EXISTS (
+                    SELECT 1 FROM "Documents" d
+                    JOIN "DocumentChunks" dc ON dc."documentId" = d."documentId"
+                    WHERE d."corpusId" = c."corpusId" AND dc."embeddingVoyage3Large" IS NOT NULL
+                );
+                ALTER TABLE "DocumentChunks" ALTER COLUMN "embeddingData" TYPE vector(384) USING NULL;
+            END IF;
+        END $$;
+        """)
+        
         # Create indexes
         logger.info("Creating indexes...")
         cur.execute("""
@@ -105,12 +157,45 @@ def init_neon_database():
         USING hnsw ("embeddingData" vector_cosine_ops);
         """)
         
+        cur.execute("""
+        CREATE INDEX IF NOT EXISTS "DocumentChunks_voyage3large_hnsw_idx"
+        ON "DocumentChunks"
+        USING hnsw ("embeddingVoyage3Large" vector_cosine_ops);
+        """)
+        
+        cur.execute("""
+        CREATE INDEX IF NOT EXISTS "DocumentChunks_embedding_bq_hnsw_idx"
+        ON "DocumentChunks"
+        USING hnsw ((binary_quantize("embeddingHalf")::bit(384)) bit_hamming_ops);
+        """)
+        
+        cur.execute("""
+        CREATE INDEX IF NOT EXISTS "DocumentChunks_voyage3large_bq_hnsw_idx"
+        ON "DocumentChunks"
+        USING hnsw ((binary_quantize("embeddingVoyage3LargeHalf")::bit(1024)) bit_hamming_ops);
+        """)
+        
         cur.execute("""
         CREATE INDEX IF NOT EXISTS "DocumentChunks_metaData_gin_idx"
         ON "DocumentChunks"
         USING GIN("metaData");
         """)
         
+        cur.execute("""
+        CREATE INDEX IF NOT EXISTS "Documents_createdAt_idx"
+        ON "Documents" ("createdAt", "documentId");
+        """)
+        
+        cur.execute("""
+        CREATE INDEX IF NOT EXISTS "DocumentChunks_createdAt_idx"
+        ON "DocumentChunks" ("createdAt", "chunkId");
+        """)
+        
+        cur.execute("""
+        CREATE INDEX IF NOT EXISTS "DocumentChunks_updatedAt_idx"
+        ON "DocumentChunks" ("updatedAt", "chunkId");
+        """)
+        
         # Verify the setup
         logger.info("Verifying setup...")
         
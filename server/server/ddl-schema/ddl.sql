@@ -22,6 +22,9 @@ CREATE TABLE "Corpora" (
                 DEFAULT (REPLACE(gen_random_uuid()::text, '-', '')),
     "userId"    CHAR(32) NOT NULL,
     "corpusKey" VARCHAR(100) NOT NULL,
+    "embeddingModel"     VARCHAR(100) NOT NULL DEFAULT 'bge-small-en-v1.5',
+    "embeddingDimension" INT NOT NULL DEFAULT 384,
+    "vectorStorage"      VARCHAR(20) NOT NULL DEFAULT 'full',
     "createdAt" TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     "updatedAt" TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
@@ -45,7 +48,12 @@ CREATE TABLE "DocumentChunks" (
     "documentId"    CHAR(32) NOT NULL,
     "chunkIndex"    INT NOT NULL,
     "chunkText"     TEXT NOT NULL,
-    "embeddingData" vector(384),
+    "embeddingData" vector(384),          -- bge-small-en-v1.5 (pgRAG / local)
+    "embeddingVoyage3Large" vector(1024), -- voyage-3-large
+    "embeddingHalf"         halfvec(384),  -- bge-small-en-v1.5, compressed corpora
+    "embeddingVoyage3LargeHalf" halfvec(1024), -- voyage-3-large, compressed corpora
+    "embeddingModel"     VARCHAR(100) DEFAULT 'bge-small-en-v1.5',
+    "embeddingDimension" INT DEFAULT 384,
     "metaData"      JSONB,
     "createdAt"     TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     "updatedAt"     TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
@@ -55,6 +63,31 @@ CREATE INDEX "DocumentChunks_embedding_hnsw_idx"
   ON "DocumentChunks"
   USING hnsw ("embeddingData" vector_cosine_ops);
 
+-- One HNSW index per embedding space (see services/embedding_registry.py)
+CREATE INDEX "DocumentChunks_voyage3large_hnsw_idx"
+  ON "DocumentChunks"
+  USING hnsw ("embeddingVoyage3Large" vector_cosine_ops);
+
+-- Compressed corpora: binary-quantized candidates, rescored with the halfvec
+CREATE INDEX "DocumentChunks_embedding_bq_hnsw_idx"
+  ON "DocumentChunks"
+  USING hnsw ((binary_quantize("embeddingHalf")::bit(384)) bit_hamming_ops);
+
+CREATE INDEX "DocumentChunks_voyage3large_bq_hnsw_idx"
+  ON "DocumentChunks"
+  USING hnsw ((binary_quantize("embeddingVoyage3LargeHalf")::bit(1024)) bit_hamming_ops);
+
 CREATE INDEX "DocumentChunks_metaData_gin_idx"
   ON "DocumentChunks"
   USING GIN("metaData");
+
+-- Keyset pagination ordered by createdAt (models/pagination.py)
+CREATE INDEX "Documents_createdAt_idx"
+  ON "Documents" ("createdAt", "documentId");
+
+CREATE INDEX "DocumentChunks_createdAt_idx"
+  ON "DocumentChunks" ("createdAt", "chunkId");
+
+-- Incremental refresh of the in-process ANN cache (services/ann_cache.py)
+CREATE INDEX "DocumentChunks_updatedAt_idx"
+  ON "DocumentChunks" ("updatedAt", "chunkId");
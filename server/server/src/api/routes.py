@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Form, UploadFile, HTTPException, Header, Depends, Query
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, BackgroundTasks, Form, UploadFile, HTTPException, Header, Depends, Query
+from pydantic import BaseModel, Field
 from services.text_extractor import extract_text
 from services.chunking import chunking
-from services.embedding import get_embedding
+from services.embedding import aget_embedding
 from services.reranker import re_rank
-from typing import List, Optional
+from services.llm_services import llm_gateway
+from services.rerank_cache import rerank_cache
+from services.ann_cache import ann_cache
+from typing import Any, Dict, List, Literal, Optional
+from core.responses import FastJSONResponse, float32_response
+from models.pagination import MAX_PAGE_SIZE, ndjson_lines
+from models.projection import parse_fields
+from models.filters import parse_filter
 import json
 import time
 from datetime import datetime
@@ -15,7 +23,8 @@ from controllers.users import (
 )
 
 from controllers.corpora import (
-    get_corpuses_data, get_corpus_data, create_corpus_data, update_corpus_data, delete_corpus_data
+    get_corpuses_data, get_corpus_data, create_corpus_data, update_corpus_data, delete_corpus_data,
+    start_corpus_reembedding, get_corpus_reembedding_status, set_corpus_vector_storage
 )
 
 from controllers.documents import (
@@ -23,7 +32,8 @@ from controllers.documents import (
 )
 
 from controllers.document_chunk import (
-    get_documents_chunks, get_document_chunk, update_document_chunk, create_document_chunk, delete_document_chunk, search_document_chunk
+    get_documents_chunks, get_document_chunk, update_document_chunk, create_document_chunk, delete_document_chunk,
+    search_document_chunk, search_document_chunks_batch, retrieve_document_chunks
 )
 
 from services.process_document import process_document
@@ -32,7 +42,7 @@ from controllers.auth import register_user_controller, login_user_controller
 
 
 
-router = APIRouter()
+router = APIRouter(default_response_class=FastJSONResponse)
 
 
 class ChunkingRequest(BaseModel):
@@ -45,6 +55,7 @@ class ChunkingRequest(BaseModel):
 class EmbeddingRequest(BaseModel):
     model: str
     texts: List[str]
+    response_format: Literal["json", "float32"] = "json"
 
 class CreateUserRequest(BaseModel):
     username: str
@@ -59,6 +70,14 @@ class UpdateUserRequest(BaseModel):
 class CreateCorporaRequest(BaseModel):
     userId: str
     corpusKey: str
+    embeddingModel: Optional[str] = None
+    vectorStorage: Optional[str] = None
+
+class ReembedCorpusRequest(BaseModel):
+    embeddingModel: str
+
+class CorpusStorageRequest(BaseModel):
+    vectorStorage: str
 
 class UpdateCorporaRequest(BaseModel):
     userId: Optional[str]
@@ -93,14 +112,51 @@ class CreateChunkRequest(BaseModel):
     chunkIndex: int
     chunkText: str
     embeddingData: str
+    embeddingModel: Optional[str] = None
     metaData: Optional[str] = None
 
 class SearchRequest(BaseModel):
     question: str
     top_k: int = 5
     model: Optional[str] = None
+    corpusKey: Optional[str] = None
+    corpusKeys: Optional[List[str]] = None
+    corpusWeights: Optional[Dict[str, float]] = None
+    corpusQuotas: Optional[Dict[str, int]] = None
+    filter: Optional[Dict[str, Any]] = None
+    mmr: bool = False
+    merge_adjacent: bool = False
+    context_tokens: Optional[int] = Field(None, ge=64, le=100_000)
+    threshold: float = 0.8
+    generate: bool = True
+    rerank: bool = False
+    reranker: Optional[Literal["pgrag", "voyage", "local"]] = None
+    scoring: Optional[Literal["raw", "minmax", "calibrated"]] = None
+
+class RetrieveRequest(BaseModel):
+    question: str
+    top_k: int = 5
+    corpusKey: Optional[str] = None
+    corpusKeys: Optional[List[str]] = None
+    corpusWeights: Optional[Dict[str, float]] = None
+    corpusQuotas: Optional[Dict[str, int]] = None
+    filter: Optional[Dict[str, Any]] = None
+    mmr: bool = False
+    merge_adjacent: bool = False
+    threshold: float = 0.8
+    rerank: bool = False
+    reranker: Optional[Literal["pgrag", "voyage", "local"]] = None
+
+class SearchBatchRequest(BaseModel):
+    questions: List[str]
+    top_k: int = 5
     corpusKey: str
     threshold: float = 0.8
+    retrieve_only: bool = False
+    concurrency: Optional[int] = Field(None, ge=1, le=32)
+    filter: Optional[Dict[str, Any]] = None
+    context_tokens: Optional[int] = Field(None, ge=64, le=100_000)
+    scoring: Optional[Literal["raw", "minmax", "calibrated"]] = None
 
 class ProcessDocumentRequest(BaseModel):
     corpusKey: str
@@ -111,6 +167,7 @@ class RerankRequest(BaseModel):
     documents: List[str]
     model: str = "rerank-2"
     top_k: Optional[int] = 3
+    return_documents: bool = True
 
 class AuthRequest(BaseModel):
     email: str
@@ -125,6 +182,11 @@ def api_validation(X_API_KEY: str = Header(...)):
         raise HTTPException(status_code=401, detail="Invalid API key")
     return True
 
+def _list_response(response, format):
+    if format == "ndjson":
+        return StreamingResponse(ndjson_lines(response["results"]), media_type="application/x-ndjson")
+    return FastJSONResponse(response)
+
 
 @router.get("/health")
 def check_health():
@@ -159,6 +221,14 @@ async def upload_file(file: UploadFile, api_key: str = Depends(api_validation)):
 
 @router.post("/chunking")
 async def chunking_route(data: ChunkingRequest, api_key: str = Depends(api_validation)):
+    """
+    Split text into chunks.
+
+    - **chunk_type**: "manual" (chunk_size words with chunk_overlap), "auto" (LLM) or "structured" (markdown)
+    - **model**: Accepted for compatibility and ignored. Auto-chunking uses the model of the
+      "auto-chunking" LLM route (LLM_ROUTES, default LLM_PROVIDER and LLM_MODEL); the field is no
+      longer required
+    """
     try:
         start_time = time.time()
 
@@ -171,24 +241,36 @@ async def chunking_route(data: ChunkingRequest, api_key: str = Depends(api_valid
         duration = round(end_time - start_time, 4)
         readable_time = datetime.fromtimestamp(start_time).strftime("%Y-%m-%d %H:%M:%S")
 
-        formatted_chunks = [
-            {"chunk_id": i+1, "chunk_text": chunk["content"]}
-            for i, chunk in enumerate(parsed_result)
-        ]
+        formatted_chunks = []
+        for i, chunk in enumerate(parsed_result):
+            formatted_chunk = {"chunk_id": i+1, "chunk_text": chunk["content"]}
+            if chunk.get("metaData"):
+                formatted_chunk["metadata"] = chunk["metaData"]
+            formatted_chunks.append(formatted_chunk)
 
-        return {
+        return FastJSONResponse({
             "results": {"chunks": formatted_chunks, 
                         "stats": {"timestamp": readable_time, "duration": duration}},
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/embedding")
 async def embeddings_route(data: EmbeddingRequest, api_key: str = Depends(api_validation)):
+    """
+    Embed texts.
+
+    - **response_format**: "json" (default), or "float32" for the raw little-endian
+      float32 matrix as application/octet-stream, its shape in the
+      X-Embedding-Count and X-Embedding-Dimension headers
+    """
     try:
         start_time = time.time()
         
-        embeddings = get_embedding(data.model, data.texts)
+        embeddings = await aget_embedding(data.model, data.texts)
+
+        if data.response_format == "float32":
+            return float32_response(embeddings)
 
         end_time = time.time()
         duration = round(end_time - start_time, 4)
@@ -199,10 +281,9 @@ async def embeddings_route(data: EmbeddingRequest, api_key: str = Depends(api_va
             for i, emb in enumerate(embeddings)
         ]
 
-        return {
+        return FastJSONResponse({
             "results": {"embeddings": formatted_embeddings, "stats": {"timestamp": readable_time, "duration": duration}}
-            
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -217,12 +298,20 @@ async def embeddings_route(data: EmbeddingRequest, api_key: str = Depends(api_va
 )
 async def get_users(
     where: str = Query(None, description="JSON string with filter conditions"),
+    fields: str = Query(None, description="Comma separated columns to return"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    after: Optional[str] = Query(None, description="Cursor of the next page (next_after of the previous page)"),
+    order: str = Query("id", pattern="^(id|createdAt)$", description="Page order: primary key or createdAt"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="json, or ndjson to stream every row"),
     api_key: str = Depends(api_validation)
 ):
     """
     Get a list of users with optional filtering.
     
     - **where**: Optional JSON string with filter conditions (e.g., {"username": "john"})
+    - **fields**: Optional comma separated columns to return, "*" for all columns
+    - **limit** / **after** / **order**: Keyset pagination, pass the returned next_after as after to get the next page
+    - **format**: "ndjson" streams the rows as newline delimited JSON with constant memory
     """
     where_conditions = None
     if where:
@@ -233,7 +322,10 @@ async def get_users(
         except json.JSONDecodeError:
             raise HTTPException(status_code=400, detail="Invalid JSON in where parameter")
     
-    return get_users_data(where_conditions)
+    response = get_users_data(
+        where_conditions, parse_fields(fields), limit=limit, after=after, order=order, stream=format == "ndjson"
+    )
+    return _list_response(response, format)
 
 @router.get("/user/{userId}", 
     responses={
@@ -337,6 +429,11 @@ async def delete_user(
 )
 async def get_corpuses(
     where: str = Query(None, description="JSON string with filter conditions"),
+    fields: str = Query(None, description="Comma separated columns to return"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    after: Optional[str] = Query(None, description="Cursor of the next page (next_after of the previous page)"),
+    order: str = Query("id", pattern="^(id|createdAt)$", description="Page order: primary key or createdAt"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="json, or ndjson to stream every row"),
     api_key: str = Depends(api_validation)
 ):
     where_conditions = None
@@ -348,7 +445,10 @@ async def get_corpuses(
         except json.JSONDecodeError:
             raise HTTPException(status_code=400, detail="Invalid JSON in where parameter")
     
-    return get_corpuses_data(where_conditions)
+    response = get_corpuses_data(
+        where_conditions, parse_fields(fields), limit=limit, after=after, order=order, stream=format == "ndjson"
+    )
+    return _list_response(response, format)
 
 @router.get("/corpus/{corpusId}",
     responses={
@@ -388,8 +488,10 @@ async def create_corpus(
     
     - **userId**: The ID of the user who owns this corpus
     - **corpusKey**: A unique key for this corpus
+    - **embeddingModel**: Embedding model of the corpus (optional, defaults to bge-small-en-v1.5)
+    - **vectorStorage**: "full" or "compressed" (optional, defaults to "full")
     """
-    corpus_data_input = request.dict()
+    corpus_data_input = request.dict(exclude_none=True)
     return create_corpus_data(corpus_data_input)
 
 @router.put('/corpus/{corpusId}',
@@ -437,6 +539,71 @@ async def delete_corpus(
     """
     return delete_corpus_data(corpusId)
 
+@router.post('/corpus/{corpusId}/reembed',
+    status_code=202,
+    responses={
+        202: {"description": "Re-embedding job started"},
+        400: {"description": "Unknown model or job already running"},
+        404: {"description": "Corpus not found"},
+        500: {"description": "Internal server error"}
+    }
+)
+async def reembed_corpus(
+    request: ReembedCorpusRequest,
+    corpusId: str,
+    background_tasks: BackgroundTasks,
+    api_key: str = Depends(api_validation)
+):
+    """
+    Move a corpus to another embedding model in the background.
+    Searches keep using the current model until every chunk has been re-embedded.
+
+    - **corpusId**: The unique identifier of the corpus
+    - **embeddingModel**: The target embedding model
+    """
+    return start_corpus_reembedding(corpusId, request.embeddingModel, background_tasks)
+
+@router.get('/corpus/{corpusId}/reembed',
+    responses={
+        200: {"description": "Re-embedding job status"},
+        404: {"description": "No job for this corpus"}
+    }
+)
+async def get_reembed_status(
+    corpusId: str,
+    api_key: str = Depends(api_validation)
+):
+    """
+    Get the status of the last re-embedding job of a corpus.
+
+    - **corpusId**: The unique identifier of the corpus
+    """
+    return get_corpus_reembedding_status(corpusId)
+
+@router.put('/corpus/{corpusId}/storage',
+    responses={
+        200: {"description": "Vector storage updated"},
+        400: {"description": "Unknown vector storage"},
+        404: {"description": "Corpus not found"},
+        409: {"description": "Corpus is being re-embedded"},
+        500: {"description": "Internal server error"}
+    }
+)
+async def update_corpus_storage(
+    request: CorpusStorageRequest,
+    corpusId: str,
+    api_key: str = Depends(api_validation)
+):
+    """
+    Switch a corpus between full and compressed vector storage.
+    Compressed corpora store halfvec vectors and search a binary-quantized index,
+    rescoring an oversampled candidate set with the halfvec vectors.
+
+    - **corpusId**: The unique identifier of the corpus
+    - **vectorStorage**: "full" or "compressed"
+    """
+    return set_corpus_vector_storage(corpusId, request.vectorStorage)
+
 # document routes
 
 
@@ -450,12 +617,20 @@ async def delete_corpus(
 )
 async def get_documents(
     where: str = Query(None, description="JSON string with filter conditions"),
+    fields: str = Query(None, description="Comma separated columns to return"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    after: Optional[str] = Query(None, description="Cursor of the next page (next_after of the previous page)"),
+    order: str = Query("id", pattern="^(id|createdAt)$", description="Page order: primary key or createdAt"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="json, or ndjson to stream every row"),
     api_key: str = Depends(api_validation)
 ):
     """
     Get a list of documents with optional filtering.
     
     - **where**: Optional JSON string with filter conditions (e.g., {"userId":"123","docType":"pdf"})
+    - **fields**: Optional comma separated columns to return, "*" for all columns (fulltext is only returned when listed)
+    - **limit** / **after** / **order**: Keyset pagination, pass the returned next_after as after to get the next page
+    - **format**: "ndjson" streams the rows as newline delimited JSON with constant memory
     """
     where_conditions = None
     if where:
@@ -466,7 +641,10 @@ async def get_documents(
         except json.JSONDecodeError:
             raise HTTPException(status_code=400, detail="Invalid JSON in where parameter")
     
-    return get_documents_data(where_conditions)
+    response = get_documents_data(
+        where_conditions, parse_fields(fields), limit=limit, after=after, order=order, stream=format == "ndjson"
+    )
+    return _list_response(response, format)
 
 @router.get("/document/{document_id}",
     responses={
@@ -573,12 +751,22 @@ async def delete_document(
 )
 async def get_documents_chunks_data(
     where: str = Query(None, description="JSON string with filter conditions"),
+    filter: str = Query(None, description="JSON chunk filter: contains, anyOf, createdAt, docType"),
+    fields: str = Query(None, description="Comma separated columns to return"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    after: Optional[str] = Query(None, description="Cursor of the next page (next_after of the previous page)"),
+    order: str = Query("id", pattern="^(id|createdAt)$", description="Page order: primary key or createdAt"),
+    format: str = Query("json", pattern="^(json|ndjson)$", description="json, or ndjson to stream every row"),
     api_key: str = Depends(api_validation)
 ):
     """
     Get a list of document chunks with optional filtering.
     
     - **where**: Optional JSON string with filter conditions (e.g., {"documentId": "doc123"})
+    - **filter**: Optional JSON chunk filter over metadata, creation time and document type, as in /search
+    - **fields**: Optional comma separated columns to return, "*" for all columns (embeddings are only returned when listed)
+    - **limit** / **after** / **order**: Keyset pagination, pass the returned next_after as after to get the next page
+    - **format**: "ndjson" streams the rows as newline delimited JSON with constant memory
     """
     where_conditions = None
     if where:
@@ -589,7 +777,16 @@ async def get_documents_chunks_data(
         except json.JSONDecodeError:
             raise HTTPException(status_code=400, detail="Invalid JSON in where parameter")
     
-    return get_documents_chunks(where_conditions)
+    try:
+        filters = parse_filter(filter)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    response = get_documents_chunks(
+        where_conditions, parse_fields(fields), limit=limit, after=after, order=order, stream=format == "ndjson",
+        filters=filters
+    )
+    return _list_response(response, format)
 
 @router.get("/chunk/{chunk_id}",
     responses={
@@ -655,6 +852,7 @@ async def create_document_chunk_data(
     - **chunkIndex**: The index of this chunk within the document
     - **chunkText**: The text content of the chunk
     - **embeddingData**: The embedding data (will be generated if not provided)
+    - **embeddingModel**: The model of embeddingData (optional, defaults to the corpus's model)
     - **metaData**: Optional metadata for the chunk
     """
     chunk_input_data = request.dict()
@@ -686,7 +884,7 @@ async def delete_document_chunk_data(
         500: {"description": "Internal server error"}
     }
 )
-async def search_document_chunk_data(
+def search_document_chunk_data(
     request: SearchRequest, 
     api_key: str = Depends(api_validation)
 ):
@@ -696,8 +894,106 @@ async def search_document_chunk_data(
     - **question**: The search query
     - **top_k**: Maximum number of results to return (default: 5)
     - **model**: The embedding model to use (optional)
+    - **corpusKey** / **corpusKeys**: The corpus, or corpora, to search; several corpora are searched
+      in one round trip and merged into a global top_k
+    - **corpusWeights**: Optional weight per corpus key, distances are divided by it (default 1)
+    - **corpusQuotas**: Optional maximum number of chunks per corpus key
+    - **filter**: Optional chunk filter, e.g. {"contains": {"domain_specific": ["Finance"]},
+      "createdAt": {"gte": "2025-01-01"}, "docType": ["pdf"]}; "anyOf" takes a list of metadata objects
+    - **mmr**: Re-select the chunks by maximal marginal relevance among a larger candidate set
+    - **merge_adjacent**: Merge neighbouring chunks of a document into one passage without the overlapping text
+    - **context_tokens**: Token budget of the LLM context (default CONTEXT_TOKEN_BUDGET), the tokens used are in stats
+    - **generate**: false returns the ranked chunks of /retrieve instead of a generated answer
+    - **rerank**: Rerank the chunks even when SEARCH_RERANKER is "none", the default (with generate false, only when set)
+    - **reranker**: The rerank backend, "pgrag" (Jina), "voyage" (rerank-2) or "local" (in-process
+      cross-encoder), default SEARCH_RERANKER, or pgrag;
+      top_k * RERANK_OVERSAMPLE candidates are reranked within RERANK_BUDGET_MS and cut to top_k
+    - **scoring**: How distances become chunk scores, "raw" (1 - cosine distance), "minmax" (ranking
+      distance rescaled within the search) or "calibrated" (logistic curve of the cosine distance), default SEARCH_SCORING;
+      chunks below SEARCH_MIN_SCORE are dropped, keeping at least SEARCH_MIN_CHUNKS
+
+    Declared sync so concurrent searches run in the threadpool and can share
+    batched query embedding calls.
+    """
+    if not request.generate:
+        return FastJSONResponse(retrieve_document_chunks(
+            request.question, request.top_k, request.corpusKey, request.threshold, request.rerank,
+            corpus_keys=request.corpusKeys, weights=request.corpusWeights, quotas=request.corpusQuotas,
+            filters=request.filter, mmr=request.mmr, merge_adjacent_chunks=request.merge_adjacent,
+            reranker=request.reranker
+        ))
+    return FastJSONResponse(search_document_chunk(
+        request.question, request.top_k, request.model, request.corpusKey, request.threshold,
+        corpus_keys=request.corpusKeys, weights=request.corpusWeights, quotas=request.corpusQuotas,
+        filters=request.filter, mmr=request.mmr, merge_adjacent_chunks=request.merge_adjacent,
+        context_tokens=request.context_tokens, rerank=request.rerank, reranker=request.reranker,
+        scoring=request.scoring
+    ))
+
+@router.post("/retrieve",
+    responses={
+        200: {"description": "Retrieval completed successfully"},
+        400: {"description": "Invalid search parameters"},
+        404: {"description": "Corpus not found"},
+        500: {"description": "Internal server error"}
+    }
+)
+def retrieve_document_chunks_data(
+    request: RetrieveRequest,
+    api_key: str = Depends(api_validation)
+):
     """
-    return search_document_chunk(request.question, request.top_k, request.model, request.corpusKey, request.threshold)
+    Retrieve the chunks most relevant to a question, without generating an answer.
+
+    - **question**: The search query
+    - **top_k**: Maximum number of chunks to return (default: 5)
+    - **corpusKey** / **corpusKeys**: The corpus, or corpora, to search
+    - **corpusWeights** / **corpusQuotas**: Optional per corpus weights and chunk quotas, as in /search
+    - **filter**: Optional chunk filter, as in /search
+    - **mmr** / **merge_adjacent**: Optional diversification, as in /search
+    - **rerank**: Rerank the chunks with the rerank stage (default: false)
+    - **reranker**: The rerank backend, "pgrag", "voyage" or "local" (default SEARCH_RERANKER, or pgrag); naming one reranks
+
+    Each chunk comes with its raw cosine distance and, when reranked, its
+    rerank distance; stats holds the duration of each stage.
+    """
+    return FastJSONResponse(retrieve_document_chunks(
+        request.question, request.top_k, request.corpusKey, request.threshold, request.rerank,
+        corpus_keys=request.corpusKeys, weights=request.corpusWeights, quotas=request.corpusQuotas,
+        filters=request.filter, mmr=request.mmr, merge_adjacent_chunks=request.merge_adjacent,
+        reranker=request.reranker
+    ))
+
+@router.post("/search/batch",
+    responses={
+        200: {"description": "Batch search completed successfully"},
+        400: {"description": "Invalid search parameters"},
+        404: {"description": "Corpus not found"},
+        500: {"description": "Internal server error"}
+    }
+)
+def search_document_chunks_batch_data(
+    request: SearchBatchRequest,
+    api_key: str = Depends(api_validation)
+):
+    """
+    Search a corpus for many questions in one call.
+
+    - **questions**: The search queries, embedded together and searched in one SQL statement
+    - **top_k**: Maximum number of chunks per question (default: 5)
+    - **retrieve_only**: Return the ranked chunks without generating answers
+    - **concurrency**: Maximum concurrent LLM calls (optional, defaults to SEARCH_BATCH_LLM_CONCURRENCY)
+    - **filter**: Optional chunk filter, as in /search
+    - **context_tokens**: Token budget of each LLM context, as in /search
+    - **scoring**: The chunk scoring policy, as in /search
+
+    Results come back per question in request order; stats holds the duration of each stage.
+    """
+    return FastJSONResponse(search_document_chunks_batch(
+        request.questions, request.top_k, request.corpusKey, request.threshold,
+        retrieve_only=request.retrieve_only, concurrency=request.concurrency, filters=request.filter,
+        context_tokens=request.context_tokens, scoring=request.scoring
+    ))
 
 @router.post("/process/document")
 async def process_document_data(
@@ -705,6 +1001,8 @@ async def process_document_data(
     url: Optional[str] = Form(None),
     corpus_key: str = Form(...),
     userId: str = Form(...),
+    chunk_type: str = Form("manual"),
+    skip_tagging: bool = Form(False),
     api_key: str = Depends(api_validation)
 ):
     try:
@@ -716,7 +1014,7 @@ async def process_document_data(
             file_bytes = await file.read()
             file_type = file.filename.split(".")[-1]
             file_name = file.filename.split("/")[-1]  # Use full filename for file_name
-            extracted_text = process_document(userId, file_type, file_bytes, corpus_key, file_name)
+            extracted_text = process_document(userId, file_type, file_bytes, corpus_key, file_name, chunk_type, skip_tagging)
             print("Received API call to /process/document")
             print("File:", file)
             print("UserId:", userId)
@@ -725,7 +1023,7 @@ async def process_document_data(
         elif url:
             file_type = "url"
             file_name = url.split("/")[-1]  # Extract file name from the URL
-            extracted_text = process_document(userId, file_type, url, corpus_key, file_name)
+            extracted_text = process_document(userId, file_type, url, corpus_key, file_name, chunk_type, skip_tagging)
 
         return {
             "results": extracted_text["results"],
@@ -736,13 +1034,45 @@ async def process_document_data(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/rerank")
-async def rerank_documents(request: RerankRequest, api_key: str = Depends(api_validation)):
+def rerank_documents(request: RerankRequest, api_key: str = Depends(api_validation)):
+    """
+    Rerank documents against a query with a Voyage rerank model, or with the
+    in-process cross-encoder when model is "local".
+
+    - **top_k**: Number of documents to return (default 3, null for all)
+    - **return_documents**: false returns only each document's index and score,
+      which keeps responses for large document lists small
+
+    Declared sync so the local model's forward pass runs in the threadpool.
+    """
     try:
-        response = re_rank(request.query, request.documents, request.model, request.top_k)
+        response = re_rank(request.query, request.documents, request.model, request.top_k,
+                           request.return_documents)
         return {"results": response}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/rerank/stats")
+def get_rerank_stats(api_key: str = Depends(api_validation)):
+    """
+    Search rerank requests, calls avoided by the score cache and the skip heuristic, and cache hit rate.
+    """
+    return {"results": rerank_cache.stats()}
+
+@router.get("/ann-cache/stats")
+def get_ann_cache_stats(api_key: str = Depends(api_validation)):
+    """
+    In-process ANN indexes of hot corpora: hits, loads, refreshes, evictions and memory per index.
+    """
+    return {"results": ann_cache.stats()}
+
+@router.get("/llm/usage")
+def get_llm_usage(api_key: str = Depends(api_validation)):
+    """
+    LLM calls, failures, retries, hedges, tokens and latency per caller since startup.
+    """
+    return {"results": llm_gateway.usage()}
+
 @router.post("/auth/register", status_code=201)
 async def register_user(request: RegisterRequest, api_key: str = Depends(api_validation)):
     """
@@ -0,0 +1,256 @@
+"""
+Chunking micro-benchmark and regression check.
+
+Runs every chunking strategy (word split, structured markdown, pgRAG, LLM)
+over a fixed set of generated documents and reports throughput, peak Python
+memory, chunk count and chunk size distribution. Each run is compared against
+a baseline (benchmarks/baselines/chunking.json by default) and exits with 1 on
+a regression.
+
+The committed baseline covers the words and structured strategies, which need
+neither a database nor an LLM. Their chunk counts are deterministic. Throughput
+and memory depend on the machine that recorded them, so before comparing
+timings, re-record the baseline on your machine from the commit you compare
+against, with --save-baseline.
+
+Run from server/server/src:
+
+    python -m benchmarks.chunking_benchmark
+    python -m benchmarks.chunking_benchmark --strategies words --save-baseline
+    python -m benchmarks.chunking_benchmark --sizes 10KB,1MB --repeat 5
+
+The "pgrag" strategy needs DATABASE_URL. The "auto" strategy uses the auto-chunking
+LLM route; LLM_ROUTES=auto-chunking=local runs it on the local stand-in backend.
+The LLM strategy is limited to small documents by default (see --max-llm-size).
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+DEFAULT_SIZES = ["10KB", "100KB", "1MB", "10MB", "50MB"]
+DEFAULT_STRATEGIES = ["words", "structured", "pgrag", "auto"]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "chunking.json")
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+SEED = 1337
+
+_VOCABULARY = (
+    "retrieval augmented generation document corpus vector embedding index query "
+    "latency throughput postgres neon chunk overlap token passage rerank model "
+    "search context answer question metadata section table heading paragraph "
+    "the a of and to in is that for on with as by this are be from at or an"
+).split()
+
+_UNITS = {"KB": 1024, "MB": 1024 * 1024}
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().upper()
+    for suffix, factor in _UNITS.items():
+        if value.endswith(suffix):
+            return int(float(value[:-len(suffix)]) * factor)
+    return int(value)
+
+
+def generate_document(size_bytes: int, seed: int = SEED) -> str:
+    """
+    Builds a deterministic pseudo-text document of roughly size_bytes bytes,
+    made of sentences grouped into paragraphs, so runs are comparable.
+    """
+    rng = random.Random(seed + size_bytes)
+    paragraphs = []
+    total = 0
+    while total < size_bytes:
+        count = len(paragraphs)
+        # Sprinkle markdown headings and tables like pymupdf4llm output
+        roll = rng.random()
+        if roll < 0.15:
+            level = rng.randint(1, 3)
+            paragraphs.append("#" * level + " " + " ".join(rng.choices(_VOCABULARY, k=4)).title())
+        elif roll < 0.2:
+            rows = ["| name | value | note |", "|---|---|---|"]
+            for _ in range(rng.randint(3, 12)):
+                rows.append("| " + " | ".join(rng.choices(_VOCABULARY, k=3)) + " |")
+            paragraphs.append("\n".join(rows))
+        sentences = []
+        for _ in range(rng.randint(3, 8)):
+            words = rng.choices(_VOCABULARY, k=rng.randint(6, 24))
+            sentences.append(" ".join(words).capitalize() + ".")
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        total += sum(len(p) + 2 for p in paragraphs[count:])
+    return "\n\n".join(paragraphs)[:size_bytes]
+
+
+def _run_words(text):
+    from services.chunking import chunk_by_words
+    return chunk_by_words(text, CHUNK_SIZE, CHUNK_OVERLAP)
+
+
+def _run_structured(text):
+    from services.chunking import chunk_by_structure
+    return [chunk["content"] for chunk in chunk_by_structure(text, CHUNK_SIZE, CHUNK_OVERLAP)]
+
+
+def _run_pgrag(text):
+    from core.db import settings
+    from services.chunking import chunk_with_pgrag
+    conn = settings.get_db_connection()
+    try:
+        return chunk_with_pgrag(conn.cursor(), text, CHUNK_SIZE, CHUNK_OVERLAP)
+    finally:
+        conn.close()
+
+
+def _run_auto(text):
+    from services.chunking import chunk_with_llm
+    return [chunk["content"] for chunk in chunk_with_llm(text)]
+
+
+STRATEGIES = {
+    "words": _run_words,
+    "structured": _run_structured,
+    "pgrag": _run_pgrag,
+    "auto": _run_auto,
+}
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(strategy: str, text: str, repeat: int) -> dict:
+    """
+    Times the strategy over `repeat` runs (best run wins), then does one extra
+    run under tracemalloc to capture peak memory without skewing the timings.
+    """
+    run = STRATEGIES[strategy]
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+
+    timings = []
+    chunks = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        chunks = run(text)
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    run(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(timings)
+    lengths = sorted(len(chunk) for chunk in chunks)
+    return {
+        "seconds": round(best, 6),
+        "throughput_mb_s": round(size_mb / best, 3) if best > 0 else None,
+        "peak_memory_mb": round(peak / (1024 * 1024), 3),
+        "chunk_count": len(chunks),
+        "chunk_size": {
+            "min": lengths[0] if lengths else 0,
+            "p50": _percentile(lengths, 50),
+            "p95": _percentile(lengths, 95),
+            "max": lengths[-1] if lengths else 0,
+            "mean": round(statistics.fmean(lengths), 1) if lengths else 0,
+        },
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Returns a list of human readable regressions: throughput dropping or peak
+    memory growing by more than `tolerance`, or the chunk count changing.
+    """
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous or "error" in current or "error" in previous:
+            continue
+        old_tp, new_tp = previous.get("throughput_mb_s"), current.get("throughput_mb_s")
+        if old_tp and new_tp and new_tp < old_tp * (1 - tolerance):
+            regressions.append(f"{key}: throughput {new_tp} MB/s < baseline {old_tp} MB/s")
+        old_mem, new_mem = previous.get("peak_memory_mb"), current.get("peak_memory_mb")
+        if old_mem and new_mem and new_mem > old_mem * (1 + tolerance):
+            regressions.append(f"{key}: peak memory {new_mem} MB > baseline {old_mem} MB")
+        if previous.get("chunk_count") != current.get("chunk_count"):
+            regressions.append(
+                f"{key}: chunk count {current.get('chunk_count')} != baseline {previous.get('chunk_count')}"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the chunking strategies.")
+    parser.add_argument("--sizes", default=",".join(DEFAULT_SIZES), help="Comma separated document sizes")
+    parser.add_argument("--strategies", default=",".join(DEFAULT_STRATEGIES), help="Comma separated strategies")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (best is kept)")
+    parser.add_argument("--max-llm-size", default="100KB", help="Largest document sent to the LLM strategy")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    strategies = [s.strip() for s in args.strategies.split(",") if s.strip()]
+    unknown = [s for s in strategies if s not in STRATEGIES]
+    if unknown:
+        parser.error(f"Unknown strategies: {', '.join(unknown)}")
+    max_llm_bytes = parse_size(args.max_llm_size)
+
+    results = {}
+    for size in sizes:
+        text = generate_document(parse_size(size))
+        for strategy in strategies:
+            key = f"{strategy}/{size}"
+            if strategy == "auto" and len(text) > max_llm_bytes:
+                continue
+            try:
+                results[key] = measure(strategy, text, 1 if strategy == "auto" else args.repeat)
+            except Exception as e:
+                results[key] = {"error": str(e)}
+            row = results[key]
+            if "error" in row:
+                print(f"{key:<16} ERROR {row['error']}")
+            else:
+                dist = row["chunk_size"]
+                print(
+                    f"{key:<16} {row['throughput_mb_s']:>10} MB/s  peak {row['peak_memory_mb']:>9} MB  "
+                    f"chunks {row['chunk_count']:>7}  size min/p50/p95/max "
+                    f"{dist['min']}/{dist['p50']}/{dist['p95']}/{dist['max']}"
+                )
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found, run with --save-baseline to create one")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print("No regressions against baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
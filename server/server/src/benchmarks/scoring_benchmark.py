@@ -0,0 +1,120 @@
+"""
+Search post-processing benchmark: the scoring and filtering of the found
+chunks before the LLM call (controllers/document_chunk._rank_chunks).
+
+"legacy" is the former per-chunk loop, with its INFO line per chunk written to
+a discarded stream; the others are services/scoring.ScoredChunks with each
+scoring policy. The minmax results are checked against the legacy ones.
+
+Run from server/server/src (no database needed):
+
+    python -m benchmarks.scoring_benchmark
+    python -m benchmarks.scoring_benchmark --top-k 10 50 200 --repeat 2000
+"""
+import argparse
+import io
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+
+from models.document_chunk import DocumentChunk
+from services.scoring import SCORING_POLICIES, ScoredChunks
+
+SEED = 1337
+
+legacy_logger = logging.getLogger("benchmarks.scoring_benchmark.legacy")
+legacy_logger.setLevel(logging.INFO)
+legacy_logger.addHandler(logging.StreamHandler(io.StringIO()))
+legacy_logger.propagate = False
+
+
+def legacy_rank_chunks(chunks):
+    chunk_data = []
+    rerank_scores = []
+    for chunk in chunks:
+        if hasattr(chunk, "chunkText") and hasattr(chunk, "rerankScore"):
+            rerank_scores.append(getattr(chunk, "rerankScore"))
+    min_score = min(rerank_scores) if rerank_scores else 0
+    max_score = max(rerank_scores) if rerank_scores else 1
+    score_range = max_score - min_score if max_score > min_score else 1
+    for chunk in chunks:
+        if hasattr(chunk, "chunkText"):
+            rerank_score = getattr(chunk, "rerankScore", 0.5)
+            if score_range < 0.001:
+                position_index = len(chunk_data)
+                normalized_score = max(0.1, 1.0 - (position_index * 0.1))
+                legacy_logger.info(f"Using position-based score: {normalized_score} for position {position_index}")
+            else:
+                normalized_score = max(0.1, min(0.95, 1 - ((rerank_score - min_score) / score_range)))
+                legacy_logger.info(f"Normalized score: {normalized_score} from rerank_score: {rerank_score} "
+                                   f"(min: {min_score}, max: {max_score})")
+            chunk_data.append((chunk.chunkText, normalized_score))
+    if not chunk_data:
+        return []
+    sorted_chunk_data = sorted(chunk_data, key=lambda x: x[1], reverse=True)
+    filtered_chunk_data = [chunk for chunk in sorted_chunk_data if chunk[1] >= 0.5]
+    if len(filtered_chunk_data) < 3 and len(sorted_chunk_data) > 0:
+        filtered_chunk_data = sorted_chunk_data[:min(3, len(sorted_chunk_data))]
+    legacy_logger.info(f"Filtered from {len(sorted_chunk_data)} to {len(filtered_chunk_data)} chunks based on relevance")
+    return [(i + 1, chunk_text, similarity) for i, (chunk_text, similarity) in enumerate(filtered_chunk_data)]
+
+
+def make_chunks(count: int):
+    rand = random.Random(SEED + count)
+    distances = sorted(rand.uniform(0.15, 0.6) for _ in range(count))
+    return [
+        DocumentChunk(chunkId=f"chunk-{i}", documentId=f"doc-{i // 8}", chunkText=f"chunk text {i}",
+                      rerankScore=distance, distance=distance)
+        for i, distance in enumerate(distances)
+    ]
+
+
+def time_us(fn, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark search result scoring and filtering.")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[5, 20, 50, 200], help="Chunks per search")
+    parser.add_argument("--repeat", type=int, default=1000, help="Runs per case, the median is reported")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for top_k in args.top_k:
+        chunks = make_chunks(top_k)
+        expected = legacy_rank_chunks(chunks)
+        actual = ScoredChunks.from_chunks(chunks, "minmax").filter(0.5, 3).tuples()
+        if [(i, text) for i, text, _ in expected] != [(i, text) for i, text, _ in actual] or \
+                any(abs(a[2] - b[2]) > 1e-9 for a, b in zip(expected, actual)):
+            print(f"minmax results differ from the legacy ones at top_k={top_k}", file=sys.stderr)
+            return 1
+
+        row = {"top_k": top_k, "legacy_us": round(time_us(lambda: legacy_rank_chunks(chunks), args.repeat), 1)}
+        for policy in SCORING_POLICIES:
+            row[f"{policy}_us"] = round(time_us(
+                lambda: ScoredChunks.from_chunks(chunks, policy).filter(0.5, 3).tuples(), args.repeat
+            ), 1)
+        results.append(row)
+
+    columns = ["legacy"] + list(SCORING_POLICIES)
+    print(f"{'top_k':>6} " + " ".join(f"{column + ' us':>14}" for column in columns))
+    for row in results:
+        print(f"{row['top_k']:>6} " + " ".join(f"{row[column + '_us']:>14}" for column in columns))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"repeat": args.repeat, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Response serialization benchmark: FastAPI's default JSON rendering against
+orjson (core/responses.py) and the binary float32 /embedding format.
+
+For an /embedding payload and a /chunks listing it reports the time to turn
+the route's return value into bytes and the size of those bytes raw, gzipped
+(what GZipMiddleware sends) and brotli compressed (when brotli is installed).
+
+Run from server/server/src (no database needed):
+
+    python -m benchmarks.serialization_benchmark
+    python -m benchmarks.serialization_benchmark --texts 256 --dimension 1024 --rows 5000
+
+"default" is jsonable_encoder followed by JSONResponse.render, which is what a
+route returning a dict costs without core/responses.FastJSONResponse.
+"""
+import argparse
+import gzip
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from core.responses import FastJSONResponse, float32_response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SEED = 1337
+WORDS = ("neon", "vector", "search", "corpus", "chunk", "document", "embedding", "index",
+         "query", "latency", "retrieval", "context", "answer", "model", "table", "page")
+
+
+def embedding_payload(texts: int, dimension: int):
+    rng = np.random.default_rng(SEED)
+    vectors = rng.standard_normal((texts, dimension))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    # providers return python floats, as the route receives them
+    embeddings = vectors.tolist()
+    content = {"results": {
+        "embeddings": [{"embedding_id": i + 1, "embedding_value": emb} for i, emb in enumerate(embeddings)],
+        "stats": {"timestamp": "2025-01-01 00:00:00", "duration": 0.1234},
+    }}
+    return content, embeddings
+
+
+def chunks_payload(rows: int, chunk_words: int):
+    rand = random.Random(SEED)
+    created = datetime(2025, 1, 1)
+    results = [
+        {
+            "chunkId": f"{i:08d}-4b1e-4c2a-9f00-{rand.getrandbits(48):012x}",
+            "documentId": f"doc-{i // 40}",
+            "chunkIndex": i % 40,
+            "chunkText": " ".join(rand.choice(WORDS) for _ in range(chunk_words)),
+            "embeddingModel": "bge-small-en-v1.5",
+            "embeddingDimension": 384,
+            "metaData": {"page": i % 40, "tags": ["benchmark"]},
+            "createdAt": created + timedelta(seconds=i),
+            "updatedAt": created + timedelta(seconds=i),
+        }
+        for i in range(rows)
+    ]
+    return {"results": results}
+
+
+def default_render(content) -> bytes:
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def orjson_render(content) -> bytes:
+    return FastJSONResponse(content).body
+
+
+def time_ms(fn, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), body
+
+
+def measure(name: str, fn, repeat: int):
+    ms, body = time_ms(fn, repeat)
+    return {
+        "case": name,
+        "ms": round(ms, 2),
+        "bytes": len(body),
+        # GZipMiddleware's default level
+        "gzip_bytes": len(gzip.compress(body, compresslevel=9)),
+        "brotli_bytes": len(brotli.compress(body, quality=4)) if brotli is not None else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark response serialization.")
+    parser.add_argument("--texts", type=int, default=128, help="Embeddings in the /embedding payload")
+    parser.add_argument("--dimension", type=int, default=1024, help="Embedding dimension")
+    parser.add_argument("--rows", type=int, default=2000, help="Rows in the /chunks payload")
+    parser.add_argument("--chunk-words", type=int, default=150, help="Words per chunk text")
+    parser.add_argument("--repeat", type=int, default=7, help="Runs per case, the median is reported")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    embedding_content, embeddings = embedding_payload(args.texts, args.dimension)
+    chunks_content = chunks_payload(args.rows, args.chunk_words)
+
+    results = [
+        measure("embedding default", lambda: default_render(embedding_content), args.repeat),
+        measure("embedding orjson", lambda: orjson_render(embedding_content), args.repeat),
+        measure("embedding float32", lambda: float32_response(embeddings).body, args.repeat),
+        measure("chunks default", lambda: default_render(chunks_content), args.repeat),
+        measure("chunks orjson", lambda: orjson_render(chunks_content), args.repeat),
+    ]
+
+    print(f"/embedding: {args.texts} x {args.dimension}, /chunks: {args.rows} rows of {args.chunk_words} words")
+    print(f"{'case':<20} {'ms':>9} {'bytes':>12} {'gzip':>12} {'brotli':>12}")
+    for row in results:
+        brotli_bytes = row["brotli_bytes"] if row["brotli_bytes"] is not None else "-"
+        print(f"{row['case']:<20} {row['ms']:>9} {row['bytes']:>12} {row['gzip_bytes']:>12} {brotli_bytes:>12}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"texts": args.texts, "dimension": args.dimension, "rows": args.rows, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
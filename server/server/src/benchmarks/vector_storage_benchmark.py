@@ -0,0 +1,231 @@
+"""
+Vector storage benchmark: full vector + HNSW against compressed halfvec +
+binary-quantized HNSW with exact rescoring.
+
+Loads the same vectors into two scratch tables (one per layout), builds the
+indexes the DocumentChunks table uses and reports for each layout the index
+and table size, single-connection QPS, p50/p95 latency and recall@k against
+an exact NumPy search.
+
+Run from server/server/src (needs DATABASE_URL and the pgvector extension):
+
+    python -m benchmarks.vector_storage_benchmark
+    python -m benchmarks.vector_storage_benchmark --rows 200000 --oversample 4,10,20
+    python -m benchmarks.vector_storage_benchmark --corpus-id <corpusId>
+
+By default the vectors are synthetic clustered unit vectors; --corpus-id uses
+the bge-small embeddings of an existing corpus instead. Everything is created
+in the schema given by --schema, which is dropped afterwards unless --keep.
+"""
+import argparse
+import io
+import json
+import sys
+import time
+
+import numpy as np
+
+from core.db import settings as db_settings
+
+SEED = 1337
+
+
+def synthetic_vectors(rows: int, dimension: int, clusters: int = 64, seed: int = SEED) -> np.ndarray:
+    """
+    Unit vectors drawn around random cluster centres, which gives neighbourhoods
+    closer to real embeddings than uniform noise does.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, rows)] + 0.6 * rng.standard_normal((rows, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def corpus_vectors(cur, corpus_id: str) -> np.ndarray:
+    cur.execute(
+        """
+        SELECT dc."embeddingData"::text
+        FROM "DocumentChunks" dc
+        JOIN "Documents" d ON d."documentId" = dc."documentId"
+        WHERE d."corpusId" = %s AND dc."embeddingData" IS NOT NULL;
+        """,
+        (corpus_id,)
+    )
+    vectors = np.array([json.loads(row[0]) for row in cur.fetchall()], dtype=np.float32)
+    if not len(vectors):
+        raise ValueError(f"Corpus {corpus_id} has no bge-small embeddings")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_queries(vectors: np.ndarray, count: int, seed: int = SEED) -> np.ndarray:
+    # Perturbed copies of stored vectors, so every query has a dense neighbourhood
+    rng = np.random.default_rng(seed + 1)
+    picked = vectors[rng.integers(0, len(vectors), count)]
+    queries = picked + 0.3 * rng.standard_normal(picked.shape).astype(np.float32) / np.sqrt(vectors.shape[1])
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, top_k: int, block: int = 64) -> np.ndarray:
+    results = []
+    for start in range(0, len(queries), block):
+        scores = queries[start:start + block] @ vectors.T
+        top = np.argpartition(-scores, top_k, axis=1)[:, :top_k]
+        order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+        results.append(np.take_along_axis(top, order, axis=1))
+    return np.vstack(results)
+
+
+def vector_literal(vector) -> str:
+    return "[" + ",".join(f"{x:.6f}" for x in vector) + "]"
+
+
+def load_tables(conn, schema: str, vectors: np.ndarray):
+    dimension = vectors.shape[1]
+    cur = conn.cursor()
+    cur.execute(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE;')
+    cur.execute(f'CREATE SCHEMA "{schema}";')
+    cur.execute(f'CREATE TABLE "{schema}".full_vectors (id INT PRIMARY KEY, embedding vector({dimension}));')
+    cur.execute(f'CREATE TABLE "{schema}".compressed_vectors (id INT PRIMARY KEY, embedding halfvec({dimension}));')
+
+    buffer = io.StringIO()
+    for index, vector in enumerate(vectors):
+        buffer.write(f"{index}\t{vector_literal(vector)}\n")
+    for table in ("full_vectors", "compressed_vectors"):
+        buffer.seek(0)
+        cur.copy_expert(f'COPY "{schema}".{table} (id, embedding) FROM STDIN', buffer)
+    conn.commit()
+
+    timings = {}
+    started = time.perf_counter()
+    cur.execute(f'CREATE INDEX full_hnsw_idx ON "{schema}".full_vectors USING hnsw (embedding vector_cosine_ops);')
+    conn.commit()
+    timings["full"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    cur.execute(
+        f'CREATE INDEX compressed_bq_hnsw_idx ON "{schema}".compressed_vectors '
+        f'USING hnsw ((binary_quantize(embedding)::bit({dimension})) bit_hamming_ops);'
+    )
+    conn.commit()
+    timings["compressed"] = time.perf_counter() - started
+    cur.execute(f'ANALYZE "{schema}".full_vectors; ANALYZE "{schema}".compressed_vectors;')
+    conn.commit()
+    return timings
+
+
+def relation_sizes(cur, schema: str):
+    sizes = {}
+    for layout, table, index in (("full", "full_vectors", "full_hnsw_idx"),
+                                 ("compressed", "compressed_vectors", "compressed_bq_hnsw_idx")):
+        cur.execute(
+            "SELECT pg_relation_size(%s::regclass), pg_table_size(%s::regclass);",
+            (f'"{schema}".{index}', f'"{schema}".{table}')
+        )
+        index_bytes, table_bytes = cur.fetchone()
+        sizes[layout] = {"index_mb": round(index_bytes / 2 ** 20, 2), "table_mb": round(table_bytes / 2 ** 20, 2)}
+    return sizes
+
+
+def run_queries(conn, sql: str, queries: np.ndarray, params, ef_search: int):
+    cur = conn.cursor()
+    cur.execute("SET hnsw.ef_search = %s;", (min(1000, ef_search),))
+    found = []
+    latencies = []
+    for query in queries:
+        literal = vector_literal(query)
+        started = time.perf_counter()
+        cur.execute(sql, params(literal))
+        rows = cur.fetchall()
+        latencies.append(time.perf_counter() - started)
+        found.append([row[0] for row in rows])
+    conn.rollback()
+    return found, latencies
+
+
+def summarise(found, latencies, truth: np.ndarray, top_k: int):
+    recall = np.mean([len(set(ids) & set(expected[:top_k].tolist())) / top_k for ids, expected in zip(found, truth)])
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "qps": round(len(latencies) / sum(latencies), 1),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 2),
+        "recall": round(float(recall), 4),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark full against compressed vector storage.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Number of synthetic vectors")
+    parser.add_argument("--dimension", type=int, default=384, help="Dimension of synthetic vectors")
+    parser.add_argument("--corpus-id", help="Use the embeddings of this corpus instead of synthetic vectors")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries per layout")
+    parser.add_argument("--top-k", type=int, default=10, help="Results per query")
+    parser.add_argument("--ef-search", type=int, default=40, help="hnsw.ef_search of the full layout")
+    parser.add_argument("--oversample", default="10", help="Comma separated candidate multipliers of the compressed layout")
+    parser.add_argument("--schema", default="vector_storage_benchmark", help="Scratch schema")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schema")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    oversample = [int(x) for x in args.oversample.split(",") if x.strip()]
+    conn = db_settings.get_db_connection()
+    try:
+        if args.corpus_id:
+            vectors = corpus_vectors(conn.cursor(), args.corpus_id)
+        else:
+            vectors = synthetic_vectors(args.rows, args.dimension)
+        rows, dimension = vectors.shape
+        queries = make_queries(vectors, args.queries)
+        truth = exact_top_k(vectors, queries, args.top_k)
+        print(f"{rows} vectors of dimension {dimension}, {len(queries)} queries, top_k {args.top_k}")
+
+        build_seconds = load_tables(conn, args.schema, vectors)
+        sizes = relation_sizes(conn.cursor(), args.schema)
+
+        results = {}
+        found, latencies = run_queries(
+            conn,
+            f'SELECT id FROM "{args.schema}".full_vectors ORDER BY embedding <=> %s::vector LIMIT %s;',
+            queries, lambda v: (v, args.top_k), args.ef_search
+        )
+        results["full"] = {**sizes["full"], "build_s": round(build_seconds["full"], 1),
+                           **summarise(found, latencies, truth, args.top_k)}
+
+        for factor in oversample:
+            candidates = args.top_k * factor
+            found, latencies = run_queries(
+                conn,
+                f"""
+                SELECT id FROM (
+                  SELECT id, embedding FROM "{args.schema}".compressed_vectors
+                  ORDER BY binary_quantize(embedding)::bit({dimension}) <~> binary_quantize(%s::halfvec)
+                  LIMIT %s
+                ) candidates
+                ORDER BY embedding <=> %s::halfvec
+                LIMIT %s;
+                """,
+                queries, lambda v: (v, candidates, v, args.top_k), max(40, candidates)
+            )
+            results[f"compressed x{factor}"] = {**sizes["compressed"], "build_s": round(build_seconds["compressed"], 1),
+                                                **summarise(found, latencies, truth, args.top_k)}
+
+        print(f"{'layout':<16} {'index MB':>9} {'table MB':>9} {'build s':>8} {'QPS':>8} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'recall':>7}")
+        for layout, row in results.items():
+            print(f"{layout:<16} {row['index_mb']:>9} {row['table_mb']:>9} {row['build_s']:>8} {row['qps']:>8} "
+                  f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['recall']:>7}")
+
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump({"rows": rows, "dimension": dimension, "top_k": args.top_k, "results": results}, f, indent=2)
+        return 0
+    finally:
+        if not args.keep:
+            conn.rollback()
+            conn.cursor().execute(f'DROP SCHEMA IF EXISTS "{args.schema}" CASCADE;')
+            conn.commit()
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
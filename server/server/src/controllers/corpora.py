@@ -1,17 +1,25 @@
 from models.corpora import CorporaModel
+from models.document_chunk import DocumentChunkModel
+from services.embedding_registry import check_storage, get_space
+from services.reembedding import get_reembedding_status, run_reembedding, start_reembedding
 from fastapi import HTTPException
 import logging
 
 logger = logging.getLogger(__name__)
 
 corpus_data = CorporaModel()
+chunk_data = DocumentChunkModel()
 
-def get_corpuses_data(where_conditions=None):
-    response = corpus_data.get_corpuses(where_conditions)
+def get_corpuses_data(where_conditions=None, fields=None, limit=None, after=None, order="id", stream=False):
+    response = corpus_data.get_corpuses(where_conditions, fields, limit=limit, after=after, order=order, stream=stream)
     
     if "error" in response:
         status_code = response.get("status_code", 500)
         raise HTTPException(status_code=status_code, detail=response["error"])
+
+    # Streamed results are a row generator, consumed by the route
+    if stream:
+        return response
     
     # Ensure response has a "results" key with a list value
     if "results" in response and not isinstance(response["results"], list):
@@ -33,6 +41,19 @@ def get_corpus_data(corpusId):
     return response
 
 def create_corpus_data(corpus_data_input):
+    if corpus_data_input.get("embeddingModel"):
+        try:
+            space = get_space(corpus_data_input["embeddingModel"])
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        corpus_data_input["embeddingDimension"] = space.dimension
+
+    if corpus_data_input.get("vectorStorage"):
+        try:
+            check_storage(corpus_data_input["vectorStorage"])
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     response = corpus_data.create_corpus(corpus_data_input)
     
     if "error" in response:
@@ -69,4 +90,51 @@ def delete_corpus_data(corpusId):
     if "results" in response and not isinstance(response["results"], list):
         response["results"] = [response["results"]] if response["results"] is not None else []
     
-    return response
\ No newline at end of file
+    return response
+
+def start_corpus_reembedding(corpusId, target_model, background_tasks):
+    corpus = get_corpus_data(corpusId)["results"][0]
+    try:
+        if get_space(target_model).name == corpus["embeddingModel"]:
+            raise HTTPException(status_code=400, detail=f"Corpus already uses {corpus['embeddingModel']}")
+        job = start_reembedding(corpusId, target_model)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    background_tasks.add_task(run_reembedding, corpusId, target_model, corpus["vectorStorage"])
+    return {"results": [job]}
+
+def get_corpus_reembedding_status(corpusId):
+    job = get_reembedding_status(corpusId)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"No re-embedding job found for corpus {corpusId}")
+    return {"results": [job]}
+
+def set_corpus_vector_storage(corpusId, storage):
+    corpus = get_corpus_data(corpusId)["results"][0]
+    try:
+        check_storage(storage)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = get_reembedding_status(corpusId)
+    if job and job["status"] == "running":
+        raise HTTPException(status_code=409, detail="Corpus is being re-embedded, try again when the job is done")
+    if storage == corpus["vectorStorage"]:
+        return {"results": [corpus]}
+
+    space = get_space(corpus["embeddingModel"])
+    try:
+        converted = chunk_data.convert_vector_storage(
+            corpusId,
+            from_column=space.storage_column(corpus["vectorStorage"]),
+            to_column=space.storage_column(storage),
+            to_type=space.storage_type(storage),
+            storage=storage
+        )
+    except Exception as e:
+        logger.error(f"Converting corpus {corpusId} to {storage} storage failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to convert vector storage: {str(e)}")
+
+    logger.info(f"Converted {converted} chunks of corpus {corpusId} to {storage} storage")
+    return get_corpus_data(corpusId)
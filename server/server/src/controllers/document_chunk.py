@@ -1,20 +1,37 @@
-from models.document_chunk import DocumentChunkModel
-from services.embedding import get_embedding, get_pgrag_embedding_for_passage, get_pgrag_embedding_for_query
-from services.llm_services import llm_service
+from models.document_chunk import DocumentChunk, DocumentChunkModel
+from models.filters import compile_filter
+from services.embedding_registry import check_storage, embed_in_space, get_space, vector_dimension
+from core.config import settings
+from services.llm_services import LLMTimeoutError, llm_service
 from services.reranker import re_rank
+from services.diversify import merge_adjacent, mmr_select
+from services.rerank_stage import RERANKERS, default_reranker, rerank_candidates
+from services.ann_cache import ann_cache
+from services.scoring import SCORING_POLICIES, ScoredChunks
+from services.context_builder import build_context, count_tokens
 from fastapi import HTTPException
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import time
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
 documents_data = DocumentChunkModel()
 
-def get_documents_chunks(where_conditions=None):
-    response = documents_data.get_document_chunks(where_conditions)
+def get_documents_chunks(where_conditions=None, fields=None, limit=None, after=None, order="id", stream=False,
+                         filters=None):
+    response = documents_data.get_document_chunks(
+        where_conditions, fields, limit=limit, after=after, order=order, stream=stream, filters=filters
+    )
     
     if "error" in response:
         status_code = response.get("status_code", 500)
         raise HTTPException(status_code=status_code, detail=response["error"])
+
+    # Streamed results are a row generator, consumed by the route
+    if stream:
+        return response
     
 
     if "results" in response and not isinstance(response["results"], list):
@@ -49,20 +66,40 @@ def create_document_chunk(chunk_input_data):
         if "documentId" not in chunk_input_data or not chunk_input_data["documentId"]:
             raise HTTPException(status_code=400, detail="Document ID is required")
             
+        # the chunk lives in the embedding space of its corpus
         try:
+            model_name = chunk_input_data.pop("embeddingModel", None)
+            storage = chunk_input_data.pop("vectorStorage", None)
+            if not model_name or not storage:
+                corpus_model, corpus_storage = \
+                    documents_data.get_document_embedding_space(chunk_input_data["documentId"])
+                model_name = model_name or corpus_model
+                storage = storage or corpus_storage
+            space = get_space(model_name)
+            check_storage(storage)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-            if "embeddingData" not in chunk_input_data:
-                # first try with pgRAG
-                try:
-                    chunk_input_data["embeddingData"] = get_pgrag_embedding_for_passage(chunk_input_data["chunkText"])
-                    logger.info("Generated embedding using pgRAG")
-                except Exception as e:
-                    logger.warning(f"pgRAG embedding failed, falling back to Voyage: {e}")
-                    # fallback to Voyage
-                    chunk_input_data["embeddingData"] = get_embedding("voyage-3-large", [chunk_input_data["chunkText"]])[0]
-        except Exception as e:
-            logger.error(f"Failed to generate embedding: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to generate embedding: {str(e)}")
+        if chunk_input_data.get("embeddingData"):
+            embedding = chunk_input_data.pop("embeddingData")
+            if vector_dimension(embedding) != space.dimension:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Embedding must have {space.dimension} dimensions for model {space.name}"
+                )
+        else:
+            chunk_input_data.pop("embeddingData", None)
+            try:
+                embeddings, provider = embed_in_space(space, [chunk_input_data["chunkText"]], "document")
+                embedding = embeddings[0]
+                logger.info(f"Generated {space.name} embedding using {provider}")
+            except Exception as e:
+                logger.error(f"Failed to generate embedding: {e}")
+                raise HTTPException(status_code=500, detail=f"Failed to generate embedding: {str(e)}")
+
+        chunk_input_data[space.storage_column(storage)] = embedding
+        chunk_input_data["embeddingModel"] = space.name
+        chunk_input_data["embeddingDimension"] = space.dimension
         
         response = documents_data.create_document_chunk(chunk_input_data)
         
@@ -110,129 +147,363 @@ def delete_document_chunk(chunk_id):
     
     return {"results": [{"message": "Document chunk deleted successfully"}]}
 
-def search_document_chunk(question, top_k, model, corpus_key, threshold):
+NO_RESULTS = "No relevant information found for your question."
+_EMBEDDING_SOURCES = {"pgrag": "pgRAG", "local": "local", "voyage": "Voyage"}
+
+
+def _get_search_corpus(corpus_key):
+    """
+    Returns the corpus row (corpusId, embeddingModel, vectorStorage) of corpus_key, or None.
+    """
+    corpus = documents_data.get_corpus_by_key(corpus_key)
+    if "error" in corpus:
+        raise HTTPException(status_code=corpus.get("status_code", 500), detail=corpus["error"])
+    return corpus["results"]
+
+
+def _embed_questions(space, questions):
+    try:
+        embeddings, provider = embed_in_space(space, questions, "query")
+    except ValueError as e:
+        logger.error(f"Query embedding failed: {e}")
+        raise HTTPException(status_code=500, detail="All embedding methods failed")
+    if not embeddings or not all(embeddings):
+        raise HTTPException(status_code=500, detail="Failed to generate embedding for the question")
+    return embeddings, _EMBEDDING_SOURCES.get(provider, provider)
+
+
+def _search_options(space, storage, top_k):
+    """
+    The keyword arguments of the chunk search for a corpus's embedding space and storage.
+    """
+    return {
+        "embedding_column": space.storage_column(storage),
+        "vector_type": space.storage_type(storage),
+        "binary_candidates": top_k * settings.COMPRESSED_SEARCH_OVERSAMPLE if storage == "compressed" else 0,
+        "dimension": space.dimension,
+    }
+
+
+def _cached_chunks(corpus_key, corpus, space, question_embedding, top_k, threshold, with_vectors=False):
+    """
+    The top_k chunks of a hot corpus found in its in-process index
+    (services/ann_cache.py), only their text being read from Postgres.
+
+    Returns None when the corpus is not cached (yet) and has to be searched in Postgres.
+    """
+    hits = ann_cache.search(
+        corpus_key, corpus["corpusId"], space.storage_column(corpus["vectorStorage"]), space.dimension,
+        question_embedding, top_k, threshold, with_vectors
+    )
+    if hits is None:
+        return None
+    rows = documents_data.get_chunks_by_ids([chunk_id for chunk_id, _, _ in hits]) if hits else {}
+    # chunks deleted since the index's last refresh are dropped
+    return [
+        DocumentChunk(**rows[chunk_id], rerankScore=distance, distance=distance, corpusId=corpus["corpusId"],
+                      embedding=vector)
+        for chunk_id, distance, vector in hits if chunk_id in rows
+    ]
+
+
+def _check_filters(filters):
+    try:
+        compile_filter(filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _check_scoring(scoring):
+    if scoring and scoring not in SCORING_POLICIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown scoring policy '{scoring}'. Available policies: {', '.join(SCORING_POLICIES)}"
+        )
+
+
+def _corpus_keys(corpus_key=None, corpus_keys=None):
+    keys = list(dict.fromkeys(([corpus_key] if corpus_key else []) + list(corpus_keys or [])))
+    if not keys:
+        raise HTTPException(status_code=400, detail="corpusKey or corpusKeys is required")
+    return keys
+
+
+def _get_search_corpora(corpus_keys):
+    """
+    Resolves corpus keys to their corpus rows in one query. Unknown keys are a 404.
+    """
+    response = documents_data.get_corpora_by_keys(corpus_keys)
+    if "error" in response:
+        raise HTTPException(status_code=response.get("status_code", 500), detail=response["error"])
+    corpora = response["results"]
+    missing = [key for key in corpus_keys if key not in corpora]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Corpora not found: {', '.join(missing)}")
+    return corpora
+
+
+def _federated_chunks(question, corpora, top_k, threshold, weights=None, quotas=None, timings=None, filters=None,
+                      mmr=False, merge=False, reranker=None, rerank_stats=None):
+    """
+    Searches several corpora for a question and merges the hits into one global top_k.
+
+    The question is embedded once per embedding space, and the corpora sharing
+    an embedding space and vector storage are searched in a single statement
+    (several such groups run in parallel). Each corpus returns at most
+    min(top_k, its quota) chunks, which is all the global top_k can take from it.
+    Chunks are ranked by distance / weight of their corpus (weights default to 1,
+    a weight of 2 halves a corpus's distances).
+
+    With a reranker, top_k * RERANK_OVERSAMPLE candidates are reranked by the
+    rerank stage (services/rerank_stage.py), which writes its stats to
+    rerank_stats. With mmr, top_k * SEARCH_MMR_OVERSAMPLE candidates (or the
+    reranked ones) are fetched with their vectors and top_k of them re-selected
+    by maximal marginal relevance. With merge, selected neighbours of the same
+    document are merged into one passage. Reranking runs before diversification,
+    so it cannot undo it.
+
+    Returns (chunks, embedding source, whether they were reranked).
+    """
+    weights = weights or {}
+    quotas = quotas or {}
+    if any(weight <= 0 for weight in weights.values()):
+        raise HTTPException(status_code=400, detail="Corpus weights must be positive")
+    if any(quota < 1 for quota in quotas.values()):
+        raise HTTPException(status_code=400, detail="Corpus quotas must be at least 1")
+
+    groups = {}
+    for key, corpus in corpora.items():
+        groups.setdefault((corpus["embeddingModel"], corpus["vectorStorage"]), []).append(key)
+
+    stage = time.perf_counter()
+    question_embeddings = {}
+    sources = []
+    for model_name in dict.fromkeys(model_name for model_name, _ in groups):
+        embeddings, source = _embed_questions(get_space(model_name), [question])
+        question_embeddings[model_name] = embeddings[0]
+        sources.append(source)
+    if timings is not None:
+        timings["embedding_ms"] = _elapsed_ms(stage)
+
+    candidates = max(
+        top_k * settings.SEARCH_MMR_OVERSAMPLE if mmr else top_k,
+        top_k * settings.RERANK_OVERSAMPLE if reranker else top_k,
+    )
+
+    def search_group(group):
+        (model_name, storage), keys = group
+        space = get_space(model_name)
+        found = []
+        uncached = []
+        for key in keys:
+            # the in-process index cannot apply filters
+            cached = None if filters else _cached_chunks(
+                key, corpora[key], space, question_embeddings[model_name],
+                min(candidates, quotas.get(key, candidates)), threshold, with_vectors=mmr
+            )
+            if cached is None:
+                uncached.append(key)
+            else:
+                found += cached
+        if uncached:
+            limits = [(corpora[key]["corpusId"], min(candidates, quotas.get(key, candidates))) for key in uncached]
+            searched = documents_data.search_document_chunks_multi(
+                question_embeddings[model_name], limits, threshold,
+                filters=filters, with_vectors=mmr, **_search_options(space, storage, candidates)
+            )
+            if isinstance(searched, dict):
+                raise HTTPException(status_code=searched.get("status_code", 500), detail=searched["error"])
+            found += searched
+        return found
+
+    stage = time.perf_counter()
+    if len(groups) == 1:
+        found = [search_group(next(iter(groups.items())))]
+    else:
+        with ThreadPoolExecutor(max_workers=len(groups)) as executor:
+            found = list(executor.map(search_group, groups.items()))
+    if timings is not None:
+        timings["search_ms"] = _elapsed_ms(stage)
+
+    weight_by_corpus = {corpus["corpusId"]: weights.get(key, 1.0) for key, corpus in corpora.items()}
+    chunks = [chunk for group_chunks in found for chunk in group_chunks]
+    for chunk in chunks:
+        chunk.rerankScore = chunk.distance / weight_by_corpus[chunk.corpusId]
+    chunks.sort(key=lambda chunk: chunk.rerankScore)
+    chunks = chunks[:candidates]
+
+    reranked = False
+    if reranker:
+        # with mmr every reranked candidate stays in the running for the MMR selection
+        chunks, reranked = rerank_candidates(
+            question, chunks, len(chunks) if mmr else top_k, reranker, stats=rerank_stats
+        )
+
+    stage = time.perf_counter()
+    if mmr:
+        relevance = np.asarray([-chunk.rerankScore for chunk in chunks], dtype=np.float64)
+        if reranked and len(relevance):
+            # rerank distances are on the reranker's own scale, bring them to 0..1 like cosine similarities
+            spread = relevance.max() - relevance.min()
+            relevance = (relevance - relevance.min()) / spread if spread > 0 else np.ones(len(relevance))
+        else:
+            relevance += 1
+        picked = mmr_select(relevance, [chunk.embedding for chunk in chunks], top_k, settings.SEARCH_MMR_LAMBDA)
+        chunks = [chunks[i] for i in picked]
+        for chunk in chunks:
+            chunk.embedding = None
+    else:
+        chunks = chunks[:top_k]
+    if merge:
+        chunks = merge_adjacent(chunks)
+    if timings is not None and (mmr or merge):
+        timings["diversify_ms"] = _elapsed_ms(stage)
+
+    return chunks, ", ".join(dict.fromkeys(sources)), reranked
+
+
+def _rank_chunks(chunks, scoring=None):
+    """
+    Scores the found chunks by the scoring policy (default SEARCH_SCORING, see
+    services/scoring.py) and keeps those scoring at least SEARCH_MIN_SCORE (at
+    least the best SEARCH_MIN_CHUNKS).
+
+    Returns (index, chunk text, similarity) tuples, best first.
+    """
+    ranked = ScoredChunks.from_chunks(chunks, scoring)
+    kept = ranked.filter()
+    logger.debug(f"Kept {len(kept)} of {len(ranked)} chunks by {scoring or settings.SEARCH_SCORING} score")
+    return kept.tuples()
+
+
+def _generate_answer(question, formatted_chunks, token_budget=None, caller="search"):
+    """
+    Generates the answer from the best chunks that fit in token_budget
+    (default CONTEXT_TOKEN_BUDGET) context tokens.
+
+    Returns (answer, context stats).
+    """
+    context, _, stats = build_context(question, formatted_chunks, token_budget or settings.CONTEXT_TOKEN_BUDGET)
+    
+    prompt = f"""
+    question: {question}
+    You are a helpful assistant, your task is to summarize the given context of information.
+
+    data: {context}
+
+    If the data is not sufficient to provide an answer, just strictly reply with "Not enough context to provide information."
+    """
+    
+    stats["prompt_tokens"] = count_tokens([prompt])[0]
+    return llm_service(prompt, "", "this is a data about some information", caller=caller), stats
+
+
+def _search_reranker(rerank=False, reranker=None):
+    """
+    The rerank backend of a search, None for no rerank stage: reranker when
+    given, else SEARCH_RERANKER unless it is "none" and rerank is not set.
+    """
+    if reranker:
+        if reranker not in RERANKERS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown reranker '{reranker}'. Available rerankers: {', '.join(RERANKERS)}"
+            )
+        return reranker
+    if rerank or settings.SEARCH_RERANKER != "none":
+        return default_reranker()
+    return None
+
+
+def search_document_chunk(question, top_k, model, corpus_key, threshold, corpus_keys=None, weights=None, quotas=None,
+                          filters=None, mmr=False, merge_adjacent_chunks=False, context_tokens=None,
+                          rerank=False, reranker=None, scoring=None):
     """
     Search for document chunks relevant to a question and generate a response.
     
     Args:
         question: The search question
         top_k: Maximum number of results to return
-        model: Embedding model to use as fallback
+        model: Unused, the corpus decides which embedding model is queried
         corpus_key: The key of the corpus to search in
         threshold: Similarity threshold for filtering results
+        corpus_keys: More corpora to search, merged into one global top_k
+        weights: Optional ranking weight per corpus key
+        quotas: Optional maximum number of chunks per corpus key
+        filters: Optional chunk filter (models/filters.py)
+        mmr: Re-select the chunks by maximal marginal relevance
+        merge_adjacent_chunks: Merge neighbouring chunks of a document into one passage
+        context_tokens: Token budget of the prompt context (default CONTEXT_TOKEN_BUDGET)
+        rerank: Rerank even when SEARCH_RERANKER is "none"
+        reranker: The rerank backend (default SEARCH_RERANKER)
+        scoring: How distances become chunk scores, "raw", "minmax" or "calibrated" (default SEARCH_SCORING)
         
     Returns:
         Search results and generated response
     """
     if not question:
         raise HTTPException(status_code=400, detail="Search question is required")
+
+    _check_filters(filters)
+    _check_scoring(scoring)
+    keys = _corpus_keys(corpus_key, corpus_keys)
+    reranker = _search_reranker(rerank, reranker)
+    if len(keys) > 1 or weights or quotas or mmr or merge_adjacent_chunks:
+        return _search_corpora(
+            question, keys, top_k, threshold, weights, quotas, filters, mmr, merge_adjacent_chunks, context_tokens,
+            reranker, scoring
+        )
         
-    if not model:
-        raise HTTPException(status_code=400, detail="Embedding model is required")
-    
     try:
         
-        embedding_source = None
-        question_embedding = None
-        
-        # try pgRAG first for embedding
-        try:
-            question_embedding = get_pgrag_embedding_for_query(question)
-            embedding_source = "pgRAG"
-            logger.info("Generated query embedding using pgRAG")
-        except Exception as e:
-            logger.warning(f"pgRAG query embedding failed, falling back to Voyage: {e}")
-            
-            # fallback to Voyage
-            try:
-                question_embedding = get_embedding(model, [question])[0]
-                embedding_source = "Voyage"
-                logger.info("Generated query embedding using Voyage fallback")
-            except Exception as voyage_error:
-                logger.error(f"Voyage embedding also failed: {voyage_error}")
-                raise HTTPException(status_code=500, detail="All embedding methods failed")
-            
-        if not question_embedding:
-            raise HTTPException(status_code=500, detail="Failed to generate embedding for the question")
+        corpus = _get_search_corpus(keys[0])
+        if not corpus:
+            logger.warning(f"No corpus found for key {corpus_key}")
+            return {"results": [NO_RESULTS]}
+
+        # the question has to be embedded in the same space as the corpus
+        space = get_space(corpus["embeddingModel"])
+        embeddings, embedding_source = _embed_questions(space, [question])
+        question_embedding = embeddings[0]
+        logger.info(f"Generated {space.name} query embedding using {embedding_source}")
         
-        # Search for relevant chunks
-        chunks = documents_data.search_document_chunk(question_embedding, top_k, corpus_key, threshold)
+        # Search for relevant chunks, oversampled for the rerank stage, in memory for hot corpora
+        candidates = top_k * settings.RERANK_OVERSAMPLE if reranker else top_k
+        chunks = None if filters else _cached_chunks(
+            keys[0], corpus, space, question_embedding, candidates, threshold
+        )
+        if chunks is None:
+            chunks = documents_data.search_document_chunk(
+                question_embedding, candidates, corpus["corpusId"], threshold,
+                filters=filters, **_search_options(space, corpus["vectorStorage"], candidates)
+            )
         
         if not chunks or len(chunks) == 0 or (isinstance(chunks, dict) and "results" in chunks):
             logger.warning(f"No relevant chunks found: {chunks if isinstance(chunks, dict) else 'empty list'}")
-            return {"results": ["No relevant information found for your question."]}
+            return {"results": [NO_RESULTS]}
+
+        rerank_stats = {}
+        if reranker:
+            chunks, _ = rerank_candidates(question, chunks, top_k, reranker, stats=rerank_stats)
     
-        chunk_data = []
-        
-        rerank_scores = []
-        for chunk in chunks:
-            if hasattr(chunk, "chunkText") and hasattr(chunk, "rerankScore"):
-                rerank_scores.append(getattr(chunk, "rerankScore"))
-        
-        # calculate min and max scores if we have any scores
-        min_score = min(rerank_scores) if rerank_scores else 0
-        max_score = max(rerank_scores) if rerank_scores else 1
-        score_range = max_score - min_score if max_score > min_score else 1
-        
-        for chunk in chunks:
-            if hasattr(chunk, "chunkText"):
-                # Extract similarity score from rerankScore if available, default to 0.5 if not
-                rerank_score = getattr(chunk, "rerankScore", 0.5)
-                
-                if score_range < 0.001:
-                    position_index = len(chunk_data)
-                    normalized_score = max(0.1, 1.0 - (position_index * 0.1))
-                    logger.info(f"Using position-based score: {normalized_score} for position {position_index}")
-                else:
-                    normalized_score = max(0.1, min(0.95, 1 - ((rerank_score - min_score) / score_range)))
-                    logger.info(f"Normalized score: {normalized_score} from rerank_score: {rerank_score} (min: {min_score}, max: {max_score})")
-                
-                chunk_data.append((chunk.chunkText, normalized_score))
-        
-        if not chunk_data:
+        formatted_chunks = _rank_chunks(chunks, scoring)
+        if not formatted_chunks:
             logger.warning("No chunk text found in search results")
-            return {"results": ["No relevant information found for your question."]}
-        
-        formatted_chunks = []
-        
-        sorted_chunk_data = sorted(chunk_data, key=lambda x: x[1], reverse=True)
-        
-    
-        filtered_chunk_data = [
-            chunk for chunk in sorted_chunk_data 
-            if chunk[1] >= 0.5  # At least 50% similarity
-        ]
-        
-        # to include at least the top 3 chunks if available
-        if len(filtered_chunk_data) < 3 and len(sorted_chunk_data) > 0:
-            filtered_chunk_data = sorted_chunk_data[:min(3, len(sorted_chunk_data))]
-        
-        logger.info(f"Filtered from {len(sorted_chunk_data)} to {len(filtered_chunk_data)} chunks based on relevance")
-        
-        for i, (chunk_text, similarity) in enumerate(filtered_chunk_data):
-            formatted_chunks.append((i+1, chunk_text, similarity))
-        
-        # build context from chunks
-        context = "\n\n\n".join([chunk[1] for chunk in formatted_chunks])
-        
-        prompt = f"""
-        question: {question}
-        You are a helpful assistant, your task is to summarize the given context of information.
-
-        data: {context}
-
-        If the data is not sufficient to provide an answer, just strictly reply with "Not enough context to provide information."
-        """
+            return {"results": [NO_RESULTS]}
         
         try:
-            result = llm_service(prompt, "", "this is a data about some information")
+            result, context_stats = _generate_answer(question, formatted_chunks, context_tokens)
             logger.info("Successfully generated LLM response")
             
             return {
                 "results": [result], 
                 "chunks": formatted_chunks,
-                "embedding_source": embedding_source
+                "embedding_source": embedding_source,
+                "stats": {**context_stats, **rerank_stats}
             }
+        except LLMTimeoutError as e:
+            logger.error(f"LLM service timed out: {e}")
+            raise HTTPException(status_code=504, detail=f"Failed to generate response: {str(e)}")
         except Exception as e:
             logger.error(f"LLM service failed: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to generate response: {str(e)}")
@@ -242,4 +513,191 @@ def search_document_chunk(question, top_k, model, corpus_key, threshold):
     except Exception as e:
         logger.error(f"Error in search_document_chunk: {e}")
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
-    
\ No newline at end of file
+
+
+def _search_corpora(question, corpus_keys, top_k, threshold, weights=None, quotas=None, filters=None,
+                    mmr=False, merge=False, context_tokens=None, reranker=None, scoring=None):
+    try:
+        corpora = _get_search_corpora(corpus_keys)
+        rerank_stats = {}
+        chunks, embedding_source, _ = _federated_chunks(
+            question, corpora, top_k, threshold, weights, quotas, filters=filters, mmr=mmr, merge=merge,
+            reranker=reranker, rerank_stats=rerank_stats
+        )
+
+        formatted_chunks = _rank_chunks(chunks, scoring)
+        if not formatted_chunks:
+            logger.warning(f"No relevant chunks found in corpora {', '.join(corpus_keys)}")
+            return {"results": [NO_RESULTS]}
+
+        try:
+            result, context_stats = _generate_answer(question, formatted_chunks, context_tokens)
+            return {
+                "results": [result],
+                "chunks": formatted_chunks,
+                "embedding_source": embedding_source,
+                "stats": {**context_stats, **rerank_stats}
+            }
+        except LLMTimeoutError as e:
+            logger.error(f"LLM service timed out: {e}")
+            raise HTTPException(status_code=504, detail=f"Failed to generate response: {str(e)}")
+        except Exception as e:
+            logger.error(f"LLM service failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Failed to generate response: {str(e)}")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in multi-corpus search: {e}")
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+
+def _elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def search_document_chunks_batch(questions, top_k, corpus_key, threshold, retrieve_only=False, concurrency=None,
+                                 filters=None, context_tokens=None, scoring=None):
+    """
+    Search a corpus for many questions at once, e.g. for evaluation jobs.
+
+    The questions are embedded in one batch and searched in one SQL statement.
+    Unless retrieve_only, an answer is generated per question with at most
+    `concurrency` (default SEARCH_BATCH_LLM_CONCURRENCY) LLM calls in flight;
+    a failed generation only fails its own question.
+
+    Returns one result per question, in order, with the timings of each stage.
+    """
+    if not questions or not all(questions):
+        raise HTTPException(status_code=400, detail="Search questions are required")
+    if len(questions) > settings.SEARCH_BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.SEARCH_BATCH_MAX_QUESTIONS} questions can be searched in one batch"
+        )
+    _check_filters(filters)
+    _check_scoring(scoring)
+
+    try:
+        started = time.perf_counter()
+        timings = {}
+
+        corpus = _get_search_corpus(corpus_key)
+        if not corpus:
+            raise HTTPException(status_code=404, detail=f"Corpus with key {corpus_key} not found")
+        space = get_space(corpus["embeddingModel"])
+
+        stage = time.perf_counter()
+        embeddings, embedding_source = _embed_questions(space, list(questions))
+        timings["embedding_ms"] = _elapsed_ms(stage)
+
+        stage = time.perf_counter()
+        found = documents_data.search_document_chunks_batch(
+            embeddings, top_k, corpus["corpusId"], threshold,
+            filters=filters, **_search_options(space, corpus["vectorStorage"], top_k)
+        )
+        if isinstance(found, dict):
+            raise HTTPException(status_code=found.get("status_code", 500), detail=found["error"])
+        timings["search_ms"] = _elapsed_ms(stage)
+
+        results = []
+        for question, chunks in zip(questions, found):
+            formatted_chunks = _rank_chunks(chunks, scoring)
+            results.append({
+                "question": question,
+                "chunks": formatted_chunks,
+                "results": [] if formatted_chunks else [NO_RESULTS],
+            })
+
+        if not retrieve_only:
+            stage = time.perf_counter()
+
+            def answer(result):
+                start = time.perf_counter()
+                try:
+                    answer_text, result["context"] = _generate_answer(
+                        result["question"], result["chunks"], context_tokens, caller="search-batch"
+                    )
+                    result["results"] = [answer_text]
+                except Exception as e:
+                    logger.error(f"LLM service failed for a batch question: {e}")
+                    result["error"] = f"Failed to generate response: {str(e)}"
+                result["generation_ms"] = _elapsed_ms(start)
+
+            pending = [result for result in results if result["chunks"]]
+            if pending:
+                workers = max(1, min(concurrency or settings.SEARCH_BATCH_LLM_CONCURRENCY, len(pending)))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(answer, pending))
+            timings["generation_ms"] = _elapsed_ms(stage)
+
+        timings["total_ms"] = _elapsed_ms(started)
+        return {
+            "results": results,
+            "embedding_source": embedding_source,
+            "stats": timings
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in search_document_chunks_batch: {e}")
+        raise HTTPException(status_code=500, detail=f"Batch search failed: {str(e)}")
+
+
+def retrieve_document_chunks(question, top_k, corpus_key, threshold, rerank=False,
+                             corpus_keys=None, weights=None, quotas=None, filters=None,
+                             mmr=False, merge_adjacent_chunks=False, reranker=None):
+    """
+    Retrieval only search: embeds the question, runs the ANN search and, if
+    rerank (or a reranker is named), reranks top_k * RERANK_OVERSAMPLE hits with
+    the rerank stage (services/rerank_stage.py). No score normalization,
+    relevance filtering or LLM call, so this is the latency floor of /search.
+    Several corpora are merged into one global top_k, and mmr and
+    merge_adjacent_chunks diversify the chunks, as in search_document_chunk.
+
+    Returns the ranked chunks with their raw cosine distance and, when
+    reranked, their rerank distance (lower is better for both).
+    """
+    if not question:
+        raise HTTPException(status_code=400, detail="Search question is required")
+    _check_filters(filters)
+    keys = _corpus_keys(corpus_key, corpus_keys)
+    reranker = _search_reranker(rerank, reranker) if rerank or reranker else None
+
+    try:
+        started = time.perf_counter()
+        timings = {}
+
+        corpora = _get_search_corpora(keys)
+        chunks, embedding_source, reranked = _federated_chunks(
+            question, corpora, top_k, threshold, weights, quotas, timings, filters,
+            mmr=mmr, merge=merge_adjacent_chunks, reranker=reranker, rerank_stats=timings
+        )
+
+        results = [
+            {
+                "chunkId": chunk.chunkId,
+                "documentId": chunk.documentId,
+                "corpusId": chunk.corpusId,
+                "chunkIndex": chunk.chunkIndex,
+                "chunkText": chunk.chunkText,
+                "distance": chunk.distance,
+                "rerankScore": chunk.rerankScore if reranked else None,
+                "mergedChunkIds": chunk.mergedChunkIds,
+            }
+            for chunk in chunks
+        ]
+
+        timings["total_ms"] = _elapsed_ms(started)
+        return {
+            "results": results,
+            "embedding_source": embedding_source,
+            "stats": timings
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in retrieve_document_chunks: {e}")
+        raise HTTPException(status_code=500, detail=f"Retrieval failed: {str(e)}")
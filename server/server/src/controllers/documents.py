@@ -6,12 +6,16 @@ logger = logging.getLogger(__name__)
 
 documents_data = DocumentsModel()
 
-def get_documents_data(where_conditions=None):
-    response = documents_data.get_documents(where_conditions)
+def get_documents_data(where_conditions=None, fields=None, limit=None, after=None, order="id", stream=False):
+    response = documents_data.get_documents(where_conditions, fields, limit=limit, after=after, order=order, stream=stream)
     
     if "error" in response:
         status_code = response.get("status_code", 500)
         raise HTTPException(status_code=status_code, detail=response["error"])
+
+    # Streamed results are a row generator, consumed by the route
+    if stream:
+        return response
     
     # Ensure response has a "results" key with a list value
     if "results" in response and not isinstance(response["results"], list):
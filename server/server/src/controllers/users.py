@@ -4,12 +4,16 @@ from fastapi import HTTPException
 
 user_data = UserModel()
 
-def get_users_data(where_conditions=None):
-    response = user_data.get_users(where_conditions)
+def get_users_data(where_conditions=None, fields=None, limit=None, after=None, order="id", stream=False):
+    response = user_data.get_users(where_conditions, fields, limit=limit, after=after, order=order, stream=stream)
     
     if "error" in response:
         status_code = response.get("status_code", 500)
         raise HTTPException(status_code=status_code, detail=response["error"])
+
+    # Streamed results are a row generator, consumed by the route
+    if stream:
+        return response
     
     # Ensure response has a "results" key with a list value
     if "results" in response and not isinstance(response["results"], list):
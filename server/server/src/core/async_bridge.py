@@ -0,0 +1,50 @@
+import asyncio
+import concurrent.futures
+import threading
+
+# A single event loop running in a daemon thread. Async clients (Voyage, LLM
+# gateway) live on this loop so their semaphores and HTTP sessions are shared
+# by sync callers (controllers, background jobs) and async routes alike.
+_loop = None
+_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="async-bridge", daemon=True)
+            thread.start()
+            _loop = loop
+        return _loop
+
+
+def submit(coro) -> concurrent.futures.Future:
+    """
+    Schedules a coroutine on the background loop and returns a concurrent future.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run_sync(coro, timeout: float = None):
+    """
+    Runs a coroutine on the background loop and blocks until it finishes.
+    Safe to call from sync code running inside an async route.
+    """
+    loop = get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync cannot be called from the background loop itself")
+    return submit(coro).result(timeout)
+
+
+async def run_async(coro):
+    """
+    Awaits a coroutine that runs on the background loop from any other loop.
+    """
+    return await asyncio.wrap_future(submit(coro))
@@ -9,6 +9,115 @@ class Settings:
     API_KEY: str = os.getenv("X-API-KEY")
     VOYAGE_API_KEY: str = os.getenv("VOYAGE_API_KEY")
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY")
+    MISTRAL_API_KEY: str = os.getenv("MISTRAL_API_KEY")
+
+    # Voyage client (services/voyage_client.py)
+    VOYAGE_MAX_IN_FLIGHT: int = int(os.getenv("VOYAGE_MAX_IN_FLIGHT", "4"))
+    VOYAGE_MAX_RETRIES: int = int(os.getenv("VOYAGE_MAX_RETRIES", "5"))
+    VOYAGE_EMBED_BATCH_SIZE: int = int(os.getenv("VOYAGE_EMBED_BATCH_SIZE", "128"))
+    VOYAGE_RERANK_BATCH_SIZE: int = int(os.getenv("VOYAGE_RERANK_BATCH_SIZE", "100"))
+
+    # Embedding provider for chunks and queries: "pgrag" (Neon) or "local" (ONNX Runtime)
+    EMBEDDING_PROVIDER: str = os.getenv("EMBEDDING_PROVIDER", "pgrag")
+    LOCAL_EMBEDDING_MODEL_DIR: str = os.getenv("LOCAL_EMBEDDING_MODEL_DIR")
+    LOCAL_EMBEDDING_THREADS: int = int(os.getenv("LOCAL_EMBEDDING_THREADS", "0"))
+    LOCAL_EMBEDDING_BATCH_SIZE: int = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "32"))
+    LOCAL_EMBEDDING_QUANTIZE: bool = os.getenv("LOCAL_EMBEDDING_QUANTIZE", "false").lower() == "true"
+
+    # Query embedding coalescing (services/embedding_coalescer.py)
+    QUERY_EMBED_COALESCE: bool = os.getenv("QUERY_EMBED_COALESCE", "true").lower() == "true"
+    QUERY_EMBED_MAX_BATCH: int = int(os.getenv("QUERY_EMBED_MAX_BATCH", "32"))
+    QUERY_EMBED_MAX_WAIT_MS: float = float(os.getenv("QUERY_EMBED_MAX_WAIT_MS", "3"))
+
+    # Compressed vector storage: binary-quantized candidates fetched per result before exact rescoring
+    COMPRESSED_SEARCH_OVERSAMPLE: int = int(os.getenv("COMPRESSED_SEARCH_OVERSAMPLE", "10"))
+
+    # In-process ANN cache (services/ann_cache.py): comma separated keys of the hot corpora kept in memory
+    # ("*" for all, empty disables), memory budget of all cached indexes, corpus size from which an HNSW
+    # graph (hnswlib) replaces exact NumPy search, HNSW parameters, and seconds between incremental refreshes
+    ANN_CACHE_CORPORA: str = os.getenv("ANN_CACHE_CORPORA", "")
+    ANN_CACHE_MEMORY_MB: float = float(os.getenv("ANN_CACHE_MEMORY_MB", "1024"))
+    ANN_CACHE_HNSW_MIN_CHUNKS: int = int(os.getenv("ANN_CACHE_HNSW_MIN_CHUNKS", "50000"))
+    ANN_CACHE_HNSW_M: int = int(os.getenv("ANN_CACHE_HNSW_M", "16"))
+    ANN_CACHE_HNSW_EF_CONSTRUCTION: int = int(os.getenv("ANN_CACHE_HNSW_EF_CONSTRUCTION", "200"))
+    ANN_CACHE_HNSW_EF_SEARCH: int = int(os.getenv("ANN_CACHE_HNSW_EF_SEARCH", "100"))
+    ANN_CACHE_REFRESH_SECONDS: float = float(os.getenv("ANN_CACHE_REFRESH_SECONDS", "30"))
+
+    # Filtered vector search (models/filters.py): "relaxed_order", "strict_order" or "off" (pgvector < 0.8)
+    HNSW_ITERATIVE_SCAN: str = os.getenv("HNSW_ITERATIVE_SCAN", "relaxed_order")
+
+    # Search diversification (services/diversify.py): MMR candidates fetched per result and relevance weight
+    SEARCH_MMR_OVERSAMPLE: int = int(os.getenv("SEARCH_MMR_OVERSAMPLE", "4"))
+    SEARCH_MMR_LAMBDA: float = float(os.getenv("SEARCH_MMR_LAMBDA", "0.7"))
+
+    # Prompt context (services/context_builder.py): token budget and tokenizer.json used to count
+    # tokens (defaults to the local embedding model's, estimated when neither is available)
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+    CONTEXT_TOKENIZER: str = os.getenv("CONTEXT_TOKENIZER")
+
+    # Search chunk scores (services/scoring.py): "raw", "minmax" or "calibrated", the logistic curve of
+    # the calibrated policy (score 0.5 at the midpoint distance), and the score chunks need to reach the
+    # LLM context, the best SEARCH_MIN_CHUNKS being kept whatever their score
+    SEARCH_SCORING: str = os.getenv("SEARCH_SCORING", "minmax")
+    SEARCH_CALIBRATION_MIDPOINT: float = float(os.getenv("SEARCH_CALIBRATION_MIDPOINT", "0.35"))
+    SEARCH_CALIBRATION_SCALE: float = float(os.getenv("SEARCH_CALIBRATION_SCALE", "0.05"))
+    SEARCH_MIN_SCORE: float = float(os.getenv("SEARCH_MIN_SCORE", "0.5"))
+    SEARCH_MIN_CHUNKS: int = int(os.getenv("SEARCH_MIN_CHUNKS", "3"))
+
+    # Batch search (POST /search/batch)
+    SEARCH_BATCH_MAX_QUESTIONS: int = int(os.getenv("SEARCH_BATCH_MAX_QUESTIONS", "500"))
+    SEARCH_BATCH_LLM_CONCURRENCY: int = int(os.getenv("SEARCH_BATCH_LLM_CONCURRENCY", "4"))
+
+    # Response compression (server.py), brotli needs the optional brotli-asgi package
+    RESPONSE_COMPRESSION: bool = os.getenv("RESPONSE_COMPRESSION", "true").lower() == "true"
+    RESPONSE_COMPRESSION_MIN_BYTES: int = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+    RESPONSE_BROTLI_QUALITY: int = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+
+    # Rerank score cache (services/rerank_cache.py): cached (model, query, chunk) scores, and the
+    # distance lead of the top hit over the runner-up above which reranking is skipped (0 never skips)
+    RERANK_CACHE_SIZE: int = int(os.getenv("RERANK_CACHE_SIZE", "50000"))
+    RERANK_SKIP_GAP: float = float(os.getenv("RERANK_SKIP_GAP", "0.15"))
+
+    # Search rerank stage (services/rerank_stage.py): "none" (searches rerank only when asked to),
+    # "pgrag" (Jina tiny in Neon), "voyage" (rerank-2) or "local" (services/local_reranker.py),
+    # candidates fetched per result before reranking, and the stage's latency budget in ms after
+    # which the vector order is kept (0 waits for the reranker)
+    SEARCH_RERANKER: str = os.getenv("SEARCH_RERANKER", "none")
+    RERANK_OVERSAMPLE: int = int(os.getenv("RERANK_OVERSAMPLE", "4"))
+    RERANK_BUDGET_MS: float = float(os.getenv("RERANK_BUDGET_MS", "500"))
+
+    # Local reranker (services/local_reranker.py): a cross-encoder such as jina-reranker-v1-tiny-en
+    # exported to ONNX (model.onnx + tokenizer.json), run with ONNX Runtime
+    LOCAL_RERANKER_MODEL_DIR: str = os.getenv("LOCAL_RERANKER_MODEL_DIR")
+    LOCAL_RERANKER_THREADS: int = int(os.getenv("LOCAL_RERANKER_THREADS", "0"))
+    LOCAL_RERANKER_BATCH_SIZE: int = int(os.getenv("LOCAL_RERANKER_BATCH_SIZE", "32"))
+    LOCAL_RERANKER_MAX_LENGTH: int = int(os.getenv("LOCAL_RERANKER_MAX_LENGTH", "512"))
+    LOCAL_RERANKER_QUANTIZE: bool = os.getenv("LOCAL_RERANKER_QUANTIZE", "false").lower() == "true"
+
+    # LLM providers (services/llm_providers.py): "mistral", "openai" (any OpenAI-compatible server) or
+    # "local" (deterministic stand-in). LLM_ROUTES overrides the default per call site as comma separated
+    # caller=provider:model pairs, callers being search, search-batch, tagging and auto-chunking
+    LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "mistral")
+    LLM_MODEL: str = os.getenv("LLM_MODEL", "mistral-large-latest")
+    LLM_ROUTES: str = os.getenv("LLM_ROUTES", "")
+    LLM_OPENAI_BASE_URL: str = os.getenv("LLM_OPENAI_BASE_URL", "http://localhost:8000/v1")
+    LLM_OPENAI_API_KEY: str = os.getenv("LLM_OPENAI_API_KEY")
+    LLM_LOCAL_LATENCY_MS: float = float(os.getenv("LLM_LOCAL_LATENCY_MS", "0"))
+
+    # LLM gateway (services/llm_services.py): in-flight limit, per-call deadline in seconds, retries,
+    # and hedging (a second request once a call is slower than its caller's p95 over the last
+    # LLM_LATENCY_WINDOW calls, after LLM_HEDGE_MIN_SAMPLES of them)
+    LLM_MAX_IN_FLIGHT: int = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_HEDGE: bool = os.getenv("LLM_HEDGE", "false").lower() == "true"
+    LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    LLM_LATENCY_WINDOW: int = int(os.getenv("LLM_LATENCY_WINDOW", "200"))
+
+    # Document tagging (services/tagging.py)
+    TAGGING_MAX_SECTIONS: int = int(os.getenv("TAGGING_MAX_SECTIONS", "6"))
+    TAGGING_SECTION_CHARS: int = int(os.getenv("TAGGING_SECTION_CHARS", "6000"))
+    TAGGING_CONCURRENCY: int = int(os.getenv("TAGGING_CONCURRENCY", "3"))
 
 
 settings = Settings()
@@ -0,0 +1,61 @@
+from decimal import Decimal
+from typing import List
+
+import numpy as np
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value):
+    # orjson handles str/int/float/list/dict/datetime/UUID/dataclasses and
+    # contiguous numpy arrays natively, this covers the rest
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if hasattr(value, "tolist"):
+        # numpy scalars, float16 or non-contiguous arrays
+        return value.tolist()
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson, including numpy arrays.
+
+    Returning an instance from a route also skips FastAPI's jsonable_encoder
+    pass, which is where most of the time goes for embedding and chunk payloads.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def float32_response(embeddings: List[List[float]]) -> Response:
+    """
+    Packs embeddings into a little-endian float32 matrix, row after row.
+    The shape is sent in the X-Embedding-Count and X-Embedding-Dimension headers;
+    no embeddings are an empty body of shape 0 x 0.
+    """
+    matrix = np.asarray(embeddings, dtype="<f4")
+    if len(embeddings) == 0:
+        matrix = matrix.reshape(0, 0)
+    elif matrix.ndim != 2:
+        matrix = matrix.reshape(len(embeddings), -1)
+    return Response(
+        content=matrix.tobytes(),
+        media_type="application/octet-stream",
+        headers={
+            "X-Embedding-Count": str(matrix.shape[0]),
+            "X-Embedding-Dimension": str(matrix.shape[1]),
+            "X-Embedding-Dtype": "float32-le",
+        },
+    )
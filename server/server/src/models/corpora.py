@@ -2,12 +2,26 @@ from core.db import settings
 import logging
 import psycopg2
 import json
+from models.pagination import Keyset, stream_rows
+from models.projection import select_list
+
+CORPUS_COLUMNS = (
+    "corpusId", "userId", "corpusKey", "embeddingModel", "embeddingDimension", "vectorStorage",
+    "createdAt", "updatedAt",
+)
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 class CorporaModel:
-    def get_corpuses(self, where_conditions=None):
+    def get_corpuses(self, where_conditions=None, fields=None, limit=None, after=None, order="id", stream=False):
+        try:
+            keyset = Keyset("corpusId", limit, after, order)
+            columns = select_list(CORPUS_COLUMNS, fields,
+                                  required=keyset.columns if keyset.active else ())
+        except ValueError as e:
+            return {"error": str(e), "status_code": 400}
+
         conn = settings.get_db_connection()  
         try:
             if conn is None:
@@ -16,8 +30,8 @@ class CorporaModel:
                 
             cur = conn.cursor()
             
-            query = 'SELECT * FROM "Corpora"'
-            params = []
+            query = f'SELECT {columns} FROM "Corpora"'
+            where_clauses, params = keyset.where()
             
             # Add WHERE clause if conditions are provided
             if where_conditions:
@@ -25,7 +39,6 @@ class CorporaModel:
                     logger.error(f"Invalid where_conditions format: {where_conditions}")
                     return {"error": "Where conditions must be a dictionary", "status_code": 400}
                 
-                where_clauses = []
                 for key, value in where_conditions.items():
                     # Ensure the column name is valid to prevent SQL injection
                     if key in ["corpusId", "userId", "corpusKey"]:
@@ -33,11 +46,13 @@ class CorporaModel:
                         params.append(value)
                     else:
                         logger.warning(f"Ignoring invalid column name in where condition: {key}")
-                
-                if where_clauses:
-                    query += " WHERE " + " AND ".join(where_clauses)
             
+            if where_clauses:
+                query += " WHERE " + " AND ".join(where_clauses)
+            query += keyset.order_by(stream)
             query += ";"
+            if stream:
+                return {"results": stream_rows(query, params)}
             logger.info(f"Executing query: {query} with params: {params}")
             
             cur.execute(query, params)
@@ -45,6 +60,9 @@ class CorporaModel:
             columns = [desc[0] for desc in cur.description]  # Extract column names
             result = [dict(zip(columns, row)) for row in rows]  # Convert rows to dictionaries
             logger.info(f"get_corpuses result: {len(result)} records")  
+            result, next_after = keyset.page(result)
+            if keyset.active:
+                return {"results": result, "next_after": next_after}
             return {"results": result}  
         
         except psycopg2.OperationalError as e:
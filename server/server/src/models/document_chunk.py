@@ -2,39 +2,70 @@ from core.db import settings as db_settings
 import logging
 from dataclasses import dataclass
 from typing import List, Optional, Union
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+from core.config import settings
+from models.filters import compile_filter
+from models.pagination import Keyset, stream_rows
+from models.projection import select_list
+
+CHUNK_COLUMNS = (
+    "chunkId", "documentId", "chunkIndex", "chunkText",
+    "embeddingData", "embeddingVoyage3Large", "embeddingHalf", "embeddingVoyage3LargeHalf",
+    "embeddingModel", "embeddingDimension", "metaData", "createdAt", "updatedAt",
+)
+# Only returned when asked for explicitly
+HEAVY_CHUNK_COLUMNS = ("embeddingData", "embeddingVoyage3Large", "embeddingHalf", "embeddingVoyage3LargeHalf")
 
 @dataclass
 class DocumentChunk:
     chunkId: str
     documentId: str
     chunkText: str
-    embeddingData: List[float]
     rerankScore: Optional[float] = None
+    # raw cosine distance to the question, kept when rerankScore is replaced by a reranker
+    distance: Optional[float] = None
+    corpusId: Optional[str] = None
+    chunkIndex: Optional[int] = None
+    # the chunk's vector as a list of floats, only loaded for MMR
+    embedding: Optional[List[float]] = None
+    # chunks merged into this one by services.diversify.merge_adjacent
+    mergedChunkIds: Optional[List[str]] = None
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 class DocumentChunkModel:
-    def get_document_chunks(self, where_conditions=None):
+    def get_document_chunks(self, where_conditions=None, fields=None, limit=None, after=None, order="id", stream=False,
+                            filters=None):
+        try:
+            keyset = Keyset("chunkId", limit, after, order)
+            columns = select_list(CHUNK_COLUMNS, fields, HEAVY_CHUNK_COLUMNS,
+                                  required=keyset.columns if keyset.active else ())
+            filter_clauses, filter_params = compile_filter(filters)
+        except ValueError as e:
+            return {"error": str(e), "status_code": 400}
+
         conn = db_settings.get_db_connection()  
         try:
             cur = conn.cursor()
             
-            query = 'SELECT * FROM "DocumentChunks"'
-            params = []
+            query = f'SELECT {columns} FROM "DocumentChunks"'
+            where_clauses, params = keyset.where()
             
             if where_conditions and isinstance(where_conditions, dict) and where_conditions:
-                where_clauses = []
                 for key, value in where_conditions.items():
                     if key in ["chunkId", "documentId", "chunkIndex", "chunkText", "metaData"]:
                         where_clauses.append(f'"{key}" = %s')
                         params.append(value)
-                
-                if where_clauses:
-                    query += " WHERE " + " AND ".join(where_clauses)
+            where_clauses += filter_clauses
+            params += filter_params
             
+            if where_clauses:
+                query += " WHERE " + " AND ".join(where_clauses)
+            query += keyset.order_by(stream)
             query += ";"
+            if stream:
+                return {"results": stream_rows(query, params)}
             logger.info(f"Executing query: {query} with params: {params}")
             
             cur.execute(query, params)
@@ -48,6 +79,9 @@ class DocumentChunkModel:
                 for row in rows:
                     formatted_results.append(dict(zip(columns, row)))  
             
+            formatted_results, next_after = keyset.page(formatted_results)
+            if keyset.active:
+                return {"results": formatted_results, "next_after": next_after}
             return {"results": formatted_results}
         except Exception as e:
             logger.error(f"An error occurred in get_document_chunks: {e}")
@@ -56,11 +90,16 @@ class DocumentChunkModel:
             if conn:
                 conn.close()
 
-    def get_document_chunk(self, chunk_id):
+    def get_document_chunk(self, chunk_id, fields=None):
+        try:
+            columns = select_list(CHUNK_COLUMNS, fields, HEAVY_CHUNK_COLUMNS)
+        except ValueError as e:
+            return {"error": str(e), "status_code": 400}
+
         conn = db_settings.get_db_connection()  
         try:
             cur = conn.cursor()
-            query = 'SELECT * FROM "DocumentChunks" WHERE "chunkId" = %s;'
+            query = f'SELECT {columns} FROM "DocumentChunks" WHERE "chunkId" = %s;'
             cur.execute(query, (chunk_id,))
             row = cur.fetchone()
             if row:
@@ -84,7 +123,8 @@ class DocumentChunkModel:
             cur = conn.cursor()
             columns = ', '.join([f'"{key}"' for key in chunk_input_data.keys()])
             placeholders = ', '.join(['%s'] * len(chunk_input_data))
-            query = f'INSERT INTO "DocumentChunks" ({columns}) VALUES ({placeholders}) RETURNING *;'
+            returning = select_list(CHUNK_COLUMNS, None, HEAVY_CHUNK_COLUMNS)
+            query = f'INSERT INTO "DocumentChunks" ({columns}) VALUES ({placeholders}) RETURNING {returning};'
             cur.execute(query, tuple(chunk_input_data.values()))
             row = cur.fetchone()
             conn.commit()
@@ -116,7 +156,11 @@ class DocumentChunkModel:
                 return {"error": "Missing chunk_id for update."}
 
             set_clause = ', '.join([f'"{key}" = %s' for key in chunk_input_data.keys()])
-            query = f'UPDATE "DocumentChunks" SET {set_clause} WHERE "chunkId" = %s RETURNING *;'
+            # the in-process ANN cache (services/ann_cache.py) picks up changed chunks by updatedAt
+            if "updatedAt" not in chunk_input_data:
+                set_clause += ', "updatedAt" = CURRENT_TIMESTAMP'
+            returning = select_list(CHUNK_COLUMNS, None, HEAVY_CHUNK_COLUMNS)
+            query = f'UPDATE "DocumentChunks" SET {set_clause} WHERE "chunkId" = %s RETURNING {returning};'
             params = tuple(chunk_input_data.values()) + (chunk_id,)  
             cur.execute(query, params)
             conn.commit()  
@@ -158,43 +202,352 @@ class DocumentChunkModel:
             if conn:
                 conn.close()    
 
+    def get_chunks_missing_embedding(self, corpus_id, embedding_column, after_chunk_id=None, limit=256):
+        """
+        Returns up to limit (chunkId, chunkText) rows of a corpus whose
+        embedding_column is still NULL, ordered by chunkId after after_chunk_id.
+        """
+        conn = db_settings.get_db_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                f"""
+                SELECT dc."chunkId", dc."chunkText"
+                FROM "DocumentChunks" dc
+                JOIN "Documents" d ON d."documentId" = dc."documentId"
+                WHERE d."corpusId" = %s
+                  AND dc."{embedding_column}" IS NULL
+                  AND (%s::text IS NULL OR dc."chunkId" > %s)
+                ORDER BY dc."chunkId"
+                LIMIT %s;
+                """,
+                (corpus_id, after_chunk_id, after_chunk_id, limit)
+            )
+            return cur.fetchall()
+        finally:
+            if conn:
+                conn.close()
+
+    def count_chunks_missing_embedding(self, corpus_id, embedding_column):
+        """
+        Returns the number of chunks of a corpus without a vector in embedding_column.
+        """
+        conn = db_settings.get_db_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                f"""
+                SELECT count(*)
+                FROM "DocumentChunks" dc
+                JOIN "Documents" d ON d."documentId" = dc."documentId"
+                WHERE d."corpusId" = %s AND dc."{embedding_column}" IS NULL;
+                """,
+                (corpus_id,)
+            )
+            return cur.fetchone()[0]
+        finally:
+            if conn:
+                conn.close()
+
+    def count_corpus_vectors(self, corpus_id, embedding_column):
+        """
+        Returns the number of chunks of a corpus with a vector in embedding_column.
+        """
+        conn = db_settings.get_db_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                f"""
+                SELECT count(*)
+                FROM "DocumentChunks" dc
+                JOIN "Documents" d ON d."documentId" = dc."documentId"
+                WHERE d."corpusId" = %s AND dc."{embedding_column}" IS NOT NULL;
+                """,
+                (corpus_id,)
+            )
+            return cur.fetchone()[0]
+        finally:
+            if conn:
+                conn.close()
+
+    def get_corpus_vectors(self, corpus_id, embedding_column, updated_after=None):
+        """
+        Yields the {"chunkId", "updatedAt", "embedding"} rows of the chunks of a
+        corpus with a vector in embedding_column (as a list of floats), updated
+        after updated_after when given, ordered by (updatedAt, chunkId). Rows are
+        streamed through a server-side cursor.
+        """
+        query = f"""
+        SELECT dc."chunkId", dc."updatedAt", dc."{embedding_column}"::real[] AS "embedding"
+        FROM "DocumentChunks" dc
+        JOIN "Documents" d ON d."documentId" = dc."documentId"
+        WHERE d."corpusId" = %s AND dc."{embedding_column}" IS NOT NULL
+          AND (%s::timestamptz IS NULL OR dc."updatedAt" > %s)
+        ORDER BY dc."updatedAt", dc."chunkId";
+        """
+        return stream_rows(query, (corpus_id, updated_after, updated_after))
+
+    def get_chunks_by_ids(self, chunk_ids):
+        """
+        Returns the documentId, chunkIndex and chunkText of the given chunks as a
+        dict keyed by chunkId, in one query. Missing chunks are left out.
+        """
+        conn = db_settings.get_db_connection()
+        try:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(
+                '''
+                SELECT "chunkId", "documentId", "chunkIndex", "chunkText"
+                FROM "DocumentChunks" WHERE "chunkId" = ANY(%s);
+                ''',
+                (list(chunk_ids),)
+            )
+            return {row["chunkId"]: row for row in cur.fetchall()}
+        finally:
+            if conn:
+                conn.close()
+
+    def set_chunk_embeddings(self, embedding_column, embedding_model, embedding_dimension, rows, vector_type="vector"):
+        """
+        Stores (chunkId, embedding) rows in embedding_column (of type vector or
+        halfvec). With an embedding_model, the same UPDATE also marks the chunks
+        as belonging to it; with None their model is left as is.
+        Returns the number of updated rows.
+        """
+        conn = db_settings.get_db_connection()
+        try:
+            cur = conn.cursor()
+            # one statement for the whole batch (execute_values pages by 100 rows by default)
+            execute_values(
+                cur,
+                f"""
+                UPDATE "DocumentChunks" dc
+                SET "{embedding_column}" = v.embedding::{vector_type},
+                    "embeddingModel" = COALESCE(v.model::varchar, dc."embeddingModel"),
+                    "embeddingDimension" = COALESCE(v.dimension::int, dc."embeddingDimension"),
+                    "updatedAt" = CURRENT_TIMESTAMP
+                FROM (VALUES %s) AS v("chunkId", embedding, model, dimension)
+                WHERE dc."chunkId" = v."chunkId";
+                """,
+                [
+                    (chunk_id, embedding if isinstance(embedding, str) else str(list(embedding)),
+                     embedding_model, embedding_dimension)
+                    for chunk_id, embedding in rows
+                ],
+                page_size=max(len(rows), 1)
+            )
+            conn.commit()
+            return cur.rowcount
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def switch_embedding_space(self, corpus_id, embedding_column, embedding_model, embedding_dimension):
+        """
+        Moves a corpus to embedding_model and marks its chunks that have a
+        vector in embedding_column as belonging to it, in one transaction so
+        chunks never claim a model their corpus is not searched with.
+        Returns the number of relabelled chunks.
+        """
+        conn = db_settings.get_db_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                f"""
+                UPDATE "DocumentChunks" dc
+                SET "embeddingModel" = %s,
+                    "embeddingDimension" = %s
+                FROM "Documents" d
+                WHERE d."documentId" = dc."documentId"
+                  AND d."corpusId" = %s
+                  AND dc."{embedding_column}" IS NOT NULL;
+                """,
+                (embedding_model, embedding_dimension, corpus_id)
+            )
+            relabelled = cur.rowcount
+            cur.execute(
+                """
+                UPDATE "Corpora"
+                SET "embeddingModel" = %s, "embeddingDimension" = %s, "updatedAt" = CURRENT_TIMESTAMP
+                WHERE "corpusId" = %s;
+                """,
+                (embedding_model, embedding_dimension, corpus_id)
+            )
+            if cur.rowcount == 0:
+                raise ValueError(f"Corpus {corpus_id} not found")
+            conn.commit()
+            return relabelled
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def convert_vector_storage(self, corpus_id, from_column, to_column, to_type, storage):
+        """
+        Moves the vectors of a corpus from from_column to to_column (cast to
+        to_type) and records the new vectorStorage of the corpus, in one
+        transaction so searches see either the old or the new layout.
+        Returns the number of converted chunks.
+        """
+        conn = db_settings.get_db_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                f"""
+                UPDATE "DocumentChunks" dc
+                SET "{to_column}" = dc."{from_column}"::{to_type},
+                    "{from_column}" = NULL,
+                    "updatedAt" = CURRENT_TIMESTAMP
+                FROM "Documents" d
+                WHERE d."documentId" = dc."documentId"
+                  AND d."corpusId" = %s
+                  AND dc."{from_column}" IS NOT NULL;
+                """,
+                (corpus_id,)
+            )
+            converted = cur.rowcount
+            cur.execute(
+                'UPDATE "Corpora" SET "vectorStorage" = %s, "updatedAt" = CURRENT_TIMESTAMP WHERE "corpusId" = %s;',
+                (storage, corpus_id)
+            )
+            conn.commit()
+            return converted
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if conn:
+                conn.close()
+
+    def get_corpus_by_key(self, corpus_key):
+        """
+        Returns the id, embedding model and vector storage of the corpus with the given key.
+        """
+        conn = db_settings.get_db_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                'SELECT "corpusId", "embeddingModel", "vectorStorage" FROM "Corpora" WHERE "corpusKey" = %s LIMIT 1;',
+                (corpus_key,)
+            )
+            row = cur.fetchone()
+            if row:
+                return {"results": {"corpusId": row[0], "embeddingModel": row[1], "vectorStorage": row[2]}}
+            return {"results": None}
+        except Exception as e:
+            logger.error(f"An error occurred in get_corpus_by_key: {e}")
+            return {"error": str(e), "status_code": 500}
+        finally:
+            if conn:
+                conn.close()
+
+    def get_document_embedding_space(self, document_id):
+        """
+        Returns the embedding model and vector storage of the corpus a document
+        belongs to as a tuple, or (None, "full") if the document or its corpus
+        does not exist.
+        """
+        conn = db_settings.get_db_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                SELECT c."embeddingModel", c."vectorStorage"
+                FROM "Documents" d
+                JOIN "Corpora" c ON c."corpusId" = d."corpusId"
+                WHERE d."documentId" = %s;
+                """,
+                (document_id,)
+            )
+            row = cur.fetchone()
+            return (row[0], row[1]) if row else (None, "full")
+        finally:
+            if conn:
+                conn.close()
+
+    @staticmethod
+    def _set_filtered_scan(cur):
+        """
+        Lets HNSW scans of a filtered search keep going until enough rows pass
+        the filter (pgvector >= 0.8), instead of filtering ef_search candidates
+        down to few or no results. Callers order the results again.
+        """
+        if settings.HNSW_ITERATIVE_SCAN in ("strict_order", "relaxed_order"):
+            cur.execute("SET LOCAL hnsw.iterative_scan = %s;", (settings.HNSW_ITERATIVE_SCAN,))
+
+    @staticmethod
+    def _binary_search_sql(embedding_column, vector_type, dimension, filter_clauses=()):
+        # The ORDER BY expression has to match the expression index exactly
+        return f"""
+        WITH candidates AS (
+          SELECT dc."chunkId"
+          FROM "DocumentChunks" dc
+          JOIN "Documents" d ON d."documentId" = dc."documentId"
+          WHERE d."corpusId" = %s{"".join(" AND " + clause for clause in filter_clauses)}
+          ORDER BY binary_quantize(dc."{embedding_column}")::bit({int(dimension)})
+                   <~> binary_quantize(%s::{vector_type})
+          LIMIT %s
+        )
+        SELECT
+          dc."chunkId",
+          dc."documentId",
+          dc."chunkText",
+          dc."{embedding_column}" <=> %s::{vector_type} AS "rerankScore"
+        FROM candidates c
+        JOIN "DocumentChunks" dc ON dc."chunkId" = c."chunkId"
+        WHERE dc."{embedding_column}" <=> %s::{vector_type} < %s
+        ORDER BY "rerankScore"
+        LIMIT %s;
+        """
+
     def search_document_chunk(
         self,
         question_embedding: List[float],
         top_k: int,
-        corpus_key: str,
-        threshold: float
+        corpus_id: str,
+        threshold: float,
+        embedding_column: str = "embeddingData",
+        vector_type: str = "vector",
+        binary_candidates: int = 0,
+        dimension: Optional[int] = None,
+        filters: Optional[dict] = None
     ) -> Union[List[DocumentChunk], dict]:
         """
         Finds the top_k most similar chunks in a corpus to the question_embedding,
-        then optionally reranks them by a semantic reranker if question_text exists.
+        ordered by cosine distance. Reranking is up to the caller
+        (services/rerank_stage.py), which has the question text.
+
+        embedding_column is the column of the corpus's embedding space (from
+        services.embedding_registry); question_embedding must belong to it.
+
+        With binary_candidates set (compressed corpora), the binary-quantized
+        index first returns that many candidates by hamming distance, which are
+        then rescored with the exact cosine distance of the halfvec column.
+
+        filters (models/filters.py) restrict the search to matching chunks.
         """
-        logger.info(f"Searching document chunks in corpus '{corpus_key}' with threshold {threshold}")
+        logger.info(f"Searching document chunks in corpus '{corpus_id}' with threshold {threshold}")
+        filter_clauses, filter_params = compile_filter(filters, "dc.")
         conn = db_settings.get_db_connection()
         try:
-            try:
-                with conn.cursor() as cur:
-                    cur.execute('SELECT "corpusId" FROM "Corpora" WHERE "corpusKey" = %s;', (corpus_key,))
-                    corpus_row = cur.fetchone()
-                    if not corpus_row:
-                        logger.warning(f"No corpus found for key: {corpus_key}")
-                        return {"results": "no corpus found"}
-                    
-                    corpus_id = corpus_row[0]
-                    
-                    cur.execute('SELECT "documentId" FROM "Documents" WHERE "corpusId" = %s;', (corpus_id,))
-                    document_ids = [row[0] for row in cur.fetchall()]
-                    if not document_ids:
-                        logger.warning(f"No documents found for corpus: {corpus_key}")
-                        return {"results": "no documents found"}
-            except Exception as e:
-                logger.error(f"Error getting corpus or documents: {e}")
-                return {"results": "error getting corpus data"}
-            
             try:
                 with conn.cursor(cursor_factory=RealDictCursor) as cur:
                     try:
-                        sql = """
+                        if filter_clauses:
+                            self._set_filtered_scan(cur)
+                        if binary_candidates:
+                            sql = self._binary_search_sql(embedding_column, vector_type, dimension, filter_clauses)
+                            # ef_search caps how many rows one HNSW scan can return
+                            cur.execute("SET LOCAL hnsw.ef_search = %s;", (min(1000, max(40, binary_candidates)),))
+                            params = (corpus_id, *filter_params, question_embedding, binary_candidates,
+                                      question_embedding, question_embedding, threshold, top_k)
+                        else:
+                            sql = f"""
                         WITH corpus_docs AS (
                           SELECT d."documentId"
                           FROM "Documents" d
@@ -204,37 +557,40 @@ class DocumentChunkModel:
                           dc."chunkId",
                           dc."documentId",
                           dc."chunkText",
-                          dc."embeddingData",
-                          dc."embeddingData" <=> %s::vector AS "rerankScore"
+                          dc."{embedding_column}" <=> %s::vector AS "rerankScore"
                         FROM "DocumentChunks" dc
                         JOIN corpus_docs cd ON dc."documentId" = cd."documentId"
                         WHERE
-                          dc."embeddingData" <=> %s::vector < %s
+                          {"".join(clause + " AND " for clause in filter_clauses)}dc."{embedding_column}" <=> %s::vector < %s
                         ORDER BY "rerankScore"
                         LIMIT %s;
                         """
+                            params = (corpus_id, question_embedding, *filter_params, question_embedding, threshold, top_k)
                         
-                        cur.execute(sql, (corpus_id, question_embedding, question_embedding, threshold, top_k))
+                        cur.execute(sql, params)
                         rows = cur.fetchall()
+                        for row in rows:
+                            row["distance"] = row["rerankScore"]
                         logger.info(f"Vector search found {len(rows) if rows else 0} results")
                         
                     except Exception as vector_error:
                         logger.warning(f"Vector search failed: {vector_error}, trying fallback search")
                         
-                        fallback_sql = """
+                        conn.rollback()
+                        fallback_sql = f"""
                         SELECT
                           dc."chunkId",
                           dc."documentId",
                           dc."chunkText",
-                          dc."embeddingData",
                           0.5 AS "rerankScore"  -- Default score for fallback results
                         FROM "DocumentChunks" dc
-                        WHERE dc."documentId" = ANY(%s)
+                        JOIN "Documents" d ON d."documentId" = dc."documentId"
+                        WHERE d."corpusId" = %s{"".join(" AND " + clause for clause in filter_clauses)}
                         ORDER BY dc."createdAt" DESC
                         LIMIT %s;
                         """
                         
-                        cur.execute(fallback_sql, (document_ids, top_k))
+                        cur.execute(fallback_sql, (corpus_id, *filter_params, top_k))
                         rows = cur.fetchall()
                         logger.info(f"Fallback search found {len(rows) if rows else 0} results")
                     
@@ -242,31 +598,6 @@ class DocumentChunkModel:
                         logger.warning("No matching chunks found")
                         return {"results": "no matching chunks"}
                     
-                    try:
-                        # only attempt reranking if we have the question text
-                        with conn.cursor() as rerank_cur:
-                            rerank_cur.execute('SELECT "questionText" FROM "Questions" WHERE "questionEmbedding" = %s::vector LIMIT 1;', 
-                                              (question_embedding,))
-                            question_row = rerank_cur.fetchone()
-                            
-                            if question_row and question_row[0]:
-                                question_text = question_row[0]
-                                logger.info("Found question text, attempting reranking")
-                                
-                                for row in rows:
-                                    try:
-                                        rerank_cur.execute('SELECT rag_jina_reranker_v1_tiny_en.rerank_distance(%s, %s);', 
-                                                         (question_text, row["chunkText"]))
-                                        rerank_score = rerank_cur.fetchone()[0]
-                                        row["rerankScore"] = rerank_score
-                                    except Exception as rerank_error:
-                                        logger.warning(f"Individual reranking failed: {rerank_error}")
-                                
-                                rows = sorted(rows, key=lambda x: x["rerankScore"])
-                                logger.info("Successfully reranked results")
-                    except Exception as rerank_error:
-                        logger.warning(f"Reranking process failed: {rerank_error}")
-                    
                     return [DocumentChunk(**row) for row in rows]
                     
             except Exception as search_error:
@@ -279,3 +610,203 @@ class DocumentChunkModel:
         finally:
             if conn:
                 conn.close()
+
+    @staticmethod
+    def _vector_literal(embedding) -> str:
+        return embedding if isinstance(embedding, str) else "[" + ",".join(map(str, embedding)) + "]"
+
+    @staticmethod
+    def _nearest_chunks_sql(embedding_column, binary_candidates=0, dimension=None, corpus="%s", limit="%s",
+                            filter_clauses=(), with_vectors=False):
+        """
+        The nearest chunks of one corpus to q.embedding closer than a threshold,
+        as the subquery of a LATERAL join. corpus and limit are SQL expressions,
+        placeholders by default. The placeholders are, in order: corpus, the
+        filter params, the binary candidate count (binary_candidates only), the
+        threshold and limit. with_vectors also returns each chunk's vector as a
+        real[] "embedding".
+        """
+        distance = f'dc."{embedding_column}" <=> q.embedding'
+        filtered = "".join(" AND " + clause for clause in filter_clauses)
+        vector = f', dc."{embedding_column}"::real[] AS "embedding"' if with_vectors else ""
+        if binary_candidates:
+            return f"""
+              SELECT c."chunkId", c."documentId", c."chunkIndex", c."chunkText",
+                     c.distance AS "rerankScore"{', c."embedding"' if with_vectors else ""}
+              FROM (
+                SELECT dc."chunkId", dc."documentId", dc."chunkIndex", dc."chunkText",
+                       {distance} AS distance{vector}
+                FROM "DocumentChunks" dc
+                JOIN "Documents" d ON d."documentId" = dc."documentId"
+                WHERE d."corpusId" = {corpus}{filtered}
+                ORDER BY binary_quantize(dc."{embedding_column}")::bit({int(dimension)})
+                         <~> binary_quantize(q.embedding)
+                LIMIT %s
+              ) c
+              WHERE c.distance < %s
+              ORDER BY c.distance
+              LIMIT {limit}
+            """
+        return f"""
+              SELECT dc."chunkId", dc."documentId", dc."chunkIndex", dc."chunkText",
+                     {distance} AS "rerankScore"{vector}
+              FROM "DocumentChunks" dc
+              JOIN "Documents" d ON d."documentId" = dc."documentId"
+              WHERE d."corpusId" = {corpus}{filtered} AND {distance} < %s
+              ORDER BY {distance}
+              LIMIT {limit}
+            """
+
+    def search_document_chunks_batch(
+        self,
+        question_embeddings: List[List[float]],
+        top_k: int,
+        corpus_id: str,
+        threshold: float,
+        embedding_column: str = "embeddingData",
+        vector_type: str = "vector",
+        binary_candidates: int = 0,
+        dimension: Optional[int] = None,
+        filters: Optional[dict] = None
+    ) -> Union[List[List[DocumentChunk]], dict]:
+        """
+        Runs the search of search_document_chunk for several question embeddings
+        in a single statement: the questions are unnested and each one drives a
+        LATERAL index scan, so the whole batch costs one connection and one round trip.
+
+        Returns one list of chunks per question, in question order, or an error dict.
+        """
+        try:
+            filter_clauses, filter_params = compile_filter(filters, "dc.")
+        except ValueError as e:
+            return {"error": str(e), "status_code": 400}
+        hits = self._nearest_chunks_sql(embedding_column, binary_candidates, dimension, filter_clauses=filter_clauses)
+        if binary_candidates:
+            params = (corpus_id, *filter_params, binary_candidates, threshold, top_k)
+        else:
+            params = (corpus_id, *filter_params, threshold, top_k)
+
+        sql = f"""
+        WITH questions AS (
+          SELECT q.ord - 1 AS "questionIndex", q.embedding::{vector_type} AS embedding
+          FROM unnest(%s::text[]) WITH ORDINALITY AS q(embedding, ord)
+        )
+        SELECT q."questionIndex", hit.*
+        FROM questions q
+        CROSS JOIN LATERAL ({hits}) hit
+        ORDER BY q."questionIndex", hit."rerankScore";
+        """
+        vectors = [self._vector_literal(embedding) for embedding in question_embeddings]
+
+        conn = db_settings.get_db_connection()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                if filter_clauses:
+                    self._set_filtered_scan(cur)
+                if binary_candidates:
+                    cur.execute("SET LOCAL hnsw.ef_search = %s;", (min(1000, max(40, binary_candidates)),))
+                cur.execute(sql, (vectors, *params))
+                rows = cur.fetchall()
+            conn.rollback()
+
+            results = [[] for _ in question_embeddings]
+            for row in rows:
+                results[row.pop("questionIndex")].append(DocumentChunk(**row, distance=row["rerankScore"]))
+            logger.info(f"Batch vector search found {len(rows)} results for {len(vectors)} questions")
+            return results
+        except Exception as e:
+            logger.error(f"search_document_chunks_batch error: {e}")
+            return {"error": str(e), "status_code": 500}
+        finally:
+            if conn:
+                conn.close()
+
+    def get_corpora_by_keys(self, corpus_keys):
+        """
+        Returns the id, embedding model and vector storage of the corpora with the
+        given keys in one query, as a dict keyed by corpus key. Unknown keys are missing.
+        """
+        conn = db_settings.get_db_connection()
+        try:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(
+                '''
+                SELECT "corpusKey", "corpusId", "embeddingModel", "vectorStorage"
+                FROM "Corpora" WHERE "corpusKey" = ANY(%s);
+                ''',
+                (list(corpus_keys),)
+            )
+            return {"results": {row.pop("corpusKey"): row for row in cur.fetchall()}}
+        except Exception as e:
+            logger.error(f"An error occurred in get_corpora_by_keys: {e}")
+            return {"error": str(e), "status_code": 500}
+        finally:
+            if conn:
+                conn.close()
+
+    def search_document_chunks_multi(
+        self,
+        question_embedding: List[float],
+        corpus_limits: List[tuple],
+        threshold: float,
+        embedding_column: str = "embeddingData",
+        vector_type: str = "vector",
+        binary_candidates: int = 0,
+        dimension: Optional[int] = None,
+        filters: Optional[dict] = None,
+        with_vectors: bool = False
+    ) -> Union[List[DocumentChunk], dict]:
+        """
+        Searches several corpora of the same embedding space and storage for one
+        question in a single statement, each corpus driving its own LATERAL index
+        scan limited to its own number of chunks.
+
+        corpus_limits is a list of (corpus id, limit). Returns the chunks of all
+        the corpora with their corpusId, closest first, or an error dict.
+        with_vectors also loads the chunks' embeddings (for MMR).
+        """
+        try:
+            filter_clauses, filter_params = compile_filter(filters, "dc.")
+        except ValueError as e:
+            return {"error": str(e), "status_code": 400}
+        hits = self._nearest_chunks_sql(
+            embedding_column, binary_candidates, dimension, corpus='c."corpusId"', limit='c."limit"',
+            filter_clauses=filter_clauses, with_vectors=with_vectors
+        )
+        sql = f"""
+        WITH q AS (SELECT %s::{vector_type} AS embedding),
+        corpora AS (
+          SELECT * FROM unnest(%s::char(32)[], %s::int[]) AS c("corpusId", "limit")
+        )
+        SELECT c."corpusId", hit.*
+        FROM corpora c
+        CROSS JOIN q
+        CROSS JOIN LATERAL ({hits}) hit
+        ORDER BY hit."rerankScore";
+        """
+        params = [
+            self._vector_literal(question_embedding),
+            [corpus_id for corpus_id, _ in corpus_limits],
+            [limit for _, limit in corpus_limits],
+        ]
+        params += filter_params
+        params += [binary_candidates, threshold] if binary_candidates else [threshold]
+
+        conn = db_settings.get_db_connection()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                if filter_clauses:
+                    self._set_filtered_scan(cur)
+                if binary_candidates:
+                    cur.execute("SET LOCAL hnsw.ef_search = %s;", (min(1000, max(40, binary_candidates)),))
+                cur.execute(sql, params)
+                rows = cur.fetchall()
+            conn.rollback()
+            logger.info(f"Multi-corpus vector search found {len(rows)} results in {len(corpus_limits)} corpora")
+            return [DocumentChunk(**row, distance=row["rerankScore"]) for row in rows]
+        except Exception as e:
+            logger.error(f"search_document_chunks_multi error: {e}")
+            return {"error": str(e), "status_code": 500}
+        finally:
+            if conn:
+                conn.close()
@@ -2,12 +2,27 @@ from core.db import settings
 import logging
 import psycopg2
 import json
+from models.pagination import Keyset, stream_rows
+from models.projection import select_list
+
+DOCUMENT_COLUMNS = (
+    "documentId", "userId", "corpusId", "docType", "docName", "sourceUrl", "fulltext", "createdAt", "updatedAt",
+)
+# Only returned when asked for explicitly
+HEAVY_DOCUMENT_COLUMNS = ("fulltext",)
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 class DocumentsModel:
-    def get_documents(self, where_conditions=None):
+    def get_documents(self, where_conditions=None, fields=None, limit=None, after=None, order="id", stream=False):
+        try:
+            keyset = Keyset("documentId", limit, after, order)
+            columns = select_list(DOCUMENT_COLUMNS, fields, HEAVY_DOCUMENT_COLUMNS,
+                                  required=keyset.columns if keyset.active else ())
+        except ValueError as e:
+            return {"error": str(e), "status_code": 400}
+
         conn = settings.get_db_connection()  
         try:
             if conn is None:
@@ -16,8 +31,8 @@ class DocumentsModel:
                 
             cur = conn.cursor()
             
-            query = 'SELECT * FROM "Documents"'
-            params = []
+            query = f'SELECT {columns} FROM "Documents"'
+            where_clauses, params = keyset.where()
             
             # Add WHERE clause if conditions are provided
             if where_conditions:
@@ -26,7 +41,6 @@ class DocumentsModel:
                     return {"error": "Where conditions must be a dictionary", "status_code": 400}
                 
                 try:
-                    where_clauses = []
                     for key, value in where_conditions.items():
                         # Check if this is a JSON path query (key contains '.')
                         if '.' in key:
@@ -82,13 +96,16 @@ class DocumentsModel:
                             else:
                                 logger.warning(f"Ignoring invalid column name: {key}")
                     
-                    if where_clauses:
-                        query += " WHERE " + " AND ".join(where_clauses)
                 except Exception as e:
                     logger.error(f"Error processing where conditions: {e}")
                     return {"error": f"Invalid where conditions: {str(e)}", "status_code": 400}
             
+            if where_clauses:
+                query += " WHERE " + " AND ".join(where_clauses)
+            query += keyset.order_by(stream)
             query += ";"
+            if stream:
+                return {"results": stream_rows(query, params)}
             logger.info(f"Executing query: {query} with params: {params}")
             
             cur.execute(query, params)
@@ -103,6 +120,9 @@ class DocumentsModel:
                     row_dict[col.name] = row[i]
                 formatted_result.append(row_dict)
                 
+            formatted_result, next_after = keyset.page(formatted_result)
+            if keyset.active:
+                return {"results": formatted_result, "next_after": next_after}
             return {"results": formatted_result}
             
         except psycopg2.OperationalError as e:
@@ -152,7 +172,8 @@ class DocumentsModel:
                 return {"error": "Missing docId for update."}
 
             set_clause = ', '.join([f'"{key}" = %s' for key in document_data_input.keys()])
-            query = f'UPDATE "Documents" SET {set_clause} WHERE "documentId" = %s RETURNING *;'
+            returning = select_list(DOCUMENT_COLUMNS, None, HEAVY_DOCUMENT_COLUMNS)
+            query = f'UPDATE "Documents" SET {set_clause} WHERE "documentId" = %s RETURNING {returning};'
             params = tuple(document_data_input.values()) + (docId,)  # Combine values with docId
             cur.execute(query, params)
             conn.commit()
@@ -212,7 +233,8 @@ class DocumentsModel:
             columns = ', '.join([f'"{key}"' for key in document_input_data.keys()]) 
             print("closs", columns)
             placeholders = ', '.join(['%s'] * len(document_input_data))
-            query = f'INSERT INTO "Documents" ({columns}) VALUES ({placeholders}) RETURNING *;'
+            returning = select_list(DOCUMENT_COLUMNS, None, HEAVY_DOCUMENT_COLUMNS)
+            query = f'INSERT INTO "Documents" ({columns}) VALUES ({placeholders}) RETURNING {returning};'
             cur.execute(query, tuple(document_input_data.values()))
             row = cur.fetchone()
             conn.commit()
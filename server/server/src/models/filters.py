@@ -0,0 +1,90 @@
+import json
+from datetime import datetime
+from typing import Optional
+
+from psycopg2.extras import Json
+
+RANGE_OPERATORS = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+FILTER_KEYS = ("contains", "anyOf", "createdAt", "docType")
+
+
+def parse_filter(filter_str: Optional[str]) -> Optional[dict]:
+    """
+    Parses the JSON filter query parameter. Returns None when no filter was given.
+
+    Raises:
+    - ValueError: If the filter is not a JSON object.
+    """
+    if not filter_str:
+        return None
+    try:
+        filters = json.loads(filter_str)
+    except json.JSONDecodeError:
+        raise ValueError("Invalid JSON in filter parameter")
+    if not isinstance(filters, dict):
+        raise ValueError("Filter must be a JSON object")
+    return filters
+
+
+def compile_filter(filters: Optional[dict], alias: str = ""):
+    """
+    Compiles a chunk filter into (clauses, params) to AND into a WHERE clause
+    on "DocumentChunks" (prefixed by alias, e.g. 'dc.').
+
+    Filter keys:
+    - contains: metaData contains this JSON, e.g. {"domain_specific": ["Finance"]}
+    - anyOf: metaData contains at least one of these JSON objects
+    - createdAt: range of the chunk creation time, {"gte"|"gt"|"lte"|"lt": ISO timestamp}
+    - docType: document type of the chunk, a string or a list of strings
+
+    Metadata conditions compile to "metaData" @> predicates (OR-ed for anyOf),
+    which DocumentChunks_metaData_gin_idx answers.
+
+    Raises:
+    - ValueError: If the filter is malformed.
+    """
+    if not filters:
+        return [], []
+    unknown = [key for key in filters if key not in FILTER_KEYS]
+    if unknown:
+        raise ValueError(f"Unknown filter keys: {', '.join(unknown)}. Available keys: {', '.join(FILTER_KEYS)}")
+
+    column = f'{alias}"metaData"'
+    clauses, params = [], []
+
+    if "contains" in filters:
+        if not isinstance(filters["contains"], dict):
+            raise ValueError("filter.contains must be a JSON object")
+        clauses.append(f"{column} @> %s::jsonb")
+        params.append(Json(filters["contains"]))
+
+    if "anyOf" in filters:
+        options = filters["anyOf"]
+        if not isinstance(options, list) or not options or not all(isinstance(option, dict) for option in options):
+            raise ValueError("filter.anyOf must be a non-empty list of JSON objects")
+        clauses.append("(" + " OR ".join([f"{column} @> %s::jsonb"] * len(options)) + ")")
+        params.extend(Json(option) for option in options)
+
+    if "createdAt" in filters:
+        bounds = filters["createdAt"]
+        if not isinstance(bounds, dict) or not bounds or any(op not in RANGE_OPERATORS for op in bounds):
+            raise ValueError(f"filter.createdAt must map {', '.join(RANGE_OPERATORS)} to timestamps")
+        for op, value in bounds.items():
+            try:
+                timestamp = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"filter.createdAt.{op} must be an ISO timestamp, got {value!r}")
+            clauses.append(f'{alias}"createdAt" {RANGE_OPERATORS[op]} %s::timestamptz')
+            params.append(timestamp)
+
+    if "docType" in filters:
+        doc_types = filters["docType"]
+        doc_types = [doc_types] if isinstance(doc_types, str) else doc_types
+        if not isinstance(doc_types, list) or not doc_types or not all(isinstance(t, str) for t in doc_types):
+            raise ValueError("filter.docType must be a string or a list of strings")
+        clauses.append(
+            f'{alias}"documentId" IN (SELECT "documentId" FROM "Documents" WHERE "docType" = ANY(%s))'
+        )
+        params.append(doc_types)
+
+    return clauses, params
@@ -0,0 +1,112 @@
+import base64
+import json
+import uuid
+
+from psycopg2.extras import RealDictCursor
+
+from core.db import settings as db_settings
+from core.responses import dumps
+
+MAX_PAGE_SIZE = 1000
+EXPORT_FETCH_SIZE = 1000
+
+
+def encode_cursor(values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """
+    Raises:
+    - ValueError: If the cursor was not produced by encode_cursor for `size` key columns.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid pagination cursor")
+    return values
+
+
+class Keyset:
+    """
+    Keyset pagination over a table, ordered by its primary key ("id") or by
+    ("createdAt", primary key). Pages are read with an index range scan
+    starting after the last row of the previous page, so the cost of a page
+    does not grow with its position like OFFSET does.
+
+    Without limit and after the query is left untouched.
+    """
+    ORDERS = ("id", "createdAt")
+
+    def __init__(self, primary_key: str, limit: int = None, after: str = None, order: str = "id"):
+        if order not in self.ORDERS:
+            raise ValueError(f"Unknown order '{order}'. Must be one of: {', '.join(self.ORDERS)}")
+        if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        self.limit = limit
+        self.columns = (primary_key,) if order == "id" else ("createdAt", primary_key)
+        self.after = decode_cursor(after, len(self.columns)) if after else None
+
+    @property
+    def active(self) -> bool:
+        return self.limit is not None or self.after is not None
+
+    def where(self):
+        """
+        Returns the (clauses, params) restricting the query to rows after the cursor.
+        """
+        if self.after is None:
+            return [], []
+        columns = ", ".join(f'"{column}"' for column in self.columns)
+        placeholders = ", ".join(["%s"] * len(self.columns))
+        return [f"({columns}) > ({placeholders})"], list(self.after)
+
+    def order_by(self, stream: bool = False) -> str:
+        """
+        The ORDER BY and LIMIT of a page. A streamed page has no next cursor, so
+        it does not read the extra row page() uses to detect one.
+        """
+        if not self.active:
+            return ""
+        clause = " ORDER BY " + ", ".join(f'"{column}"' for column in self.columns)
+        if self.limit is not None:
+            # one extra row tells whether there is a next page
+            clause += f" LIMIT {self.limit if stream else self.limit + 1}"
+        return clause
+
+    def page(self, rows):
+        """
+        Trims the extra row and returns (rows, cursor of the next page or None).
+        """
+        if self.limit is None or len(rows) <= self.limit:
+            return rows, None
+        rows = rows[:self.limit]
+        return rows, encode_cursor([rows[-1][column] for column in self.columns])
+
+
+def stream_rows(query: str, params, fetch_size: int = EXPORT_FETCH_SIZE):
+    """
+    Yields the rows of query as dicts through a server-side (named) cursor,
+    fetching fetch_size rows at a time so memory stays flat whatever the
+    result size. The connection is held until the generator is exhausted or closed.
+    """
+    conn = db_settings.get_db_connection()
+    try:
+        with conn.cursor(name=f"export_{uuid.uuid4().hex}", cursor_factory=RealDictCursor) as cur:
+            cur.itersize = fetch_size
+            cur.execute(query, params)
+            for row in cur:
+                yield row
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def ndjson_lines(rows):
+    """
+    Serializes rows as newline delimited JSON, one encoded line per row.
+    """
+    for row in rows:
+        yield dumps(row) + b"\n"
@@ -0,0 +1,39 @@
+from typing import Iterable, List, Optional, Sequence
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Turns a comma separated fields query parameter into a list of column
+    names. Returns None when no fields were given.
+    """
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+
+def select_list(columns: Sequence[str], fields: Optional[Iterable[str]] = None,
+                heavy_columns: Sequence[str] = (), required: Sequence[str] = ()) -> str:
+    """
+    Builds the column list of a SELECT (or RETURNING) clause.
+
+    Parameters:
+    - columns: Every column of the table, in table order.
+    - fields: The requested columns. None returns every column except
+      heavy_columns, ["*"] returns every column.
+    - heavy_columns: Columns left out unless explicitly requested (embeddings, full texts).
+    - required: Columns always returned, e.g. the keys of a pagination cursor.
+
+    Raises:
+    - ValueError: If a requested field is not a column of the table.
+    """
+    if fields is None:
+        selected = [column for column in columns if column not in heavy_columns]
+    elif list(fields) == ["*"]:
+        selected = list(columns)
+    else:
+        unknown = [field for field in fields if field not in columns]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available fields: {', '.join(columns)}")
+        selected = list(dict.fromkeys([*fields, *required]))
+
+    return ", ".join(f'"{column}"' for column in selected)
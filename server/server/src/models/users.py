@@ -1,13 +1,26 @@
 from core.db import settings
 import logging
 import psycopg2
+from models.pagination import Keyset, stream_rows
+from models.projection import select_list
+
+USER_COLUMNS = (
+    "userId", "username", "email", "passwordHash", "createdAt", "updatedAt",
+)
 
 # Configure logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 class UserModel:
-    def get_users(self, where_conditions=None):
+    def get_users(self, where_conditions=None, fields=None, limit=None, after=None, order="id", stream=False):
+        try:
+            keyset = Keyset("userId", limit, after, order)
+            columns = select_list(USER_COLUMNS, fields,
+                                  required=keyset.columns if keyset.active else ())
+        except ValueError as e:
+            return {"error": str(e), "status_code": 400}
+
         conn = settings.get_db_connection()  
         try:
             if conn is None:
@@ -16,8 +29,8 @@ class UserModel:
                 
             cur = conn.cursor()
             
-            query = 'SELECT * FROM "Users"'
-            params = []
+            query = f'SELECT {columns} FROM "Users"'
+            where_clauses, params = keyset.where()
             print(where_conditions)
             # Add WHERE clause if conditions are provided
             if where_conditions:
@@ -25,7 +38,6 @@ class UserModel:
                     logger.error(f"Invalid where_conditions format: {where_conditions}")
                     return {"error": "Where conditions must be a dictionary", "status_code": 400}
                 
-                where_clauses = []
                 for key, value in where_conditions.items():
                     # Ensure the column name is valid to prevent SQL injection
                     if key in ["userId", "username", "email"]:
@@ -33,17 +45,22 @@ class UserModel:
                         params.append(value)
                     else:
                         logger.warning(f"Ignoring invalid column name in where condition: {key}")
-                
-                if where_clauses:
-                    query += " WHERE " + " AND ".join(where_clauses)
             
+            if where_clauses:
+                query += " WHERE " + " AND ".join(where_clauses)
+            query += keyset.order_by(stream)
             query += ";"
+            if stream:
+                return {"results": stream_rows(query, params)}
             logger.info(f"Executing query: {query} with params: {params}")
             
             cur.execute(query, params)
             result = cur.fetchall()
             logger.info(f"get_users result: {len(result)} records")
-            return {"results": [dict(zip([desc[0] for desc in cur.description], row)) for row in result]}
+            results, next_after = keyset.page([dict(zip([desc[0] for desc in cur.description], row)) for row in result])
+            if keyset.active:
+                return {"results": results, "next_after": next_after}
+            return {"results": results}
         except psycopg2.OperationalError as e:
             logger.error(f"Database operational error in get_users: {e}")
             return {"error": "Database connection error", "status_code": 503}
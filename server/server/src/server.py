@@ -1,15 +1,35 @@
 from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
 from api.routes import router as api_router
 from scalar_fastapi import get_scalar_api_reference
+from core.config import settings
 from core.db import settings as db_settings
 import logging
 
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = FastAPI(title="RAG-ify", openapi_url="/openapi.json", debug=False)
 
+# Compress responses above the size threshold, brotli when the client accepts it
+# and brotli-asgi is installed, gzip otherwise
+if settings.RESPONSE_COMPRESSION:
+    if BrotliMiddleware is not None:
+        app.add_middleware(
+            BrotliMiddleware,
+            quality=settings.RESPONSE_BROTLI_QUALITY,
+            minimum_size=settings.RESPONSE_COMPRESSION_MIN_BYTES,
+            gzip_fallback=True,
+        )
+    else:
+        app.add_middleware(GZipMiddleware, minimum_size=settings.RESPONSE_COMPRESSION_MIN_BYTES)
+
 app.include_router(api_router, prefix="/api/v1")
 
 router = app.router
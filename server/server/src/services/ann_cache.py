@@ -0,0 +1,300 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+
+from core.config import settings
+from models.document_chunk import DocumentChunkModel
+
+# hnswlib is only needed for corpora of ANN_CACHE_HNSW_MIN_CHUNKS chunks or more
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+logger = logging.getLogger(__name__)
+
+documents_data = DocumentChunkModel()
+
+# updatedAt is the start of the writing transaction, so a refresh also re-reads
+# the rows of transactions that started shortly before the watermark but
+# committed after it; re-applying a row is harmless
+_WATERMARK_OVERLAP = timedelta(seconds=60)
+# rough per-chunk cost of the chunk id list and lookup dict
+_ID_BYTES = 120
+
+
+def _normalized(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+class CorpusIndex:
+    """
+    The vectors of one corpus in one embedding column, held in memory.
+
+    Vectors are L2-normalized so cosine distance is 1 - dot product. Small
+    corpora are a NumPy matrix searched exactly with one matrix-vector product;
+    with hnsw (corpora of ANN_CACHE_HNSW_MIN_CHUNKS chunks or more when hnswlib
+    is installed) they live in an HNSW graph instead. Chunks are upserted in
+    place, deletions need a full reload.
+    """
+
+    def __init__(self, corpus_id: str, column: str, dimension: int, hnsw: bool = False, capacity: int = 1024):
+        self.corpus_id = corpus_id
+        self.column = column
+        self.dimension = dimension
+        self.chunk_ids = []
+        self.rows = {}
+        self.watermark = None
+        self.refreshed_at = 0.0
+        self._lock = threading.Lock()
+        capacity = max(capacity, 16)
+        if hnsw:
+            self._graph = hnswlib.Index(space="cosine", dim=dimension)
+            self._graph.init_index(
+                max_elements=capacity, M=settings.ANN_CACHE_HNSW_M,
+                ef_construction=settings.ANN_CACHE_HNSW_EF_CONSTRUCTION
+            )
+            self._vectors = None
+        else:
+            self._graph = None
+            self._vectors = np.empty((capacity, dimension), dtype=np.float32)
+
+    @property
+    def backend(self) -> str:
+        return "hnsw" if self._graph is not None else "numpy"
+
+    @property
+    def size(self) -> int:
+        return len(self.chunk_ids)
+
+    def nbytes(self) -> int:
+        if self._graph is not None:
+            per_chunk = self.dimension * 4 + settings.ANN_CACHE_HNSW_M * 2 * 4 + 16
+            return self._graph.get_max_elements() * per_chunk + self.size * _ID_BYTES
+        return self._vectors.nbytes + self.size * _ID_BYTES
+
+    def _reserve(self, size: int):
+        if self._graph is not None:
+            if size > self._graph.get_max_elements():
+                self._graph.resize_index(max(size, self._graph.get_max_elements() * 2))
+        elif size > len(self._vectors):
+            grown = np.empty((max(size, len(self._vectors) * 2), self.dimension), dtype=np.float32)
+            grown[:len(self._vectors)] = self._vectors
+            self._vectors = grown
+
+    def upsert(self, chunk_ids, vectors, watermark=None):
+        """
+        Adds the chunks, or replaces the vectors of those already indexed, and
+        moves the watermark to the last updatedAt applied.
+        """
+        if len(chunk_ids):
+            vectors = _normalized(vectors)
+            with self._lock:
+                rows = []
+                for chunk_id in chunk_ids:
+                    row = self.rows.get(chunk_id)
+                    if row is None:
+                        row = self.rows[chunk_id] = len(self.chunk_ids)
+                        self.chunk_ids.append(chunk_id)
+                    rows.append(row)
+                self._reserve(self.size)
+                if self._graph is not None:
+                    self._graph.add_items(vectors, np.asarray(rows))
+                else:
+                    self._vectors[rows] = vectors
+        if watermark is not None:
+            self.watermark = watermark
+
+    def search(self, question_embedding, top_k: int, threshold: float, with_vectors: bool = False):
+        """
+        The top_k chunks closer than threshold (cosine distance), closest first,
+        as (chunkId, distance, vector or None) tuples.
+        """
+        query = _normalized(question_embedding)
+        with self._lock:
+            size = self.size
+            k = min(top_k, size)
+            if k <= 0:
+                return []
+            if self._graph is not None:
+                self._graph.set_ef(max(settings.ANN_CACHE_HNSW_EF_SEARCH, k))
+                labels, distances = self._graph.knn_query(query, k=k)
+                rows, distances = labels[0], distances[0]
+                vectors = self._graph.get_items(rows) if with_vectors else None
+            else:
+                scores = self._vectors[:size] @ query
+                rows = np.argpartition(-scores, k - 1)[:k] if k < size else np.arange(size)
+                rows = rows[np.argsort(-scores[rows])]
+                distances = 1.0 - scores[rows]
+                vectors = self._vectors[rows] if with_vectors else None
+            chunk_ids = [self.chunk_ids[row] for row in rows]
+
+        return [
+            (chunk_id, float(distance), None if vectors is None else np.asarray(vectors[i]).tolist())
+            for i, (chunk_id, distance) in enumerate(zip(chunk_ids, distances))
+            if distance < threshold
+        ]
+
+
+class ANNCache:
+    """
+    In-process vector indexes of hot corpora (ANN_CACHE_CORPORA), so their
+    nearest neighbour search skips the round trip to Postgres.
+
+    An index is loaded in the background on the first search of its corpus,
+    which (like every search before the index is ready) falls back to Postgres.
+    Searches of an index older than ANN_CACHE_REFRESH_SECONDS schedule an
+    incremental refresh that only reads the chunks updated since the index's
+    updatedAt watermark; when the chunk count then differs from the corpus's,
+    chunks were deleted and the index is reloaded. The least recently searched
+    indexes are evicted to keep all of them under ANN_CACHE_MEMORY_MB.
+    """
+
+    def __init__(self, corpus_keys: str = None, memory_mb: float = None):
+        corpus_keys = settings.ANN_CACHE_CORPORA if corpus_keys is None else corpus_keys
+        self.corpus_keys = {key.strip() for key in corpus_keys.split(",") if key.strip()}
+        self.memory_budget = int((settings.ANN_CACHE_MEMORY_MB if memory_mb is None else memory_mb) * 1024 * 1024)
+        self._indexes = OrderedDict()
+        self._pending = set()
+        # chunk count of corpora too large for the budget, not loaded again until it changes
+        self._oversized = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ann-cache")
+        self._counters = {"hits": 0, "misses": 0, "loads": 0, "refreshes": 0, "reloads": 0, "evictions": 0}
+
+    def enabled(self, corpus_key: str) -> bool:
+        return "*" in self.corpus_keys or corpus_key in self.corpus_keys
+
+    def search(self, corpus_key: str, corpus_id: str, column: str, dimension: int, question_embedding,
+               top_k: int, threshold: float, with_vectors: bool = False):
+        """
+        Searches the cached index of a hot corpus. Returns (chunkId, distance,
+        vector or None) tuples, closest first, or None when the corpus is not
+        cached (yet) and has to be searched in Postgres.
+        """
+        if not self.enabled(corpus_key):
+            return None
+        key = (corpus_id, column)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                self._counters["misses"] += 1
+                self._schedule(key, self._load, dimension)
+                return None
+            self._indexes.move_to_end(key)
+            self._counters["hits"] += 1
+            if time.monotonic() - index.refreshed_at >= settings.ANN_CACHE_REFRESH_SECONDS:
+                self._schedule(key, self._refresh, index)
+        return index.search(question_embedding, top_k, threshold, with_vectors)
+
+    def _schedule(self, key, job, *args):
+        # called with self._lock held
+        if key in self._pending:
+            return
+        self._pending.add(key)
+
+        def run():
+            try:
+                job(key, *args)
+            except Exception as e:
+                logger.error(f"ANN cache update of corpus {key[0]} ({key[1]}) failed: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+        self._executor.submit(run)
+
+    def _load(self, key, dimension):
+        corpus_id, column = key
+        count = documents_data.count_corpus_vectors(corpus_id, column)
+        if self._oversized.get(key) == count:
+            return
+        started = time.perf_counter()
+        use_hnsw = hnswlib is not None and count >= settings.ANN_CACHE_HNSW_MIN_CHUNKS
+        index = CorpusIndex(corpus_id, column, dimension, hnsw=use_hnsw, capacity=count)
+        self._apply(index, documents_data.get_corpus_vectors(corpus_id, column))
+        if index.nbytes() > self.memory_budget:
+            logger.warning(
+                f"ANN cache: corpus {corpus_id} ({index.size} chunks, {index.nbytes() / 2**20:.0f} MB) "
+                f"does not fit in ANN_CACHE_MEMORY_MB, it is searched in Postgres"
+            )
+            self._oversized[key] = count
+            with self._lock:
+                self._indexes.pop(key, None)
+            return
+        self._oversized.pop(key, None)
+        with self._lock:
+            self._counters["loads"] += 1
+            self._indexes[key] = index
+            self._indexes.move_to_end(key)
+            self._evict()
+        logger.info(
+            f"ANN cache: loaded {index.size} {column} vectors of corpus {corpus_id} ({index.backend}) "
+            f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+
+    def _refresh(self, key, index):
+        corpus_id, column = key
+        after = index.watermark - _WATERMARK_OVERLAP if index.watermark else None
+        self._apply(index, documents_data.get_corpus_vectors(corpus_id, column, updated_after=after))
+        with self._lock:
+            self._counters["refreshes"] += 1
+        if documents_data.count_corpus_vectors(corpus_id, column) != index.size:
+            with self._lock:
+                self._counters["reloads"] += 1
+            self._load(key, index.dimension)
+
+    @staticmethod
+    def _apply(index, rows, batch_size: int = 1000):
+        chunk_ids, vectors, watermark = [], [], None
+        for row in rows:
+            chunk_ids.append(row["chunkId"])
+            vectors.append(row["embedding"])
+            watermark = row["updatedAt"] or watermark
+            if len(chunk_ids) >= batch_size:
+                index.upsert(chunk_ids, vectors, watermark)
+                chunk_ids, vectors = [], []
+        index.upsert(chunk_ids, vectors, watermark)
+        index.refreshed_at = time.monotonic()
+
+    def _evict(self):
+        # called with self._lock held, the newest index is never evicted
+        total = sum(index.nbytes() for index in self._indexes.values())
+        while total > self.memory_budget and len(self._indexes) > 1:
+            key, index = self._indexes.popitem(last=False)
+            total -= index.nbytes()
+            self._counters["evictions"] += 1
+            logger.info(f"ANN cache: evicted corpus {key[0]} ({key[1]})")
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            indexes = [
+                {
+                    "corpusId": index.corpus_id,
+                    "column": index.column,
+                    "backend": index.backend,
+                    "chunks": index.size,
+                    "memory_mb": round(index.nbytes() / 2**20, 2),
+                    "watermark": index.watermark.isoformat() if index.watermark else None,
+                }
+                for index in self._indexes.values()
+            ]
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_rate"] = round(counters["hits"] / lookups, 4) if lookups else None
+        counters["memory_mb"] = round(sum(index["memory_mb"] for index in indexes), 2)
+        counters["memory_budget_mb"] = round(self.memory_budget / 2**20, 2)
+        counters["hnsw_available"] = hnswlib is not None
+        counters["indexes"] = indexes
+        return counters
+
+
+ann_cache = ANNCache()
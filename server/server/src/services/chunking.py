@@ -1,7 +1,326 @@
 from services.llm_services import llm_service
 import json
+import re
 from core.db import settings
 
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def chunk_with_llm(context: str, model: str = None):
+    """
+    Splits text into chunks by asking the LLM to do it.
+
+    Parameters:
+    - context: The text to split.
+    - model: Optional model overriding the auto-chunking LLM route.
+
+    Returns:
+    - List of {"chunk_number", "content"} dictionaries as returned by the LLM.
+    """
+    prompt = f"""Split the following text into chunks of approximately 200–300 words each. Each chunk should be numbered sequentially starting from 1. The output must be returned as a structured JSON array in the following format:
+
+    [
+      {{
+        "chunk_number": 1,
+        "content": "First chunk of the text here..."
+      }},
+      {{
+        "chunk_number": 2,
+        "content": "Second chunk of the text here..."
+      }}
+    ]
+
+    Make sure:
+    - Chunks do NOT break sentences mid-way.
+    - Logical flow is preserved.
+    - No extra commentary—just the raw JSON output.
+
+    Text: {context}
+    """
+
+    response = llm_service(prompt, model, context, caller="auto-chunking")
+
+    if not response or not response.strip():
+        raise ValueError("LLM returned an empty response.")
+
+    try:
+        return json.loads(response)
+    except json.JSONDecodeError:
+        raise ValueError(f"Invalid JSON from LLM: {response}")
+
+
+def chunk_with_pgrag(cur, context: str, chunk_size: int, chunk_overlap: int):
+    """
+    Splits text using pgRAG's token chunking, falling back to character chunking.
+
+    Parameters:
+    - cur: An open database cursor.
+    - context: The text to split.
+    - chunk_size: Approximate chunk size in characters.
+    - chunk_overlap: Approximate overlap in characters.
+
+    Returns:
+    - List of chunk strings.
+    """
+    # First try token-based chunking
+    query = "SELECT unnest(rag_bge_small_en_v15.chunks_by_token_count(%s, %s, %s));"
+    cur.execute(query, (context, chunk_size // 4, chunk_overlap // 4))  # Approximate tokens from characters
+    chunks = [row[0] for row in cur.fetchall()]
+    print(f"pgRAG chunking returned {len(chunks)} chunks.")
+
+    if not chunks:
+        # Fallback to character-based chunking
+        query = "SELECT unnest(rag.chunks_by_character_count(%s, %s, %s));"
+        cur.execute(query, (context, chunk_size, chunk_overlap))
+        chunks = [row[0] for row in cur.fetchall()]
+
+    return chunks
+
+
+def chunk_by_words(context: str, chunk_size: int, chunk_overlap: int):
+    """
+    Splits text into windows of chunk_size words overlapping by chunk_overlap words.
+
+    Parameters:
+    - context: The text to split.
+    - chunk_size: Number of words per chunk.
+    - chunk_overlap: Number of words shared by consecutive chunks.
+
+    Returns:
+    - List of chunk strings.
+    """
+    words = context.split()
+    chunks = []
+    start = 0
+
+    while start < len(words):
+        end = start + chunk_size
+        chunk_words = words[start:end]
+        chunk_text = " ".join(chunk_words)
+        chunks.append(chunk_text)
+
+        # Move start forward, allowing for overlap
+        start = end - chunk_overlap if end - chunk_overlap > start else end
+
+    return chunks
+
+
+def _split_long_text(text: str, chunk_size: int, chunk_overlap: int):
+    """
+    Splits a block that is larger than chunk_size characters at sentence
+    boundaries (or word boundaries for very long sentences), carrying the last
+    chunk_overlap characters of each piece into the next one.
+    """
+    pieces = []
+    current = ""
+    for sentence in _SENTENCE_END_RE.split(text):
+        while len(sentence) > chunk_size:
+            cut = sentence.rfind(" ", 0, chunk_size)
+            cut = cut if cut > 0 else chunk_size
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if current and len(current) + 1 + len(sentence) > chunk_size:
+            pieces.append(current)
+            tail = current[-chunk_overlap:] if chunk_overlap > 0 else ""
+            if tail and " " in tail:
+                tail = tail[tail.find(" ") + 1:]
+            current = f"{tail} {sentence}" if tail else sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _split_table(table: str, chunk_size: int):
+    """
+    Splits a markdown table larger than chunk_size by rows, repeating the header
+    and separator rows at the top of every piece so each piece stays readable.
+    """
+    lines = table.split("\n")
+    header = lines[:2] if len(lines) > 2 and set(lines[1].replace("|", "").strip()) <= set("-: ") else lines[:1]
+    header_text = "\n".join(header)
+    pieces = []
+    current = []
+    for row in lines[len(header):]:
+        candidate = len(header_text) + sum(len(r) + 1 for r in current) + len(row) + 1
+        if current and candidate > chunk_size:
+            pieces.append("\n".join([header_text] + current))
+            current = []
+        current.append(row)
+    if current or not pieces:
+        pieces.append("\n".join([header_text] + current))
+    return pieces
+
+
+def _parse_markdown_sections(context: str):
+    """
+    Groups markdown text into sections keyed by their heading path.
+
+    Returns a list of {"heading_path": [...], "blocks": [(kind, text), ...]}
+    where kind is "heading", "table", "code" or "text".
+    """
+    sections = [{"heading_path": [], "blocks": []}]
+    path = []
+    paragraph = []
+    table = []
+    code = []
+    in_code = False
+
+    def flush_paragraph():
+        if paragraph:
+            sections[-1]["blocks"].append(("text", "\n".join(paragraph).strip()))
+            paragraph.clear()
+
+    def flush_table():
+        if table:
+            sections[-1]["blocks"].append(("table", "\n".join(table)))
+            table.clear()
+
+    for line in context.splitlines():
+        stripped = line.strip()
+
+        if in_code:
+            code.append(line)
+            if stripped.startswith("```"):
+                sections[-1]["blocks"].append(("code", "\n".join(code)))
+                code.clear()
+                in_code = False
+            continue
+
+        if stripped.startswith("```"):
+            flush_paragraph()
+            flush_table()
+            in_code = True
+            code.append(line)
+            continue
+
+        if stripped.startswith("|"):
+            flush_paragraph()
+            table.append(stripped)
+            continue
+        flush_table()
+
+        heading = _HEADING_RE.match(stripped)
+        if heading:
+            flush_paragraph()
+            level = len(heading.group(1))
+            title = heading.group(2).strip("* ").strip()
+            path = path[:level - 1] + [title]
+            sections.append({"heading_path": list(path), "blocks": [("heading", stripped)]})
+            continue
+
+        if not stripped:
+            flush_paragraph()
+        else:
+            paragraph.append(stripped)
+
+    if code:
+        sections[-1]["blocks"].append(("code", "\n".join(code)))
+    flush_paragraph()
+    flush_table()
+
+    return [section for section in sections if section["blocks"]]
+
+
+def _common_prefix(paths):
+    prefix = list(paths[0]) if paths else []
+    for path in paths[1:]:
+        size = 0
+        while size < min(len(prefix), len(path)) and prefix[size] == path[size]:
+            size += 1
+        prefix = prefix[:size]
+    return prefix
+
+
+def chunk_by_structure(context: str, chunk_size: int, chunk_overlap: int):
+    """
+    Splits markdown text (e.g. pymupdf4llm output) along its heading hierarchy.
+
+    Each section becomes its own chunk; consecutive small sections are merged
+    until chunk_size characters, and oversized sections are split at table and
+    paragraph boundaries. Tables are never split mid-row.
+
+    Parameters:
+    - context: The markdown text to split.
+    - chunk_size: Maximum chunk size in characters.
+    - chunk_overlap: Overlap in characters used when a paragraph has to be split.
+
+    Returns:
+    - List of {"content", "metaData"} dictionaries, where metaData holds the
+      heading_path shared by the chunk and the sections it contains.
+    """
+    chunks = []
+    buffer = []
+    buffer_paths = []
+    buffer_has_table = False
+
+    def flush():
+        nonlocal buffer_has_table
+        if not buffer:
+            return
+        metadata = {"heading_path": _common_prefix(buffer_paths)}
+        sections = []
+        for path in buffer_paths:
+            if path and path not in sections:
+                sections.append(path)
+        if len(sections) > 1:
+            metadata["sections"] = [" > ".join(path) for path in sections]
+        if buffer_has_table:
+            metadata["contains_table"] = True
+        chunks.append({"content": "\n\n".join(buffer), "metaData": metadata})
+        buffer.clear()
+        buffer_paths.clear()
+        buffer_has_table = False
+
+    def add(text, path, is_table=False):
+        nonlocal buffer_has_table
+        size = sum(len(part) + 2 for part in buffer)
+        if buffer and size + len(text) > chunk_size:
+            flush()
+        buffer.append(text)
+        buffer_paths.append(path)
+        buffer_has_table = buffer_has_table or is_table
+
+    for section in _parse_markdown_sections(context):
+        path = section["heading_path"]
+        section_text = "\n\n".join(text for _, text in section["blocks"])
+
+        # Whole section fits: merge it with the previous small sections
+        if len(section_text) <= chunk_size:
+            add(section_text, path, any(kind == "table" for kind, _ in section["blocks"]))
+            continue
+
+        # Oversized section: start it on a fresh chunk and pack it block by block
+        flush()
+        for kind, text in section["blocks"]:
+            if len(text) <= chunk_size:
+                add(text, path, kind == "table")
+            elif kind == "table":
+                flush()
+                for piece in _split_table(text, chunk_size):
+                    add(piece, path, True)
+                    flush()
+            else:
+                # Keep the heading and any short lead-in attached to the first piece
+                if buffer and not buffer_has_table:
+                    text = "\n\n".join(buffer + [text])
+                    buffer.clear()
+                    buffer_paths.clear()
+                else:
+                    flush()
+                for piece in _split_long_text(text, chunk_size, chunk_overlap):
+                    add(piece, path)
+        flush()
+
+    flush()
+    return chunks
+
+
 def chunking(data: dict):
     try:
         context = data.get("text", "")
@@ -10,46 +329,13 @@ def chunking(data: dict):
 
         chunk_type = data.get("chunk_type", "manual")
         conn = settings.get_db_connection()
-        
+
         try:
             cur = conn.cursor()
-            
-            if chunk_type == "auto":
-                model = data.get("model")
-                if not model:
-                    raise ValueError("Model is required for LLM-based chunking.")
-
-                prompt = f"""Split the following text into chunks of approximately 200–300 words each. Each chunk should be numbered sequentially starting from 1. The output must be returned as a structured JSON array in the following format:
-
-                [
-                  {{
-                    "chunk_number": 1,
-                    "content": "First chunk of the text here..."
-                  }},
-                  {{
-                    "chunk_number": 2,
-                    "content": "Second chunk of the text here..."
-                  }}
-                ]
-
-                Make sure:
-                - Chunks do NOT break sentences mid-way.
-                - Logical flow is preserved.
-                - No extra commentary—just the raw JSON output.
-
-                Text: {context}
-                """
-
-                response = llm_service(prompt, model, context)
-
-                if not response or not response.strip():
-                    raise ValueError("LLM returned an empty response.")
 
-                try:
-                    parsed_response = json.loads(response)
-                    return parsed_response
-                except json.JSONDecodeError:
-                    raise ValueError(f"Invalid JSON from LLM: {response}")
+            if chunk_type == "auto":
+                # the request's model is ignored, the auto-chunking LLM route (LLM_ROUTES) picks the model
+                return chunk_with_llm(context)
 
             elif chunk_type == "manual":
                 chunk_size = data.get("chunk_size", 1000)
@@ -57,44 +343,33 @@ def chunking(data: dict):
 
                 if chunk_size is None or chunk_size <= 0:
                     raise ValueError("Chunk size must be provided and greater than zero for manual chunking.")
-                
+
                 # Use pgRAG's chunking by token count
                 try:
-                    # First try token-based chunking
-                    query = "SELECT unnest(rag_bge_small_en_v15.chunks_by_token_count(%s, %s, %s));"
-                    cur.execute(query, (context, chunk_size // 4, chunk_overlap // 4))  # Approximate tokens from characters
-                    chunks = [row[0] for row in cur.fetchall()]
-                    print(f"pgRAG chunking returned {len(chunks)} chunks.")
-                    
-                    if not chunks:
-                        # Fallback to character-based chunking
-                        query = "SELECT unnest(rag.chunks_by_character_count(%s, %s, %s));"
-                        cur.execute(query, (context, chunk_size, chunk_overlap))
-                        chunks = [row[0] for row in cur.fetchall()]
-                    
-                    return [{"chunk_number": i + 1, "content": chunk} for i, chunk in enumerate(chunks)]
-                    
+                    chunks = chunk_with_pgrag(cur, context, chunk_size, chunk_overlap)
                 except Exception as e:
                     print(f"pgRAG chunking failed: {str(e)}")
                     # Fallback to original implementation if pgRAG chunking fails
-                    words = context.split()
-                    chunks = []
-                    start = 0
+                    chunks = chunk_by_words(context, chunk_size, chunk_overlap)
 
-                    while start < len(words):
-                        end = start + chunk_size
-                        chunk_words = words[start:end]
-                        chunk_text = " ".join(chunk_words)
-                        chunks.append(chunk_text)
+                return [{"chunk_number": i + 1, "content": chunk} for i, chunk in enumerate(chunks)]
 
-                        # Move start forward, allowing for overlap
-                        start = end - chunk_overlap if end - chunk_overlap > start else end
+            elif chunk_type == "structured":
+                chunk_size = data.get("chunk_size", 1000)
+                chunk_overlap = data.get("chunk_overlap", 100)
 
-                    return [{"chunk_number": i + 1, "content": chunk} for i, chunk in enumerate(chunks)]
+                if chunk_size is None or chunk_size <= 0:
+                    raise ValueError("Chunk size must be provided and greater than zero for structured chunking.")
+
+                chunks = chunk_by_structure(context, chunk_size, chunk_overlap)
+                return [
+                    {"chunk_number": i + 1, "content": chunk["content"], "metaData": chunk["metaData"]}
+                    for i, chunk in enumerate(chunks)
+                ]
 
             else:
-                raise ValueError("Invalid chunk_type. Must be 'auto' or 'manual'.")
-                
+                raise ValueError("Invalid chunk_type. Must be 'auto', 'manual' or 'structured'.")
+
         finally:
             if conn:
                 conn.close()
@@ -0,0 +1,196 @@
+import logging
+import os
+import re
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+from core.config import settings
+
+# tokenizers is optional, token counts are estimated without it
+try:
+    from tokenizers import Tokenizer
+except ImportError:
+    Tokenizer = None
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_SEPARATOR = "\n\n\n"
+# words and punctuation marks, scaled to approximate subword tokens when no tokenizer is available
+_PIECES = re.compile(r"\w+|[^\w\s]")
+_TOKENS_PER_PIECE = 1.3
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+# blank lines, so markdown tables and lists stay whole
+_PARAGRAPH_END = re.compile(r"\n\s*\n")
+_WORD = re.compile(r"\w+")
+# below this many free tokens a truncated chunk is not worth adding
+_MIN_PARTIAL_TOKENS = 32
+
+_tokenizer = None
+_tokenizer_loaded = False
+_tokenizer_lock = threading.Lock()
+
+
+def _tokenizer_path() -> Optional[str]:
+    if settings.CONTEXT_TOKENIZER:
+        return settings.CONTEXT_TOKENIZER
+    if settings.LOCAL_EMBEDDING_MODEL_DIR:
+        path = os.path.join(settings.LOCAL_EMBEDDING_MODEL_DIR, "tokenizer.json")
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def get_tokenizer():
+    """
+    Returns the local tokenizer used to count context tokens (CONTEXT_TOKENIZER,
+    or the tokenizer.json of the local embedding model), or None when the
+    tokenizers package or the file is missing.
+    """
+    global _tokenizer, _tokenizer_loaded
+    with _tokenizer_lock:
+        if not _tokenizer_loaded:
+            _tokenizer_loaded = True
+            path = _tokenizer_path()
+            if Tokenizer is not None and path:
+                try:
+                    _tokenizer = Tokenizer.from_file(path)
+                    _tokenizer.no_truncation()
+                    _tokenizer.no_padding()
+                except Exception as e:
+                    logger.warning(f"Could not load tokenizer {path}, estimating token counts: {e}")
+        return _tokenizer
+
+
+def count_tokens(texts: Sequence[str]) -> List[int]:
+    """
+    Counts the tokens of each text, in one batch when a tokenizer is available.
+    """
+    if not texts:
+        return []
+    tokenizer = get_tokenizer()
+    if tokenizer is not None:
+        return [len(encoding.ids) for encoding in tokenizer.encode_batch(list(texts), add_special_tokens=False)]
+    return [int(len(_PIECES.findall(text)) * _TOKENS_PER_PIECE + 0.5) for text in texts]
+
+
+def _split(text: str, pattern) -> Tuple[List[str], List[str]]:
+    """
+    Splits text at pattern into its non-blank pieces and the separator
+    following each piece (empty for the last).
+    """
+    pieces, separators, start = [], [], 0
+    for match in pattern.finditer(text):
+        if text[start:match.start()].strip():
+            pieces.append(text[start:match.start()])
+            separators.append(match.group())
+        start = match.end()
+    if text[start:].strip():
+        pieces.append(text[start:])
+        separators.append("")
+    return pieces, separators
+
+
+def _join(pieces: List[str], separators: List[str], kept: List[int]) -> str:
+    """
+    Joins the kept pieces (indexes in text order), each with the separator it
+    had in the text before it.
+    """
+    return pieces[kept[0]] + "".join(separators[i - 1] + pieces[i] for i in kept[1:])
+
+
+def _normalize(sentence: str) -> str:
+    return " ".join(_WORD.findall(sentence.lower()))
+
+
+def _extract(question_words: set, sentences: List[str], sentence_tokens: List[int], budget: int) -> List[int]:
+    """
+    Extractive compression: the indexes of the sentences sharing the most words
+    with the question that fit in budget tokens, best first.
+    """
+    def overlap(i):
+        words = set(_WORD.findall(sentences[i].lower()))
+        return len(words & question_words) / (len(words) or 1)
+
+    kept, used = [], -1
+    for i in sorted(range(len(sentences)), key=lambda i: (-overlap(i), i)):
+        # one more token for the space joining it to the other sentences
+        if used + sentence_tokens[i] + 1 <= budget:
+            kept.append(i)
+            used += sentence_tokens[i] + 1
+    return kept
+
+
+def build_context(question: str, chunks: Sequence[Tuple], token_budget: int):
+    """
+    Packs the best chunks into a context of at most token_budget tokens.
+
+    chunks are (index, text, score) tuples, best first. Chunks that fit go in
+    as they are, minus the paragraphs already in the context (chunk overlaps,
+    repeated boilerplate). The chunk that no longer fits is compressed to its
+    sentences closest to the question, keeping the line breaks between them,
+    after which packing stops.
+
+    Returns (context, the chunks used with their packed text, stats).
+    """
+    question_words = set(_WORD.findall(question.lower()))
+    seen = set()
+    packed, used = [], 0
+    paragraphs_dropped = 0
+    sentences_dropped = 0
+    truncated = False
+
+    for chunk in chunks:
+        index, text, score = chunk[0], chunk[1], chunk[2]
+        paragraphs, separators = _split(text, _PARAGRAPH_END)
+        kept = []
+        for i, paragraph in enumerate(paragraphs):
+            key = _normalize(paragraph)
+            if key in seen:
+                paragraphs_dropped += 1
+                continue
+            seen.add(key)
+            kept.append(i)
+        if not kept:
+            continue
+        if len(kept) < len(paragraphs):
+            text = _join(paragraphs, separators, kept)
+
+        # counted with the context before it, token counts of pieces do not add up exactly
+        prefix = CONTEXT_SEPARATOR.join(packed_text for _, packed_text, _ in packed)
+        prefix += CONTEXT_SEPARATOR if packed else ""
+        tokens = count_tokens([prefix + text])[0]
+        if tokens > token_budget:
+            truncated = True
+            remaining = token_budget - count_tokens([prefix])[0] if prefix else token_budget
+            if remaining < _MIN_PARTIAL_TOKENS:
+                break
+            sentences, separators = _split(text, _SENTENCE_END)
+            sentence_tokens = count_tokens(sentences)
+            kept = _extract(question_words, sentences, sentence_tokens, remaining)
+            # the separators kept between the sentences may count for more than
+            # _extract allowed, drop the lowest-ranked sentences until the text fits
+            while kept:
+                text = _join(sentences, separators, sorted(kept))
+                tokens = count_tokens([prefix + text])[0]
+                if tokens <= token_budget:
+                    break
+                kept.pop()
+            sentences_dropped += len(sentences) - len(kept)
+            if not kept:
+                break
+
+        used = tokens
+        packed.append((index, text, score))
+        if truncated:
+            break
+
+    stats = {
+        "context_tokens": used,
+        "token_budget": token_budget,
+        "chunks_used": len(packed),
+        "chunks_dropped": len(chunks) - len(packed),
+        "paragraphs_dropped": paragraphs_dropped,
+        "sentences_dropped": sentences_dropped,
+        "tokenizer": "local" if get_tokenizer() is not None else "estimate",
+    }
+    return CONTEXT_SEPARATOR.join(text for _, text, _ in packed), packed, stats
@@ -0,0 +1,122 @@
+import copy
+from typing import List, Sequence
+
+import numpy as np
+
+# shortest shared text treated as chunk overlap when merging neighbours
+MIN_OVERLAP_CHARS = 16
+
+
+def _similarity_matrix(vectors: Sequence[Sequence[float]]) -> np.ndarray:
+    """
+    Cosine similarities between candidates. Candidates of different embedding
+    spaces (different dimensions, from a multi-corpus search) are not comparable
+    and count as unrelated.
+    """
+    n = len(vectors)
+    similarities = np.zeros((n, n), dtype=np.float32)
+    by_dimension = {}
+    for i, vector in enumerate(vectors):
+        by_dimension.setdefault(len(vector), []).append(i)
+    for indexes in by_dimension.values():
+        matrix = np.asarray([vectors[i] for i in indexes], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        similarities[np.ix_(indexes, indexes)] = matrix @ matrix.T
+    return similarities
+
+
+def mmr_select(relevance: Sequence[float], vectors: Sequence[Sequence[float]], k: int,
+               lambda_: float = 0.7) -> List[int]:
+    """
+    Maximal marginal relevance: greedily picks k candidates, each maximizing
+    lambda_ * relevance - (1 - lambda_) * (highest similarity to a picked candidate).
+
+    Parameters:
+    - relevance: Relevance of each candidate to the query, e.g. 1 - cosine distance.
+    - vectors: The candidates' embeddings.
+    - k: Number of candidates to pick.
+    - lambda_: 1 ranks by relevance only, 0 by diversity only.
+
+    Returns:
+    - The indexes of the picked candidates, in pick order.
+    """
+    n = len(relevance)
+    if n <= 1 or k <= 0:
+        return list(range(min(n, max(k, 0))))
+
+    relevance = np.asarray(relevance, dtype=np.float32)
+    similarities = _similarity_matrix(vectors)
+    closest_picked = np.full(n, -np.inf, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    picked = []
+
+    for _ in range(min(k, n)):
+        redundancy = np.where(np.isinf(closest_picked), 0.0, closest_picked)
+        scores = lambda_ * relevance - (1 - lambda_) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        picked.append(best)
+        available[best] = False
+        closest_picked = np.maximum(closest_picked, similarities[:, best])
+    return picked
+
+
+def _overlap(previous: str, following: str, max_chars: int) -> int:
+    """
+    Length of the longest suffix of previous that starts following, within the last max_chars.
+    """
+    probe = following[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+    start = previous.find(probe, max(0, len(previous) - max_chars))
+    while start != -1:
+        if following.startswith(previous[start:]):
+            return len(previous) - start
+        start = previous.find(probe, start + 1)
+    return 0
+
+
+def merge_adjacent(chunks, max_overlap_chars: int = 1000):
+    """
+    Merges chunks that are neighbours in the same document (same documentId,
+    consecutive chunkIndex) into one passage, dropping the text the chunker
+    repeated between them.
+
+    The merged chunk keeps the chunkId and chunkIndex of its first chunk, the
+    best (lowest) rerankScore and distance of its parts and lists every part in
+    mergedChunkIds. Chunks without a chunkIndex are kept as they are. The result
+    is ordered by rerankScore. The given chunks are not modified, merged passages
+    are copies.
+    """
+    by_document = {}
+    for chunk in chunks:
+        by_document.setdefault(chunk.documentId, []).append(chunk)
+
+    merged = []
+    for document_chunks in by_document.values():
+        document_chunks.sort(key=lambda chunk: (chunk.chunkIndex is None, chunk.chunkIndex or 0))
+        current = None
+        last_index = None
+        for chunk in document_chunks:
+            if (current is not None and chunk.chunkIndex is not None and last_index is not None
+                    and chunk.chunkIndex == last_index + 1):
+                overlap = _overlap(current.chunkText, chunk.chunkText, max_overlap_chars)
+                separator = "" if overlap else "\n"
+                current.chunkText = current.chunkText + separator + chunk.chunkText[overlap:]
+                current.mergedChunkIds.append(chunk.chunkId)
+                current.rerankScore = min(current.rerankScore, chunk.rerankScore)
+                if chunk.distance is not None:
+                    current.distance = min(current.distance, chunk.distance) \
+                        if current.distance is not None else chunk.distance
+            else:
+                current = copy.copy(chunk)
+                current.mergedChunkIds = [chunk.chunkId]
+                merged.append(current)
+            last_index = chunk.chunkIndex
+
+    for chunk in merged:
+        if len(chunk.mergedChunkIds) == 1:
+            chunk.mergedChunkIds = None
+    merged.sort(key=lambda chunk: chunk.rerankScore)
+    return merged
@@ -1,31 +1,31 @@
-import voyageai
 from typing import List
+from core.config import settings
 from core.db import settings as db_settings
-import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-api_key = os.getenv("VOYAGE_API_KEY")
-
-# Initialize Voyage client for external embedding (as specified in requirements)
-voyage = voyageai.Client(api_key=api_key)
+from services.embedding_coalescer import QueryEmbeddingCoalescer
+from services.voyage_client import voyage_client
 
 def get_embedding(model: str, texts: List[str], input_type: str = "query"):
     """
     Embeds a list of texts using Voyage AI.
+
+    Large inputs are split into token-bounded batches that are sent
+    concurrently and retried on rate limits (see services/voyage_client.py).
     
     Parameters:
     - model: The embedding model (default is "voyage-3-large").
     - texts: A list of strings to be embedded.
-    - input_type: The type of input ("query" or "passage").
+    - input_type: The type of input ("query" or "document").
 
     Returns:
-    - List of embeddings.
+    - List of embeddings, in the same order as texts.
     """
-    # As per requirements, we'll continue using Voyage for embeddings
-    result = voyage.embed(texts, model=model, input_type=input_type)
-    return result.embeddings
+    return voyage_client.embed_sync(texts, model, input_type)
+
+async def aget_embedding(model: str, texts: List[str], input_type: str = "query"):
+    """
+    Async variant of get_embedding for use in async routes.
+    """
+    return await voyage_client.embed(texts, model, input_type)
 
 def get_pgrag_embedding_for_passage(text: str):
     """
@@ -72,9 +72,57 @@ def get_pgrag_embedding_for_passage(text: str):
         if conn:
             conn.close()
 
+def get_pgrag_embeddings_for_queries(texts: List[str]):
+    """
+    Gets embeddings for several queries in a single pgRAG statement.
+    
+    Parameters:
+    - texts: The query texts to embed.
+    
+    Returns:
+    - The embedding vectors, in the same order as texts.
+    
+    Raises:
+    - ValueError: If the embedding generation fails.
+    """
+    import logging
+    logger = logging.getLogger(__name__)
+    
+    conn = db_settings.get_db_connection()
+    try:
+        cur = conn.cursor()
+        query = """
+        SELECT rag_bge_small_en_v15.embedding_for_query(t.q)
+        FROM unnest(%s::text[]) WITH ORDINALITY AS t(q, ord)
+        ORDER BY t.ord;
+        """
+        cur.execute(query, (list(texts),))
+        embeddings = [row[0] for row in cur.fetchall()]
+        
+        if len(embeddings) != len(texts) or not all(embeddings):
+            logger.warning("pgRAG returned empty embedding result")
+            raise ValueError("Failed to get query embedding from pgRAG")
+        return embeddings
+    except Exception as e:
+        logger.error(f"Error using pgRAG embedding: {str(e)}")
+        raise ValueError(f"pgRAG embedding failed: {str(e)}")
+    finally:
+        if conn:
+            conn.close()
+
+# Concurrent /search requests share one embedding statement
+query_coalescer = QueryEmbeddingCoalescer(
+    get_pgrag_embeddings_for_queries,
+    max_batch=settings.QUERY_EMBED_MAX_BATCH,
+    max_wait_ms=settings.QUERY_EMBED_MAX_WAIT_MS,
+)
+
 def get_pgrag_embedding_for_query(text: str):
     """
     Gets an embedding for a query using pgRAG's local embedding model.
+
+    Concurrent calls are coalesced into batched statements unless
+    QUERY_EMBED_COALESCE is disabled.
     
     Parameters:
     - text: The query text to embed.
@@ -82,6 +130,25 @@ def get_pgrag_embedding_for_query(text: str):
     Returns:
     - The embedding vector.
     
+    Raises:
+    - ValueError: If the embedding generation fails.
+    """
+    if settings.QUERY_EMBED_COALESCE:
+        return query_coalescer.embed(text)
+    return get_pgrag_embeddings_for_queries([text])[0]
+
+def get_pgrag_embeddings_for_passages(texts: List[str], batch_size: int = 64):
+    """
+    Gets embeddings for several passages, batch_size texts per pgRAG statement,
+    over a single connection.
+    
+    Parameters:
+    - texts: The passages to embed.
+    - batch_size: Number of passages embedded per statement.
+    
+    Returns:
+    - The embedding vectors, in the same order as texts.
+    
     Raises:
     - ValueError: If the embedding generation fails.
     """
@@ -91,25 +158,20 @@ def get_pgrag_embedding_for_query(text: str):
     conn = db_settings.get_db_connection()
     try:
         cur = conn.cursor()
+        query = """
+        SELECT rag_bge_small_en_v15.embedding_for_passage(t.p)
+        FROM unnest(%s::text[]) WITH ORDINALITY AS t(p, ord)
+        ORDER BY t.ord;
+        """
+        embeddings = []
+        for start in range(0, len(texts), batch_size):
+            cur.execute(query, (list(texts[start:start + batch_size]),))
+            embeddings.extend(row[0] for row in cur.fetchall())
         
-        # First check if the pgRAG extension is available
-        cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'rag_bge_small_en_v15';")
-        extension_exists = cur.fetchone() is not None
-        
-        if not extension_exists:
-            logger.warning("rag_bge_small_en_v15 extension is not installed")
-            raise ValueError("pgRAG embedding extension is not installed")
-        
-        # Try to generate the embedding
-        query = "SELECT rag_bge_small_en_v15.embedding_for_query(%s);"
-        cur.execute(query, (text,))
-        result = cur.fetchone()
-        
-        if result and result[0]:
-            return result[0]
-        else:
+        if len(embeddings) != len(texts) or not all(embeddings):
             logger.warning("pgRAG returned empty embedding result")
-            raise ValueError("Failed to get query embedding from pgRAG")
+            raise ValueError("Failed to get embedding from pgRAG")
+        return embeddings
     except Exception as e:
         logger.error(f"Error using pgRAG embedding: {str(e)}")
         raise ValueError(f"pgRAG embedding failed: {str(e)}")
@@ -117,6 +179,9 @@ def get_pgrag_embedding_for_query(text: str):
         if conn:
             conn.close()
 
+# model name of pgRAG's reranker, e.g. in rerank cache keys
+PGRAG_RERANK_MODEL = "jina-reranker-v1-tiny-en"
+
 def rerank_with_pgrag(query_text: str, passages: List[str]):
     """
     Reranks passages against a query using pgRAG's reranker.
@@ -128,19 +193,36 @@ def rerank_with_pgrag(query_text: str, passages: List[str]):
     Returns:
     - List of (passage, score) tuples sorted by score (best match first).
     """
+    results = list(zip(passages, rerank_distances_with_pgrag(query_text, passages)))
+    
+    # Sort by score (lower is better)
+    return sorted(results, key=lambda x: x[1])
+
+def rerank_distances_with_pgrag(query_text: str, passages: List[str]) -> List[float]:
+    """
+    Scores passages against a query with pgRAG's Jina reranker in a single statement.
+    
+    Parameters:
+    - query_text: The query text.
+    - passages: List of passages to score.
+    
+    Returns:
+    - The rerank distance of each passage (lower is better), in the same order as passages.
+    """
+    if not passages:
+        return []
     conn = db_settings.get_db_connection()
     try:
         cur = conn.cursor()
-        results = []
-        
-        for passage in passages:
-            sql_query = "SELECT rag_jina_reranker_v1_tiny_en.rerank_distance(%s, %s);"
-            cur.execute(sql_query, (query_text, passage))
-            score = cur.fetchone()[0]
-            results.append((passage, score))
-        
-        # Sort by score (lower is better)
-        return sorted(results, key=lambda x: x[1])
+        cur.execute(
+            """
+            SELECT rag_jina_reranker_v1_tiny_en.rerank_distance(%s, t.passage)
+            FROM unnest(%s::text[]) WITH ORDINALITY AS t(passage, ord)
+            ORDER BY t.ord;
+            """,
+            (query_text, list(passages))
+        )
+        return [row[0] for row in cur.fetchall()]
     finally:
         if conn:
             conn.close()
@@ -0,0 +1,105 @@
+import collections
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingQuery:
+    __slots__ = ("text", "event", "result", "error")
+
+    def __init__(self, text):
+        self.text = text
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class QueryEmbeddingCoalescer:
+    """
+    Collects concurrent single-text embedding requests into batches.
+
+    Callers block in embed() while a dispatcher thread groups queued texts into
+    one call of embed_batch (at most max_batch texts) and fans the results back.
+
+    A lone request on an idle server is dispatched immediately, so single
+    request latency is unchanged. The max_wait_ms window is only spent when
+    there is concurrent demand (several requests queued, or the previous batch
+    held more than one), and requests arriving while a batch is in flight are
+    naturally grouped into the next one.
+    """
+
+    def __init__(self, embed_batch, max_batch: int = 32, max_wait_ms: float = 3, max_concurrent_batches: int = 4):
+        self._embed_batch = embed_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_concurrent_batches = max_concurrent_batches
+        self._queue = collections.deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._executor = None
+        self._last_batch_size = 0
+        self.stats = {"requests": 0, "batches": 0, "texts_embedded": 0}
+
+    def _ensure_dispatcher(self):
+        if self._thread is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent_batches,
+                                                thread_name_prefix="query-embedding")
+            self._thread = threading.Thread(target=self._run, name="query-embedding-coalescer", daemon=True)
+            self._thread.start()
+
+    def embed(self, text: str):
+        """
+        Embeds one text, sharing the database call with concurrent callers.
+        Raises whatever embed_batch raised for the batch this text was in.
+        """
+        pending = _PendingQuery(text)
+        with self._cond:
+            self._ensure_dispatcher()
+            self._queue.append(pending)
+            self.stats["requests"] += 1
+            self._cond.notify()
+        pending.event.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+
+                if self.max_wait and (len(self._queue) > 1 or self._last_batch_size > 1):
+                    deadline = time.monotonic() + self.max_wait
+                    while len(self._queue) < self.max_batch:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+
+                batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+                self._last_batch_size = len(batch)
+
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        # Identical questions asked concurrently are embedded once
+        unique_texts = list(dict.fromkeys(pending.text for pending in batch))
+        try:
+            embeddings = self._embed_batch(unique_texts)
+            by_text = dict(zip(unique_texts, embeddings))
+            for pending in batch:
+                pending.result = by_text[pending.text]
+        except Exception as e:
+            logger.warning(f"Batched query embedding of {len(unique_texts)} texts failed: {e}")
+            for pending in batch:
+                pending.error = e
+        finally:
+            with self._cond:
+                self.stats["batches"] += 1
+                self.stats["texts_embedded"] += len(unique_texts)
+            for pending in batch:
+                pending.event.set()
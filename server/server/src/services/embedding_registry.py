@@ -0,0 +1,152 @@
+import logging
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class EmbeddingSpace:
+    """
+    A set of vectors that can be compared with each other: one model, one
+    dimension, one DocumentChunks column with its own HNSW index.
+
+    Corpora with compressed vector storage keep their vectors in half_column
+    (halfvec) instead, searched through a binary-quantized index (binary_index).
+    """
+    name: str
+    dimension: int
+    column: str
+    index: str
+    providers: Tuple[str, ...]
+    half_column: str
+    binary_index: str
+
+    def storage_column(self, storage: str = "full") -> str:
+        return self.half_column if storage == "compressed" else self.column
+
+    def storage_type(self, storage: str = "full") -> str:
+        return "halfvec" if storage == "compressed" else "vector"
+
+
+EMBEDDING_SPACES = {
+    "bge-small-en-v1.5": EmbeddingSpace(
+        name="bge-small-en-v1.5",
+        dimension=384,
+        column="embeddingData",
+        index="DocumentChunks_embedding_hnsw_idx",
+        providers=("pgrag", "local"),
+        half_column="embeddingHalf",
+        binary_index="DocumentChunks_embedding_bq_hnsw_idx",
+    ),
+    "voyage-3-large": EmbeddingSpace(
+        name="voyage-3-large",
+        dimension=1024,
+        column="embeddingVoyage3Large",
+        index="DocumentChunks_voyage3large_hnsw_idx",
+        providers=("voyage",),
+        half_column="embeddingVoyage3LargeHalf",
+        binary_index="DocumentChunks_voyage3large_bq_hnsw_idx",
+    ),
+}
+
+DEFAULT_EMBEDDING_MODEL = "bge-small-en-v1.5"
+
+# "full": vector column + HNSW index
+# "compressed": halfvec column + binary-quantized HNSW index, rescored exactly
+VECTOR_STORAGE_MODES = ("full", "compressed")
+
+
+def get_space(name: str = None) -> EmbeddingSpace:
+    """
+    Returns the embedding space for a model name (the default one if empty).
+
+    Raises:
+    - ValueError: If the model is not registered.
+    """
+    name = name or DEFAULT_EMBEDDING_MODEL
+    if name not in EMBEDDING_SPACES:
+        raise ValueError(f"Unknown embedding model '{name}'. Known models: {', '.join(EMBEDDING_SPACES)}")
+    return EMBEDDING_SPACES[name]
+
+
+def _providers(space: EmbeddingSpace):
+    # The configured provider goes first when it can produce this space
+    providers = list(space.providers)
+    if settings.EMBEDDING_PROVIDER in providers:
+        providers.remove(settings.EMBEDDING_PROVIDER)
+        providers.insert(0, settings.EMBEDDING_PROVIDER)
+    if "local" in providers and not settings.LOCAL_EMBEDDING_MODEL_DIR:
+        providers.remove("local")
+    return providers
+
+
+def _embed(space: EmbeddingSpace, provider: str, texts: List[str], input_type: str):
+    from services import embedding
+
+    # a single query goes through the coalescer, several are embedded in one batch
+    if provider == "pgrag":
+        if input_type == "query":
+            if len(texts) == 1:
+                return [embedding.get_pgrag_embedding_for_query(texts[0])]
+            return embedding.get_pgrag_embeddings_for_queries(texts)
+        return embedding.get_pgrag_embeddings_for_passages(texts)
+    if provider == "local":
+        from services.local_embedding import embed_local_query, get_local_embedder
+        if input_type == "query":
+            if len(texts) == 1:
+                return [embed_local_query(texts[0])]
+            return get_local_embedder().embed_queries(texts)
+        return get_local_embedder().embed_passages(texts)
+    if provider == "voyage":
+        return embedding.get_embedding(space.name, texts, input_type=input_type)
+    raise ValueError(f"Unknown embedding provider '{provider}'")
+
+
+def embed_in_space(space: EmbeddingSpace, texts: List[str], input_type: str = "document"):
+    """
+    Embeds texts with the first provider of the space that succeeds. Only
+    providers producing vectors in this space are tried, so a failure never
+    falls back to vectors of another model or dimension.
+
+    Parameters:
+    - space: The target embedding space.
+    - texts: The texts to embed.
+    - input_type: "query" or "document".
+
+    Returns:
+    - (embeddings, provider) with embeddings in the same order as texts.
+
+    Raises:
+    - ValueError: If every provider of the space failed.
+    """
+    errors = []
+    for provider in _providers(space):
+        try:
+            return _embed(space, provider, texts, input_type), provider
+        except Exception as e:
+            logger.warning(f"{provider} embedding for {space.name} failed: {e}")
+            errors.append(f"{provider}: {e}")
+    raise ValueError(f"All embedding providers for {space.name} failed ({'; '.join(errors)})")
+
+
+def vector_dimension(vector) -> int:
+    """
+    Returns the dimension of a vector given as a list or a pgvector literal.
+    """
+    if isinstance(vector, str):
+        body = vector.strip().strip("[]").strip()
+        return body.count(",") + 1 if body else 0
+    return len(vector)
+
+
+def check_storage(storage: str) -> str:
+    """
+    Raises:
+    - ValueError: If storage is not a known vector storage mode.
+    """
+    if storage not in VECTOR_STORAGE_MODES:
+        raise ValueError(f"Unknown vector storage '{storage}'. Must be one of: {', '.join(VECTOR_STORAGE_MODES)}")
+    return storage
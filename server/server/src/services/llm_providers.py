@@ -0,0 +1,265 @@
+import asyncio
+import json
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+import httpx
+
+from core.config import settings
+
+# mistralai is only needed when a route uses the Mistral backend
+try:
+    from mistralai import Mistral
+except ImportError:
+    Mistral = None
+
+PROVIDERS = ("mistral", "openai", "local")
+# the local stand-in ignores the model name
+_LOCAL_MODEL = "stand-in"
+
+
+class LLMError(RuntimeError):
+    """
+    The LLM call failed, after retrying when the error was transient.
+    """
+
+
+class LLMTimeoutError(LLMError):
+    """
+    The LLM call did not finish before its deadline.
+    """
+
+
+class LLMProviderError(LLMError):
+    """
+    The backend answered with an HTTP error.
+    """
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class LLMResponse:
+    text: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    raw: Any = None
+
+
+@dataclass(frozen=True)
+class LLMRoute:
+    """
+    The backend and model a call site sends its prompts to.
+    """
+    provider: str
+    model: str
+
+    def __str__(self):
+        return f"{self.provider}:{self.model}"
+
+
+def parse_route(value: str, default_model: str) -> LLMRoute:
+    """
+    Parses "provider:model", or "provider" alone for default_model (any name for "local").
+
+    Raises:
+    - ValueError: If the provider is unknown.
+    """
+    provider, _, model = value.strip().partition(":")
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider '{provider}'. Available providers: {', '.join(PROVIDERS)}")
+    return LLMRoute(provider, model.strip() or (_LOCAL_MODEL if provider == "local" else default_model))
+
+
+def parse_routes(routes: str, default_model: str) -> Dict[str, LLMRoute]:
+    """
+    Parses LLM_ROUTES, comma separated caller=provider:model pairs, e.g.
+    "search=mistral:mistral-large-latest,tagging=openai:qwen2.5-7b-instruct".
+
+    Raises:
+    - ValueError: If a pair or provider is malformed.
+    """
+    parsed = {}
+    for pair in (routes or "").split(","):
+        if not pair.strip():
+            continue
+        caller, separator, value = pair.partition("=")
+        if not separator or not caller.strip():
+            raise ValueError(f"Invalid LLM route '{pair.strip()}', expected caller=provider:model")
+        parsed[caller.strip()] = parse_route(value, default_model)
+    return parsed
+
+
+class LLMProvider:
+    """
+    A chat completion backend. Implementations are async and only called from
+    the background loop, through services.llm_services.LLMGateway.
+    """
+    name = None
+
+    async def complete(self, messages: List[dict], model: str) -> LLMResponse:
+        raise NotImplementedError
+
+
+class MistralProvider(LLMProvider):
+    name = "mistral"
+
+    def __init__(self, api_key: str = None):
+        self.api_key = api_key or settings.MISTRAL_API_KEY
+        self._client = None
+
+    def _ensure_client(self):
+        if self._client is None:
+            if Mistral is None:
+                raise LLMError("The mistralai package is not installed")
+            if not self.api_key:
+                raise LLMError("MISTRAL_API_KEY environment variable is not set")
+            self._client = Mistral(api_key=self.api_key)
+        return self._client
+
+    async def complete(self, messages: List[dict], model: str) -> LLMResponse:
+        response = await self._ensure_client().chat.complete_async(model=model, messages=messages)
+        usage = getattr(response, "usage", None)
+        return LLMResponse(
+            text=response.choices[0].message.content,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            raw=response,
+        )
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """
+    Any server speaking the OpenAI chat completions API: OpenAI itself, or a
+    local inference server (vLLM, llama.cpp, Ollama, TGI) at LLM_OPENAI_BASE_URL.
+    """
+    name = "openai"
+
+    def __init__(self, base_url: str = None, api_key: str = None):
+        self.base_url = base_url or settings.LLM_OPENAI_BASE_URL
+        self.api_key = api_key or settings.LLM_OPENAI_API_KEY
+        self._client = None
+
+    def _ensure_client(self):
+        if self._client is None:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            # no read timeout, the gateway enforces the call deadline
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, headers=headers, timeout=httpx.Timeout(None, connect=10.0)
+            )
+        return self._client
+
+    async def complete(self, messages: List[dict], model: str) -> LLMResponse:
+        response = await self._ensure_client().post("/chat/completions", json={"model": model, "messages": messages})
+        if response.status_code >= 400:
+            raise LLMProviderError(
+                f"{self.base_url} returned {response.status_code}: {response.text[:200]}", response.status_code
+            )
+        body = response.json()
+        usage = body.get("usage") or {}
+        return LLMResponse(
+            text=body["choices"][0]["message"]["content"],
+            prompt_tokens=usage.get("prompt_tokens") or 0,
+            completion_tokens=usage.get("completion_tokens") or 0,
+            raw=body,
+        )
+
+
+_WORD = re.compile(r"[A-Za-z][A-Za-z'-]+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+_STOPWORDS = frozenset(
+    "about after also and are because been but can could does each for from had has have into its more most "
+    "not only other over said should some such than that the their them then there these they this those "
+    "through very was were what when where which while will with would your".split()
+)
+_NOT_ENOUGH_CONTEXT = "Not enough context to provide information."
+
+
+def _split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence.strip()]
+
+
+class LocalProvider(LLMProvider):
+    """
+    Deterministic stand-in that needs no model or network, for tests and benchmarks.
+
+    It recognizes the prompts of this code base: auto-chunking gets the text split
+    at sentence ends into ~250 word chunks, tagging gets keyword metadata and any
+    other prompt an extractive answer, the context sentences sharing the most
+    words with the question. The same prompt always gets the same answer, after
+    latency_ms (LLM_LOCAL_LATENCY_MS) to simulate a remote model.
+    """
+    name = "local"
+
+    def __init__(self, latency_ms: float = None):
+        self.latency_ms = settings.LLM_LOCAL_LATENCY_MS if latency_ms is None else latency_ms
+
+    async def complete(self, messages: List[dict], model: str) -> LLMResponse:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        prompt = messages[-1]["content"]
+        if "Split the following text into chunks" in prompt:
+            text = self._chunks(prompt.rsplit("Text:", 1)[-1])
+        elif "main_topic" in prompt:
+            text = self._tags(prompt.split("TEXT:", 1)[-1].split("TASK:", 1)[0])
+        else:
+            text = self._answer(prompt)
+        prompt_words = sum(len(message["content"].split()) for message in messages)
+        return LLMResponse(text=text, prompt_tokens=prompt_words, completion_tokens=len(text.split()))
+
+    @staticmethod
+    def _chunks(text: str, chunk_words: int = 250) -> str:
+        chunks, current, words = [], [], 0
+        for sentence in _split_sentences(text):
+            current.append(sentence)
+            words += len(sentence.split())
+            if words >= chunk_words:
+                chunks.append(" ".join(current))
+                current, words = [], 0
+        if current:
+            chunks.append(" ".join(current))
+        return json.dumps([{"chunk_number": i + 1, "content": chunk} for i, chunk in enumerate(chunks)])
+
+    @staticmethod
+    def _tags(text: str) -> str:
+        words = [word.lower() for word in _WORD.findall(text)]
+        counts = Counter(word for word in words if len(word) > 3 and word not in _STOPWORDS)
+        keywords = [word for word, _ in sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:8]]
+        sentences = _split_sentences(text)
+        return json.dumps({
+            "main_topic": keywords[0] if keywords else "",
+            "keywords": keywords,
+            "key_points": sentences[:2],
+            "sentiment": "neutral",
+        })
+
+    @staticmethod
+    def _answer(prompt: str) -> str:
+        question = re.search(r"question:\s*(.+)", prompt, re.IGNORECASE)
+        data = re.search(r"data:\s*(.*?)(?:\n\s*If the data is not sufficient|\Z)", prompt, re.DOTALL)
+        if not question or not data:
+            return _NOT_ENOUGH_CONTEXT
+        question_words = {word.lower() for word in _WORD.findall(question.group(1))} - _STOPWORDS
+        scored = []
+        for i, sentence in enumerate(_split_sentences(data.group(1))):
+            overlap = len(question_words & {word.lower() for word in _WORD.findall(sentence)})
+            if overlap:
+                scored.append((-overlap, i, sentence))
+        if not scored:
+            return _NOT_ENOUGH_CONTEXT
+        best = sorted(sorted(scored)[:3], key=lambda item: item[1])
+        return " ".join(sentence for _, _, sentence in best)
+
+
+def create_provider(name: str) -> LLMProvider:
+    if name == "mistral":
+        return MistralProvider()
+    if name == "openai":
+        return OpenAICompatibleProvider()
+    if name == "local":
+        return LocalProvider()
+    raise ValueError(f"Unknown LLM provider '{name}'. Available providers: {', '.join(PROVIDERS)}")
@@ -1,131 +1,255 @@
-import os
-from dotenv import load_dotenv
+import asyncio
 import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+
+from core.async_bridge import run_sync
+from core.config import settings
+from services.llm_providers import LLMError, LLMRoute, LLMTimeoutError, create_provider, parse_route, parse_routes
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth another attempt: timeouts, rate limits and transient server errors
+_RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+# A call still unanswered after this quantile of its caller's recent latencies gets hedged
+_HEDGE_QUANTILE = 0.95
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (httpx.TransportError, ConnectionError)):
+        return True
+    return getattr(error, "status_code", None) in _RETRYABLE_STATUS
+
+
+def _quantile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _messages(prompt: str, context: str = None):
+    messages = []
+    if context:
+        messages.append({
+            "role": "system",
+            "content": f"You are a helpful assistant. Use the following context to answer the question: {context}"
+        })
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+class _CallerStats:
+    """
+    Usage and latency of one caller (search, tagging, auto-chunking...).
+    Only updated from the background loop.
+    """
+
+    def __init__(self, window: int):
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.route = None
+        # seconds taken by the last successful calls
+        self.latencies = deque(maxlen=window)
+
+    def hedge_delay(self, min_samples: int):
+        if len(self.latencies) < min_samples:
+            return None
+        return _quantile(self.latencies, _HEDGE_QUANTILE)
+
+    def summary(self):
+        latencies = list(self.latencies)
+        return {
+            "route": str(self.route) if self.route else None,
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "latency_p50_ms": round(_quantile(latencies, 0.5) * 1000, 1) if latencies else None,
+            "latency_p95_ms": round(_quantile(latencies, 0.95) * 1000, 1) if latencies else None,
+        }
+
+
+class LLMGateway:
+    """
+    Async LLM client shared by the whole process.
+
+    Each caller is routed to a backend and model (LLM_ROUTES, LLM_PROVIDER and
+    LLM_MODEL otherwise), e.g. a small fast model for tagging and a larger one
+    for answers.
+    Every call has a deadline and runs under a global in-flight limit. Idempotent
+    calls are retried with jittered exponential backoff on transient errors and,
+    when hedging is on, a second request is sent if the first one has not answered
+    by the caller's p95 latency; the first answer wins and the other is cancelled.
+    Usage and latency are recorded per caller. All calls run on the background
+    loop from core.async_bridge.
+    """
+
+    def __init__(self, default_route: str = None, routes: str = None, max_in_flight: int = None,
+                 timeout: float = None, max_retries: int = None, hedge: bool = None, hedge_min_samples: int = None,
+                 backoff_base: float = 0.5, backoff_cap: float = 8.0):
+        self.default_route = parse_route(default_route or settings.LLM_PROVIDER, settings.LLM_MODEL)
+        self.routes = parse_routes(settings.LLM_ROUTES if routes is None else routes, settings.LLM_MODEL)
+        self.max_in_flight = max_in_flight or settings.LLM_MAX_IN_FLIGHT
+        self.timeout = timeout or settings.LLM_TIMEOUT_SECONDS
+        self.max_retries = settings.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.hedge = settings.LLM_HEDGE if hedge is None else hedge
+        self.hedge_min_samples = hedge_min_samples or settings.LLM_HEDGE_MIN_SAMPLES
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._providers = {}
+        self._semaphore = None
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def route(self, caller: str, model: str = None) -> LLMRoute:
+        """
+        The backend and model of a caller, with model overriding the routed model.
+        """
+        route = self.routes.get(caller, self.default_route)
+        return LLMRoute(route.provider, model) if model else route
+
+    def _provider(self, name: str):
+        # Created lazily so the semaphore and HTTP clients live on the background loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        if name not in self._providers:
+            self._providers[name] = create_provider(name)
+        return self._providers[name]
+
+    def _caller_stats(self, caller: str) -> _CallerStats:
+        with self._stats_lock:
+            stats = self._stats.get(caller)
+            if stats is None:
+                stats = self._stats[caller] = _CallerStats(settings.LLM_LATENCY_WINDOW)
+            return stats
+
+    async def _request(self, messages, route: LLMRoute, stats: _CallerStats):
+        provider = self._provider(route.provider)
+        async with self._semaphore:
+            response = await provider.complete(messages, route.model)
+        stats.prompt_tokens += response.prompt_tokens
+        stats.completion_tokens += response.completion_tokens
+        return response
+
+    async def _attempt(self, messages, route: LLMRoute, stats: _CallerStats, hedge: bool):
+        """
+        One attempt, hedged by a second request once it is slower than the caller's p95.
+        """
+        tasks = [asyncio.ensure_future(self._request(messages, route, stats))]
+        try:
+            delay = stats.hedge_delay(self.hedge_min_samples) if hedge else None
+            if delay is None:
+                return await tasks[0]
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return tasks[0].result()
+
+            stats.hedges += 1
+            tasks.append(asyncio.ensure_future(self._request(messages, route, stats)))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is tasks[1]:
+                            stats.hedge_wins += 1
+                        return task.result()
+            # both requests failed, report the first one's error
+            return tasks[0].result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _complete(self, messages, caller: str, model: str = None, timeout: float = None,
+                        idempotent: bool = True):
+        route = self.route(caller, model)
+        stats = self._caller_stats(caller)
+        stats.calls += 1
+        stats.route = route
+        timeout = timeout or self.timeout
+        attempts = self.max_retries + 1 if idempotent else 1
+        start = time.perf_counter()
+
+        async def attempt_until_done():
+            for attempt in range(attempts):
+                try:
+                    return await self._attempt(messages, route, stats, hedge=self.hedge and idempotent)
+                except Exception as e:
+                    if attempt + 1 >= attempts or not _is_retryable(e):
+                        raise
+                    delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+                    logger.warning(f"LLM call from {caller} attempt {attempt + 1} failed ({e}), retrying in {delay:.2f}s")
+                    stats.retries += 1
+                    await asyncio.sleep(delay)
+
+        try:
+            response = await asyncio.wait_for(attempt_until_done(), timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            raise LLMTimeoutError(f"LLM call from {caller} did not finish within {timeout:g}s")
+        except LLMError:
+            stats.errors += 1
+            raise
+        except Exception as e:
+            stats.errors += 1
+            raise LLMError(f"LLM call from {caller} failed: {e}") from e
+
+        stats.latencies.append(time.perf_counter() - start)
+        return response
+
+    def usage(self):
+        """
+        Calls, failures, retries, hedges, tokens and latency percentiles per caller.
+        """
+        with self._stats_lock:
+            return {caller: stats.summary() for caller, stats in self._stats.items()}
+
+
+llm_gateway = LLMGateway()
 
-# from groq import Groq
-
-# load_dotenv()
-# api_key = os.getenv("GROQ_API_KEY")
-
-# if not api_key:
-#     raise ValueError("GROQ_API_KEY not found in environment")
-
-# def llm_service(prompt: str, model: str, context: str = None):
-#     try:
-#         client = Groq(api_key=api_key)
-#         prompt_template = f"{context}\nQuestion: {prompt}\nAnswer:" if context else prompt
-
-#         chat_completion = client.chat.completions.create(
-#             messages=[
-#                 {"role": "system", "content": "you are a helpful assistant."},
-#                 {"role": "user", "content": prompt_template}
-#             ],
-#             model="llama-3.3-70b-versatile",
-#         )
-
-#         result = chat_completion.choices[0].message.content
-#         return result if result else "LLM returned no content."
-
-#     except Exception as e:
-#         print(f"An error occurred in llm_service: {e}")
-#         import traceback
-#         traceback.print_exc()
-#         return "Sorry, I couldn’t process that request due to an internal error."
-
-
-# Comment out the previous implementation
-# from euriai import EuriaiClient
-# 
-# load_dotenv()
-# api_key = os.getenv("EURIAI_API_KEY")
-# 
-# if not api_key:
-#     raise ValueError("EURIAI_API_KEY not found in environment")
-# 
-# client = EuriaiClient(
-#     api_key=api_key,  # Replace with your actual API key
-#     model="gpt-4.1-mini"
-# )
-# 
-# def llm_service(
-#     prompt: str,
-#     model: str = "gpt-4.1-mini",
-#     context: str = None,
-#     return_full_response: bool = False  # << Add this flag
-# ):
-#     try:
-#         system_message = "You are a helpful assistant."
-#         if context:
-#             prompt_template = f"{system_message}\n\n{context}\n\nQuestion: {prompt}\nAnswer:"
-#         else:
-#             prompt_template = f"{system_message}\n\nQuestion: {prompt}\nAnswer:"
-# 
-#         response = client.generate_completion(
-#             prompt=prompt_template,
-#             temperature=0.7,
-#             max_tokens=300
-#         )
-# 
-#         # Optionally return full response
-#         if return_full_response:
-#             return json.dumps(response, indent=2)  # or just `response` if JSON-serializable
-#         else:
-#             return response["choices"][0]["message"]["content"]
-# 
-#     except Exception as e:
-#         print(f"An error occurred in llm_service: {e}")
-#         return None
-
-# New implementation using Mistral API
-from mistralai import Mistral
-
-load_dotenv()
-api_key = os.getenv("MISTRAL_API_KEY")
-
-if not api_key:
-    raise ValueError("MISTRAL_API_KEY environment variable is not set")
-
-# Default model according to Mistral documentation
-default_model = "mistral-large-latest"
-client = Mistral(api_key=api_key)
 
 def llm_service(
     prompt: str,
-    model: str = default_model,
+    model: str = None,
     context: str = None,
-    return_full_response: bool = False
+    return_full_response: bool = False,
+    caller: str = "default",
+    timeout: float = None
 ):
-    try:
-        # Prepare messages for the chat API
-        messages = []
-        
-        # Add system message if context is provided
-        if context:
-            messages.append({
-                "role": "system",
-                "content": f"You are a helpful assistant. Use the following context to answer the question: {context}"
-            })
-        
-        # Add user message
-        messages.append({
-            "role": "user",
-            "content": prompt
-        })
-        
-        # Call Mistral API
-        chat_response = client.chat.complete(
-            model=default_model,  # Use the default model
-            messages=messages
-        )
-        
-        # Return appropriate response based on flag
-        if return_full_response:
-            return json.dumps(chat_response, indent=2, default=str)
-        else:
-            return chat_response.choices[0].message.content
-            
-    except Exception as e:
-        print(f"An error occurred in llm_service: {e}")
-        import traceback
-        traceback.print_exc()
-        return "Sorry, I couldn't process that request due to an internal error."
+    """
+    Sends a prompt through the LLM gateway from sync code.
+
+    Parameters:
+    - prompt: The user message.
+    - model: Optional model overriding the caller's routed model (same backend).
+    - context: Optional context added as a system message.
+    - return_full_response: Return the whole response as JSON instead of the answer text.
+    - caller: The call site, which picks the route (LLM_ROUTES) and names the usage and
+      latency records, e.g. "search" or "tagging".
+    - timeout: Deadline of the call in seconds (default LLM_TIMEOUT_SECONDS).
+
+    Returns:
+    - The answer text.
+
+    Raises:
+    - LLMTimeoutError: If the call did not finish before its deadline.
+    - LLMError: If the call failed.
+    """
+    response = run_sync(llm_gateway._complete(_messages(prompt, context), caller, model, timeout))
+    if return_full_response:
+        return json.dumps(response.raw, indent=2, default=str)
+    return response.text
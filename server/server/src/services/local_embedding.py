@@ -0,0 +1,184 @@
+import logging
+import os
+import threading
+from typing import List
+
+from core.config import settings
+from services.embedding_coalescer import QueryEmbeddingCoalescer
+
+# onnxruntime and tokenizers are only needed when EMBEDDING_PROVIDER=local
+try:
+    import numpy as np
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
+except ImportError:
+    ort = None
+
+logger = logging.getLogger(__name__)
+
+# bge-small-en-v1.5 expects this instruction in front of retrieval queries
+BGE_QUERY_INSTRUCTION = "Represent this sentence for searching relevant passages: "
+BGE_DIMENSION = 384
+
+
+def quantized_model(model_path: str) -> str:
+    """
+    Path of a dynamically int8-quantized copy of an ONNX model, created on first use.
+    """
+    quantized_path = model_path.replace(".onnx", ".int8.onnx")
+    if not os.path.exists(quantized_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        logger.info(f"Quantizing {model_path} to int8")
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+    return quantized_path
+
+
+def load_onnx_model(model_dir: str, threads: int = 0, max_length: int = 512, quantize: bool = False):
+    """
+    Loads the tokenizer.json and model.onnx of model_dir for CPU inference.
+    Returns (tokenizer, session, input_names), the tokenizer truncating to
+    max_length tokens without padding.
+    """
+    if ort is None:
+        raise ValueError("Local ONNX models need the onnxruntime and tokenizers packages")
+
+    tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+    tokenizer.enable_truncation(max_length=max_length)
+    tokenizer.no_padding()
+
+    model_path = os.path.join(model_dir, "model.onnx")
+    if quantize:
+        model_path = quantized_model(model_path)
+
+    options = ort.SessionOptions()
+    if threads:
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+    logger.info(f"Loaded ONNX model {model_path} (threads={threads or 'auto'})")
+    return tokenizer, session, {i.name for i in session.get_inputs()}
+
+
+def length_batches(lengths: List[int], batch_size: int, max_batch_tokens: int):
+    """
+    Groups sequence indexes into batches of similar length: sorted by length,
+    at most batch_size sequences and max_batch_tokens padded tokens per batch,
+    so short sequences are not padded to the length of long ones.
+    """
+    batch = []
+    for index in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+        if batch and (len(batch) >= batch_size or lengths[index] * (len(batch) + 1) > max_batch_tokens):
+            yield batch
+            batch = []
+        batch.append(index)
+    if batch:
+        yield batch
+
+
+class LocalBgeEmbedder:
+    """
+    Runs bge-small-en-v1.5 in-process on CPU through ONNX Runtime.
+
+    Produces the same 384-d, L2-normalised CLS vectors as the
+    rag_bge_small_en_v15 extension, so they can be stored in and compared
+    with the existing vector(384) column.
+
+    Texts are sorted by length and grouped into batches of at most batch_size
+    texts and max_batch_tokens padded tokens, so short texts are not padded to
+    the length of long ones.
+
+    Parameters:
+    - model_dir: Directory holding model.onnx and tokenizer.json.
+    - threads: ONNX Runtime intra-op threads (0 lets ONNX Runtime decide).
+    - batch_size: Maximum number of texts per forward pass.
+    - max_length: Maximum sequence length in tokens (longer texts are truncated).
+    - quantize: Use a dynamically int8-quantized copy of the model.
+    """
+
+    def __init__(self, model_dir: str, threads: int = 0, batch_size: int = 32, max_length: int = 512,
+                 quantize: bool = False, max_batch_tokens: int = 16384):
+        if ort is None:
+            raise ValueError("Local embeddings need the onnxruntime and tokenizers packages")
+        if not model_dir or not os.path.isdir(model_dir):
+            raise ValueError(f"Local embedding model directory not found: {model_dir}")
+
+        self.batch_size = max(1, batch_size)
+        self.max_length = max_length
+        self.max_batch_tokens = max(max_batch_tokens, max_length)
+        self.tokenizer, self.session, self.input_names = load_onnx_model(model_dir, threads, max_length, quantize)
+
+    def _run(self, encodings):
+        width = max(len(e.ids) for e in encodings)
+        input_ids = np.zeros((len(encodings), width), dtype=np.int64)
+        attention_mask = np.zeros((len(encodings), width), dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            length = len(encoding.ids)
+            input_ids[row, :length] = encoding.ids
+            attention_mask[row, :length] = 1
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        hidden = self.session.run(None, feeds)[0]
+        cls = hidden[:, 0, :]
+        return cls / np.linalg.norm(cls, axis=1, keepdims=True).clip(min=1e-12)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds texts as-is. Returns lists of floats in input order.
+        """
+        if not texts:
+            return []
+        encodings = self.tokenizer.encode_batch(list(texts))
+        vectors = np.empty((len(texts), BGE_DIMENSION), dtype=np.float32)
+        lengths = [len(encoding.ids) for encoding in encodings]
+        for batch in length_batches(lengths, self.batch_size, self.max_batch_tokens):
+            vectors[batch] = self._run([encodings[i] for i in batch])
+        return vectors.tolist()
+
+    def embed_passages(self, texts: List[str]) -> List[List[float]]:
+        return self.embed(texts)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self.embed([BGE_QUERY_INSTRUCTION + text for text in texts])
+
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def get_local_embedder() -> LocalBgeEmbedder:
+    """
+    Returns the process wide embedder, loading the model on first use.
+    """
+    global _embedder
+    with _embedder_lock:
+        if _embedder is None:
+            _embedder = LocalBgeEmbedder(
+                settings.LOCAL_EMBEDDING_MODEL_DIR,
+                threads=settings.LOCAL_EMBEDDING_THREADS,
+                batch_size=settings.LOCAL_EMBEDDING_BATCH_SIZE,
+                quantize=settings.LOCAL_EMBEDDING_QUANTIZE,
+            )
+        return _embedder
+
+
+_query_coalescer = None
+
+
+def embed_local_query(text: str) -> List[float]:
+    """
+    Embeds one search query. Concurrent queries share one forward pass
+    through the same coalescer used for pgRAG query embeddings.
+    """
+    global _query_coalescer
+    with _embedder_lock:
+        if _query_coalescer is None:
+            _query_coalescer = QueryEmbeddingCoalescer(
+                lambda texts: get_local_embedder().embed_queries(texts),
+                max_batch=settings.QUERY_EMBED_MAX_BATCH,
+                max_wait_ms=settings.QUERY_EMBED_MAX_WAIT_MS,
+            )
+    return _query_coalescer.embed(text)
@@ -0,0 +1,122 @@
+import os
+import threading
+from typing import List
+
+import numpy as np
+
+from core.config import settings
+# ort is None when onnxruntime or tokenizers is missing, they are only needed for the local reranker
+from services.local_embedding import length_batches, load_onnx_model, ort
+
+
+class LocalCrossEncoder:
+    """
+    Runs a cross-encoder reranker (jina-reranker-v1-tiny-en or a similar
+    BERT-style model exported to ONNX with a single relevance logit) in-process
+    on CPU through ONNX Runtime.
+
+    Each (query, passage) pair is one sequence. All pairs of a call are scored
+    together: sorted by length and grouped into batches of at most batch_size
+    pairs and max_batch_tokens padded tokens, each padded to its own longest
+    pair only.
+
+    Parameters:
+    - model_dir: Directory holding model.onnx and tokenizer.json.
+    - threads: ONNX Runtime intra-op threads (0 lets ONNX Runtime decide).
+    - batch_size: Maximum number of pairs per forward pass.
+    - max_length: Maximum pair length in tokens (the longer side is truncated first).
+    - quantize: Use a dynamically int8-quantized copy of the model.
+    """
+
+    def __init__(self, model_dir: str, threads: int = 0, batch_size: int = 32, max_length: int = 512,
+                 quantize: bool = False, max_batch_tokens: int = 16384):
+        if ort is None:
+            raise ValueError("The local reranker needs the onnxruntime and tokenizers packages")
+        if not model_dir or not os.path.isdir(model_dir):
+            raise ValueError(f"Local reranker model directory not found: {model_dir}")
+
+        self.batch_size = max(1, batch_size)
+        self.max_length = max_length
+        self.max_batch_tokens = max(max_batch_tokens, max_length)
+        self.tokenizer, self.session, self.input_names = load_onnx_model(model_dir, threads, max_length, quantize)
+
+    def _run(self, encodings):
+        width = max(len(e.ids) for e in encodings)
+        input_ids = np.zeros((len(encodings), width), dtype=np.int64)
+        attention_mask = np.zeros((len(encodings), width), dtype=np.int64)
+        token_type_ids = np.zeros((len(encodings), width), dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            length = len(encoding.ids)
+            input_ids[row, :length] = encoding.ids
+            attention_mask[row, :length] = 1
+            token_type_ids[row, :length] = encoding.type_ids
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = token_type_ids
+
+        logits = self.session.run(None, feeds)[0]
+        return logits.reshape(len(encodings), -1)[:, 0]
+
+    def scores(self, query: str, passages: List[str]) -> List[float]:
+        """
+        Relevance of each passage to the query, the sigmoid of the model's logit
+        (higher is better), in input order.
+        """
+        if not passages:
+            return []
+        encodings = self.tokenizer.encode_batch([(query, passage) for passage in passages])
+        logits = np.empty(len(passages), dtype=np.float32)
+        lengths = [len(encoding.ids) for encoding in encodings]
+        for batch in length_batches(lengths, self.batch_size, self.max_batch_tokens):
+            logits[batch] = self._run([encodings[i] for i in batch])
+        return (1 / (1 + np.exp(-logits))).tolist()
+
+    def rerank_distances(self, query: str, passages: List[str]) -> List[float]:
+        """
+        Rerank distance of each passage (1 - relevance, lower is better), in input order.
+        """
+        return [1.0 - score for score in self.scores(query, passages)]
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_local_reranker() -> LocalCrossEncoder:
+    """
+    Returns the process wide reranker, loading the model on first use.
+    """
+    global _reranker
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = LocalCrossEncoder(
+                settings.LOCAL_RERANKER_MODEL_DIR,
+                threads=settings.LOCAL_RERANKER_THREADS,
+                batch_size=settings.LOCAL_RERANKER_BATCH_SIZE,
+                max_length=settings.LOCAL_RERANKER_MAX_LENGTH,
+                quantize=settings.LOCAL_RERANKER_QUANTIZE,
+            )
+        return _reranker
+
+
+def local_rerank_model() -> str:
+    """
+    Name of the local reranker model (its directory name), e.g. for rerank cache keys.
+    """
+    return "local:" + os.path.basename(os.path.normpath(settings.LOCAL_RERANKER_MODEL_DIR or "reranker"))
+
+
+def rerank_locally(query: str, documents: List[str], top_k: int = None, return_documents: bool = True):
+    """
+    Reranks documents with the local cross-encoder.
+
+    Returns:
+    - The top_k (all by default) {"index", "document", "relevance_score"} dicts, best first,
+      without "document" unless return_documents.
+    """
+    scores = get_local_reranker().scores(query, documents)
+    ranked = sorted(range(len(documents)), key=lambda i: -scores[i])[:top_k]
+    if return_documents:
+        return [{"index": i, "document": documents[i], "relevance_score": scores[i]} for i in ranked]
+    return [{"index": i, "relevance_score": scores[i]} for i in ranked]
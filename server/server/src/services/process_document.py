@@ -3,117 +3,35 @@ from services.chunking import chunking
 from controllers.document_chunk import create_document_chunk
 from controllers.corpora import create_corpus_data
 from controllers.documents import create_document_data
-from services.llm_services import llm_service
-from services.embedding import get_pgrag_embedding_for_passage
-import json
+from services.tagging import tag_document
+from services.embedding_registry import embed_in_space, get_space
+from concurrent.futures import ThreadPoolExecutor
 from psycopg2.extras import Json
 from fastapi import HTTPException
 from core.db import settings as db_settings
 
-def get_tag_prompt(text: str):
-     return f'''
-    SYSTEM MESSAGE:
-    "You are an expert AI text analyzer. Your job is to parse the given text and produce structured JSON metadata."
-
-    USER MESSAGE:
-
-    TEXT:
-    {text}
-
-    TASK:
-    Please analyze the above TEXT and return a structured JSON with these fields:
-
-    1) main_topic: A single string representing the overall topic or category of the text.
-    2) keywords: A list of short relevant keywords or key phrases.
-    3) named_entities:
-    - people: A list of any people mentioned.
-    - organizations: A list of any organizations mentioned.
-    - locations: A list of any places or geographic references.
-    - dates: A list of any specific dates or times referenced.
-    4) sentiment: The overall tone (e.g., positive, negative, neutral).
-    5) summary: A concise summary of the main point(s) from the text.
-    6) key_points: A list of the most important bullet-style points.
-    7) related_questions: Questions a reader might ask after reading.
-    8) more_info: Suggestions or resources that might provide additional context.
-    9) domain_specific: (Optional) Relevant domain(s) or subdomains (e.g., "Healthcare," "Finance," "Technology").
-
-    Return the response as valid JSON without any extra commentary or markdown. That is, only JSON, nothing else.
-
-
-    EXAMPLE OUTPUT JSON (data types only):
-    {{
-  "main_topic": "string",
-  "keywords": [
-    "string"
-  ],
-  "named_entities": {{
-    "people": ["string"],
-    "organizations": ["string"],
-    "locations": ["string"],
-    "dates": ["string"]
-  }},
-  "sentiment": "string",
-  "summary": "string",
-  "key_points": [
-    "string"
-  ],
-  "related_questions": [
-    "string"
-  ],
-  "more_info": [
-    "string"
-  ],
-  "domain_specific": [
-    "string"
-  ]
-}}
-Note: Important: Return only valid JSON and no extra text, commentary, or formatting. Return nothing else.
-'''
-
-
-def process_document(userId, file_type, document_bytes_or_url, corpus_key, file_name):
+def process_document(userId, file_type, document_bytes_or_url, corpus_key, file_name, chunk_type="manual", skip_tagging=False):
     try:
         # Extract text using pgRAG's text extraction capabilities
         extracted_text = extract_text(file_type, document_bytes_or_url)
         
-        # Generate document tags using LLM
-        prompt = get_tag_prompt(extracted_text)
-        raw_response = llm_service(prompt, model="gpt-4.1-mini", return_full_response=True)
-        if not raw_response:
-            print("LLM service returned empty response")
-            raise RuntimeError("Empty response from LLM service")
-
-        if isinstance(raw_response, dict) and raw_response.get("choices"):
-            content = raw_response["choices"][0]["message"].get("content", "")
-            cleaned = content.strip().strip('```').strip()
-            try:
-                document_tags = json.loads(cleaned)
-            except json.JSONDecodeError as e:
-                print(f"Failed to parse JSON from LLM content: {e}\n>>{cleaned}")
-                raise RuntimeError(f"Invalid JSON in LLM response: {cleaned}")
-        elif isinstance(raw_response, str):
-            # fallback if you ever get just a raw string
-            cleaned = raw_response.strip().strip('```').strip()
-            try:
-                document_tags = json.loads(cleaned)
-            except json.JSONDecodeError as e:
-                print(f"Failed to parse JSON: {e}")
-                raise RuntimeError(f"Invalid JSON response from LLM service: {cleaned}")
-        else:
-            raise RuntimeError(f"Unexpected LLM response format: {type(raw_response)}")
-
+        # Tag a sample of the document in the background while we chunk and embed
+        tagging_pool = ThreadPoolExecutor(max_workers=1)
+        tags_future = None if skip_tagging else tagging_pool.submit(tag_document, extracted_text)
+        tagging_pool.shutdown(wait=False)
 
         # Chunk text using pgRAG's chunking capabilities
         chunked_text = chunking({
             "text": extracted_text, 
-            "chunk_type": "manual", 
+            "chunk_type": chunk_type, 
             "chunk_size": 1000, 
-            "chunk_overlap": 100, 
-            "model": "llama-3.3-70b-versatile"
+            "chunk_overlap": 100
         })
         
         document_id = f"{file_type}|{file_name}"
         document_data = {}
+        embedding_model = None
+        vector_storage = "full"
         
         if userId and corpus_key:
             # Create or fetch corpus
@@ -129,6 +47,8 @@ def process_document(userId, file_type, document_bytes_or_url, corpus_key, file_
                 raise HTTPException(status_code=500, detail="CorpusId missing in corpus result")
 
             corpus_id = first_corpus["corpusId"]
+            embedding_model = first_corpus.get("embeddingModel")
+            vector_storage = first_corpus.get("vectorStorage", "full")
 
             # Create document
             document_data["userId"] = userId
@@ -144,22 +64,39 @@ def process_document(userId, file_type, document_bytes_or_url, corpus_key, file_
             if not document_result or not document_result.get("results"):
                 raise HTTPException(status_code=500, detail="Failed to create document")
 
-        # Process chunks and generate embeddings
-        chunks_results = []
+        # Chunks are embedded in the space of their corpus, in batches
+        space = get_space(embedding_model)
+        chunks_data = []
         for chunk in chunked_text:
             chunk_data = {}
             chunk_data["chunkIndex"] = chunk["chunk_number"]
             chunk_data["chunkText"] = chunk["content"]
             chunk_data["documentId"] = document_id
-            chunk_data["metaData"] = Json(document_tags)
-            
-            # Generate embedding using pgRAG
-            try:
-                embedding = get_pgrag_embedding_for_passage(chunk["content"])
+            chunk_data["embeddingModel"] = space.name
+            chunk_data["vectorStorage"] = vector_storage
+            chunks_data.append((chunk_data, chunk.get("metaData", {})))
+
+        try:
+            embeddings, _ = embed_in_space(space, [chunk_data["chunkText"] for chunk_data, _ in chunks_data])
+            for (chunk_data, _), embedding in zip(chunks_data, embeddings):
                 chunk_data["embeddingData"] = embedding
+        except Exception as e:
+            print(f"Failed to generate {space.name} embeddings: {e}")
+            # create_document_chunk retries each chunk on its own
+
+        # Tagging ran alongside chunking and embedding, collect it now
+        document_tags = {}
+        if tags_future is not None:
+            try:
+                document_tags = tags_future.result()
             except Exception as e:
-                print(f"Failed to generate embedding with pgRAG: {e}")
-                # Continue without embedding if it fails
+                print(f"Document tagging failed, storing chunks without tags: {e}")
+
+        # Store chunks
+        chunks_results = []
+        for chunk_data, chunk_metadata in chunks_data:
+            # Structured chunks carry their heading path on top of the document tags
+            chunk_data["metaData"] = Json({**document_tags, **chunk_metadata})
             
             result = create_document_chunk(chunk_data)
             if not result or not result.get("results"):
@@ -0,0 +1,123 @@
+import logging
+import threading
+import time
+
+from models.document_chunk import DocumentChunkModel
+from services.embedding_registry import embed_in_space, get_space
+
+logger = logging.getLogger(__name__)
+
+chunk_data = DocumentChunkModel()
+
+# corpusId -> status of the last re-embedding job of that corpus
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def get_reembedding_status(corpus_id):
+    """
+    Returns the status of the last re-embedding job of a corpus, or None.
+    """
+    with _jobs_lock:
+        job = _jobs.get(corpus_id)
+        return dict(job) if job else None
+
+
+def start_reembedding(corpus_id, target_model):
+    """
+    Registers a re-embedding job for a corpus. Returns the job status, or
+    raises ValueError if the model is unknown or a job is already running.
+    """
+    space = get_space(target_model)
+    with _jobs_lock:
+        job = _jobs.get(corpus_id)
+        if job and job["status"] == "running":
+            raise ValueError(f"A re-embedding job to {job['targetModel']} is already running for this corpus")
+        _jobs[corpus_id] = {
+            "corpusId": corpus_id,
+            "targetModel": space.name,
+            "status": "running",
+            "embedded": 0,
+            "passes": 0,
+            "startedAt": time.time(),
+            "finishedAt": None,
+            "error": None,
+        }
+        return dict(_jobs[corpus_id])
+
+
+def _update(corpus_id, **changes):
+    with _jobs_lock:
+        _jobs[corpus_id].update(changes)
+
+
+def _increment(corpus_id, counter, by=1):
+    with _jobs_lock:
+        _jobs[corpus_id][counter] += by
+
+
+def _backfill_pass(corpus_id, space, storage, batch_size, relabel):
+    """
+    Embeds every chunk of the corpus that has no vector in the target space
+    yet, walking the chunks in keyset order. With relabel, the chunks are
+    marked as belonging to the target model in the UPDATE storing their
+    vector. Returns the number embedded.
+    """
+    embedded = 0
+    after = None
+    while True:
+        rows = chunk_data.get_chunks_missing_embedding(corpus_id, space.storage_column(storage), after, batch_size)
+        if not rows:
+            return embedded
+        embeddings, _ = embed_in_space(space, [text for _, text in rows], "document")
+        chunk_data.set_chunk_embeddings(
+            space.storage_column(storage), space.name if relabel else None, space.dimension if relabel else None,
+            [(chunk_id, embedding) for (chunk_id, _), embedding in zip(rows, embeddings)],
+            vector_type=space.storage_type(storage)
+        )
+        embedded += len(rows)
+        after = rows[-1][0]
+        _increment(corpus_id, "embedded", len(rows))
+
+
+def run_reembedding(corpus_id, target_model, storage="full", batch_size=256, max_passes=5):
+    """
+    Moves a corpus to another embedding model without taking search offline.
+
+    While the target column is filled in, searches keep using the corpus's
+    current model. Once a pass finds nothing left to embed, the corpus is
+    switched to the target model and one last pass picks up chunks written
+    during the switch. Vectors of the old model are kept, so switching back
+    only needs another run. When max_passes all embed something (chunks keep
+    being written faster than they are embedded), the corpus stays on its
+    current model and the job ends as incomplete; running it again resumes.
+
+    storage is the vector storage of the corpus, which decides whether the
+    vector or the halfvec column of the target model is filled in.
+    """
+    space = get_space(target_model)
+    try:
+        for _ in range(max_passes):
+            embedded = _backfill_pass(corpus_id, space, storage, batch_size, relabel=False)
+            _increment(corpus_id, "passes")
+            if embedded == 0:
+                break
+        else:
+            pending = chunk_data.count_chunks_missing_embedding(corpus_id, space.storage_column(storage))
+            if pending:
+                error = (f"{pending} chunks still have no {space.name} vector after {max_passes} passes, "
+                         f"the corpus stays on its current model")
+                logger.warning(f"Re-embedding corpus {corpus_id} with {space.name} incomplete: {error}")
+                _update(corpus_id, status="incomplete", error=error, finishedAt=time.time())
+                return
+
+        # the backfilled chunks switch to the target model together with the corpus
+        chunk_data.switch_embedding_space(corpus_id, space.storage_column(storage), space.name, space.dimension)
+
+        # chunks created while the corpus was being switched still have the old model only
+        _backfill_pass(corpus_id, space, storage, batch_size, relabel=True)
+        _update(corpus_id, status="completed", finishedAt=time.time())
+        logger.info(f"Corpus {corpus_id} re-embedded with {space.name}")
+    except Exception as e:
+        logger.error(f"Re-embedding corpus {corpus_id} with {space.name} failed: {e}")
+        _update(corpus_id, status="failed", error=str(e), finishedAt=time.time())
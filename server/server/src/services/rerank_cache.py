@@ -0,0 +1,100 @@
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Callable, List, Sequence
+
+from core.config import settings
+
+
+def should_skip_rerank(distances: Sequence[float], min_gap: float = None) -> bool:
+    """
+    Confidence heuristic: the best candidate is already clearly ahead of the
+    runner-up (their distance gap is at least min_gap, default RERANK_SKIP_GAP),
+    so reranking is unlikely to change the answer. distances are in rank order,
+    lower is better. A gap of 0 disables skipping.
+    """
+    min_gap = settings.RERANK_SKIP_GAP if min_gap is None else min_gap
+    if min_gap <= 0 or len(distances) < 2:
+        return False
+    return distances[1] - distances[0] >= min_gap
+
+
+class RerankCache:
+    """
+    LRU cache of rerank scores keyed by (reranker model, query hash, chunkId).
+
+    The key also carries a checksum of the passage, so a chunk whose text was
+    edited (or a merged passage) is scored again instead of reusing a stale score.
+    Counters show how many rerank calls and scored pairs the cache and the skip
+    heuristic avoided.
+    """
+
+    def __init__(self, max_size: int = None):
+        self.max_size = settings.RERANK_CACHE_SIZE if max_size is None else max_size
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "requests": 0,
+            "skipped": 0,
+            "cached": 0,
+            "pairs": 0,
+            "pair_hits": 0,
+            "pairs_scored": 0,
+        }
+
+    @staticmethod
+    def _key(model: str, query_hash: str, chunk_id: str, passage: str):
+        return model, query_hash, chunk_id, zlib.crc32(passage.encode("utf-8"))
+
+    def record_skip(self):
+        with self._lock:
+            self._counters["requests"] += 1
+            self._counters["skipped"] += 1
+
+    def scores(self, model: str, query: str, chunk_ids: Sequence[str], passages: Sequence[str],
+               score: Callable[[List[str]], List[float]]) -> List[float]:
+        """
+        Returns the rerank score of each passage, in input order. Only the
+        passages missing from the cache are sent to score, in one call.
+        """
+        query_hash = hashlib.sha1(query.encode("utf-8")).hexdigest()
+        keys = [self._key(model, query_hash, chunk_id, passage) for chunk_id, passage in zip(chunk_ids, passages)]
+        results = [None] * len(keys)
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._scores:
+                    self._scores.move_to_end(key)
+                    results[i] = self._scores[key]
+        missing = [i for i, result in enumerate(results) if result is None]
+
+        if missing:
+            for i, value in zip(missing, score([passages[i] for i in missing])):
+                results[i] = value
+
+        with self._lock:
+            self._counters["requests"] += 1
+            self._counters["cached"] += 0 if missing else 1
+            self._counters["pairs"] += len(keys)
+            self._counters["pair_hits"] += len(keys) - len(missing)
+            self._counters["pairs_scored"] += len(missing)
+            if self.max_size > 0:
+                for i in missing:
+                    self._scores[keys[i]] = results[i]
+                    self._scores.move_to_end(keys[i])
+                while len(self._scores) > self.max_size:
+                    self._scores.popitem(last=False)
+        return results
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._scores)
+        counters["calls_avoided"] = counters["skipped"] + counters["cached"]
+        counters["pair_hit_rate"] = round(counters["pair_hits"] / counters["pairs"], 4) if counters["pairs"] else None
+        counters["size"] = size
+        counters["max_size"] = self.max_size
+        return counters
+
+
+rerank_cache = RerankCache()
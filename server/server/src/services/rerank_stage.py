@@ -0,0 +1,98 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from core.config import settings
+from services.embedding import PGRAG_RERANK_MODEL, rerank_distances_with_pgrag
+from services.local_reranker import get_local_reranker, local_rerank_model
+from services.reranker import VOYAGE_RERANK_MODEL, rerank_distances_with_voyage
+from services.rerank_cache import rerank_cache, should_skip_rerank
+
+logger = logging.getLogger(__name__)
+
+# reranker -> model name used in rerank cache keys
+RERANK_MODELS = {
+    "pgrag": PGRAG_RERANK_MODEL,
+    "voyage": VOYAGE_RERANK_MODEL,
+    "local": local_rerank_model(),
+}
+RERANKERS = tuple(RERANK_MODELS)
+
+# Rerank calls run here so a slow reranker can be abandoned at the latency
+# budget; an abandoned call still finishes and fills the score cache.
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rerank")
+
+
+def default_reranker() -> str:
+    """
+    The reranker used when a request asks for reranking without naming one.
+    """
+    return settings.SEARCH_RERANKER if settings.SEARCH_RERANKER in RERANKERS else "pgrag"
+
+
+def _score(reranker: str, question: str):
+    if reranker == "pgrag":
+        return lambda passages: rerank_distances_with_pgrag(question, passages)
+    if reranker == "local":
+        return lambda passages: get_local_reranker().rerank_distances(question, passages)
+    return lambda passages: rerank_distances_with_voyage(question, passages)
+
+
+def _chunk_key(chunk) -> str:
+    return ",".join(chunk.mergedChunkIds or [chunk.chunkId])
+
+
+def rerank_candidates(question, chunks, top_k, reranker, budget_ms=None, stats=None):
+    """
+    Reranks candidate chunks and keeps the best top_k.
+
+    chunks are in vector rank order with rerankScore holding their vector
+    distance. Scores come from the rerank cache where possible, reranking is
+    skipped when the top candidate is clearly ahead, and abandoned when it
+    takes longer than budget_ms (default RERANK_BUDGET_MS, 0 waits forever) or
+    fails; the vector order is kept in those cases. Reranked chunks get their
+    rerank distance (lower is better) as rerankScore.
+
+    stats receives the reranker, rerank_ms and rerank_skipped,
+    rerank_timed_out or rerank_error when the vector order was kept.
+
+    Returns (the top_k chunks, whether they were reranked).
+
+    Raises:
+    - ValueError: If the reranker is unknown.
+    """
+    if reranker not in RERANKERS:
+        raise ValueError(f"Unknown reranker '{reranker}'. Available rerankers: {', '.join(RERANKERS)}")
+    stats = {} if stats is None else stats
+    budget_ms = settings.RERANK_BUDGET_MS if budget_ms is None else budget_ms
+    if not chunks:
+        return chunks, False
+
+    started = time.perf_counter()
+    stats["reranker"] = reranker
+    reranked = False
+    if should_skip_rerank([chunk.rerankScore for chunk in chunks]):
+        rerank_cache.record_skip()
+        stats["rerank_skipped"] = True
+    else:
+        future = _executor.submit(
+            rerank_cache.scores, RERANK_MODELS[reranker], question,
+            [_chunk_key(chunk) for chunk in chunks], [chunk.chunkText for chunk in chunks],
+            _score(reranker, question)
+        )
+        try:
+            scores = future.result(timeout=budget_ms / 1000 if budget_ms > 0 else None)
+        except FutureTimeoutError:
+            logger.warning(f"{reranker} rerank of {len(chunks)} chunks exceeded its {budget_ms:g} ms budget")
+            stats["rerank_timed_out"] = True
+        except Exception as e:
+            logger.warning(f"{reranker} rerank failed, keeping the vector order: {e}")
+            stats["rerank_error"] = str(e)
+        else:
+            for chunk, score in zip(chunks, scores):
+                chunk.rerankScore = score
+            chunks = sorted(chunks, key=lambda chunk: chunk.rerankScore)
+            reranked = True
+    stats["rerank_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return chunks[:top_k], reranked
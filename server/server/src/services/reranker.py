@@ -1,33 +1,49 @@
-import voyageai
 from typing import List
-from dotenv import load_dotenv
-import os
+from services.local_reranker import rerank_locally
+from services.voyage_client import voyage_client
 
-# from core.config import settings
+VOYAGE_RERANK_MODEL = "rerank-2"
+# model name that selects the in-process cross-encoder (services/local_reranker.py)
+LOCAL_RERANK_MODEL = "local"
 
-# voyage = voyageai.Client(api_key=settings.VOYAGE_API_KEY)
 
-load_dotenv()
-api_key = os.getenv("VOYAGE_API_KEY")
-
-voyage = voyageai.Client(api_key=api_key)
-
-def re_rank(query: str, documents: List[str], model: str = "rerank-2", top_k: int = 3):
+def re_rank(query: str, documents: List[str], model: str = "rerank-2", top_k: int = 3,
+            return_documents: bool = True):
     """
-    Reranks a list of documents based on their relevance to a given query using Voyage AI.
+    Reranks a list of documents based on their relevance to a given query.
+
+    Voyage requests go through the shared async client: documents are truncated
+    to the model's context and large lists split into parallel sub-requests
+    whose scores are merged into one ranking.
 
     Parameters:
     - query: The query string.
     - documents: A list of document strings to be reranked.
-    - model: The reranking model (default is "rerank-2").
-    - top_k: The number of top documents to return (default is 3).
+    - model: The reranking model (default is "rerank-2"), "local" for the local cross-encoder.
+    - top_k: The number of top documents to return (default is 3, None for all).
+    - return_documents: Include each document's text, false returns indexes and scores only.
 
     Returns:
-    - A list of reranked documents with their relevance scores.
+    - A list of {"index", "document", "relevance_score"} dicts, best first.
     """
-    # print("gggg",query, documents)
-    reranking = voyage.rerank(query, documents, model=model, top_k=top_k)
-    return reranking.results[:top_k]
+    if model == LOCAL_RERANK_MODEL:
+        return rerank_locally(query, documents, top_k, return_documents)
+    ranked = voyage_client.rerank_sync(query, documents, model, top_k)
+    if return_documents:
+        return [{"index": i, "document": documents[i], "relevance_score": score} for i, score in ranked]
+    return [{"index": i, "relevance_score": score} for i, score in ranked]
 
 
-# print(re_rank("fruits", ["apple","orange", "carrot", "nail"]))
\ No newline at end of file
+def rerank_distances_with_voyage(query: str, passages: List[str], model: str = VOYAGE_RERANK_MODEL) -> List[float]:
+    """
+    Scores passages against a query with a Voyage reranker.
+
+    Returns:
+    - The rerank distance of each passage (1 - relevance score, lower is better), in the same order as passages.
+    """
+    if not passages:
+        return []
+    distances = [1.0] * len(passages)
+    for index, score in voyage_client.rerank_sync(query, list(passages), model):
+        distances[index] = 1.0 - score
+    return distances
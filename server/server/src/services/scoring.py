@@ -0,0 +1,101 @@
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from core.config import settings
+
+# How the found chunks become the similarity scores shown to users and used to filter:
+# - raw: 1 - the chunk's cosine distance (chunk.distance), the cosine similarity
+# - minmax: the chunk's ranking distance (rerankScore: the rerank distance when
+#   reranked, else the corpus-weighted cosine distance) rescaled between the best
+#   and worst chunk of the search to 0.95..0.1 (0.95 for all when the distances
+#   are equal, 1.0, 0.9, ... by position when they are within 0.001 of each other)
+# - calibrated: a logistic curve of the cosine distance, 0.5 at
+#   SEARCH_CALIBRATION_MIDPOINT; reranker scales differ, so raw and calibrated
+#   always use the cosine distance, which keeps them comparable across searches
+#   of one embedding model whichever reranker ran
+SCORING_POLICIES = ("raw", "minmax", "calibrated")
+
+
+def score_distances(distances: np.ndarray, policy: str) -> np.ndarray:
+    """
+    Turns distances in rank order into similarity scores (higher is better).
+
+    Raises:
+    - ValueError: If the policy is unknown.
+    """
+    if policy == "raw":
+        return np.clip(1.0 - distances, 0.0, 1.0)
+    if policy == "minmax":
+        low, high = distances.min(), distances.max()
+        if high == low:
+            return np.full(len(distances), 0.95)
+        if high - low < 0.001:
+            return np.maximum(0.1, 1.0 - 0.1 * np.arange(len(distances)))
+        return np.clip(1.0 - (distances - low) / (high - low), 0.1, 0.95)
+    if policy == "calibrated":
+        scale = max(settings.SEARCH_CALIBRATION_SCALE, 1e-6)
+        return 1.0 / (1.0 + np.exp((distances - settings.SEARCH_CALIBRATION_MIDPOINT) / scale))
+    raise ValueError(f"Unknown scoring policy '{policy}'. Available policies: {', '.join(SCORING_POLICIES)}")
+
+
+class ScoredChunks:
+    """
+    The texts and scores of a search's chunks in rank order, with the scores
+    in one NumPy array instead of a tuple per chunk.
+    """
+    __slots__ = ("texts", "scores")
+
+    def __init__(self, texts: List[str], scores: np.ndarray):
+        self.texts = texts
+        self.scores = scores
+
+    @classmethod
+    def from_chunks(cls, chunks: Sequence, policy: str = None) -> "ScoredChunks":
+        """
+        Scores chunks (with chunkText, rerankScore and distance) by policy
+        (default SEARCH_SCORING). minmax orders them by score, ties keeping
+        their search order; raw and calibrated keep the search order, which
+        may come from a reranker rather than the cosine distance they score.
+        Chunks without the distance the policy scores (None or NaN) are left out.
+        """
+        policy = policy or settings.SEARCH_SCORING
+        if policy not in SCORING_POLICIES:
+            raise ValueError(f"Unknown scoring policy '{policy}'. Available policies: {', '.join(SCORING_POLICIES)}")
+        field = "rerankScore" if policy == "minmax" else "distance"
+        distances = np.array(
+            [np.nan if getattr(chunk, field) is None else getattr(chunk, field) for chunk in chunks],
+            dtype=np.float64
+        )
+        valid = ~np.isnan(distances)
+        if not valid.all():
+            chunks = [chunk for chunk, keep in zip(chunks, valid) if keep]
+            distances = distances[valid]
+        if not len(chunks):
+            return cls([], np.empty(0))
+        scores = score_distances(distances, policy)
+        if policy != "minmax":
+            return cls([chunk.chunkText for chunk in chunks], scores)
+        order = np.argsort(-scores, kind="stable")
+        return cls([chunks[i].chunkText for i in order], scores[order])
+
+    def __len__(self):
+        return len(self.texts)
+
+    def filter(self, min_score: float = None, min_chunks: int = None) -> "ScoredChunks":
+        """
+        Keeps the chunks scoring at least min_score (default SEARCH_MIN_SCORE), or
+        the first min_chunks (default SEARCH_MIN_CHUNKS) when fewer pass.
+        """
+        min_score = settings.SEARCH_MIN_SCORE if min_score is None else min_score
+        min_chunks = settings.SEARCH_MIN_CHUNKS if min_chunks is None else min_chunks
+        keep = self.scores >= min_score
+        if np.count_nonzero(keep) < min(min_chunks, len(self)):
+            return ScoredChunks(self.texts[:min_chunks], self.scores[:min_chunks])
+        return ScoredChunks([text for text, kept in zip(self.texts, keep) if kept], self.scores[keep])
+
+    def tuples(self) -> List[Tuple[int, str, float]]:
+        """
+        (rank, text, score) tuples, rank starting at 1, as services.context_builder expects.
+        """
+        return list(zip(range(1, len(self) + 1), self.texts, self.scores.tolist()))
@@ -0,0 +1,225 @@
+from services.llm_services import llm_service
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from core.config import settings
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fields whose list values are unioned across sections
+_LIST_FIELDS = ["keywords", "key_points", "related_questions", "more_info", "domain_specific"]
+_ENTITY_FIELDS = ["people", "organizations", "locations", "dates"]
+_MAX_LIST_ITEMS = 25
+
+
+def get_tag_prompt(text: str):
+     return f'''
+    SYSTEM MESSAGE:
+    "You are an expert AI text analyzer. Your job is to parse the given text and produce structured JSON metadata."
+
+    USER MESSAGE:
+
+    TEXT:
+    {text}
+
+    TASK:
+    Please analyze the above TEXT and return a structured JSON with these fields:
+
+    1) main_topic: A single string representing the overall topic or category of the text.
+    2) keywords: A list of short relevant keywords or key phrases.
+    3) named_entities:
+    - people: A list of any people mentioned.
+    - organizations: A list of any organizations mentioned.
+    - locations: A list of any places or geographic references.
+    - dates: A list of any specific dates or times referenced.
+    4) sentiment: The overall tone (e.g., positive, negative, neutral).
+    5) summary: A concise summary of the main point(s) from the text.
+    6) key_points: A list of the most important bullet-style points.
+    7) related_questions: Questions a reader might ask after reading.
+    8) more_info: Suggestions or resources that might provide additional context.
+    9) domain_specific: (Optional) Relevant domain(s) or subdomains (e.g., "Healthcare," "Finance," "Technology").
+
+    Return the response as valid JSON without any extra commentary or markdown. That is, only JSON, nothing else.
+
+
+    EXAMPLE OUTPUT JSON (data types only):
+    {{
+  "main_topic": "string",
+  "keywords": [
+    "string"
+  ],
+  "named_entities": {{
+    "people": ["string"],
+    "organizations": ["string"],
+    "locations": ["string"],
+    "dates": ["string"]
+  }},
+  "sentiment": "string",
+  "summary": "string",
+  "key_points": [
+    "string"
+  ],
+  "related_questions": [
+    "string"
+  ],
+  "more_info": [
+    "string"
+  ],
+  "domain_specific": [
+    "string"
+  ]
+}}
+Note: Important: Return only valid JSON and no extra text, commentary, or formatting. Return nothing else.
+'''
+
+
+def split_sections(text: str, section_chars: int):
+    """
+    Packs the paragraphs of a text into sections of at most section_chars
+    characters. Paragraphs longer than that are cut.
+    """
+    sections = []
+    current = ""
+    for paragraph in text.split("\n\n"):
+        paragraph = paragraph.strip()[:section_chars]
+        if not paragraph:
+            continue
+        if current and len(current) + 2 + len(paragraph) > section_chars:
+            sections.append(current)
+            current = paragraph
+        else:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        sections.append(current)
+    return sections
+
+
+def sample_sections(sections, max_sections: int):
+    """
+    Picks at most max_sections sections spread evenly over the document,
+    always keeping the first and the last one.
+    """
+    if len(sections) <= max_sections:
+        return list(sections)
+    if max_sections == 1:
+        return [sections[0]]
+    step = (len(sections) - 1) / (max_sections - 1)
+    return [sections[round(i * step)] for i in range(max_sections)]
+
+
+def _parse_tags(response: str):
+    cleaned = response.strip().strip('`').strip()
+    if cleaned.startswith("json"):
+        cleaned = cleaned[4:].strip()
+    tags = json.loads(cleaned)
+    if not isinstance(tags, dict):
+        raise ValueError(f"Expected a JSON object, got {type(tags).__name__}")
+    return tags
+
+
+def tag_section(section: str, model: str = None):
+    """
+    Tags a single section with the LLM and returns the parsed metadata.
+    """
+    response = llm_service(get_tag_prompt(section), model, caller="tagging")
+    if not response:
+        raise RuntimeError("Empty response from LLM service")
+    return _parse_tags(response)
+
+
+def _unique(values, limit=_MAX_LIST_ITEMS):
+    seen = set()
+    result = []
+    for value in values:
+        key = value.strip().lower() if isinstance(value, str) else json.dumps(value, sort_keys=True)
+        if key and key not in seen:
+            seen.add(key)
+            result.append(value)
+        if len(result) >= limit:
+            break
+    return result
+
+
+def merge_tags(section_tags):
+    """
+    Merges the metadata of several sections into one document level record:
+    the most common topic and sentiment win, lists and entities are unioned.
+    """
+    if not section_tags:
+        return {}
+
+    merged = {}
+    topics = [t.get("main_topic") for t in section_tags if isinstance(t.get("main_topic"), str)]
+    if topics:
+        merged["main_topic"] = Counter(topics).most_common(1)[0][0]
+
+    sentiments = [t.get("sentiment") for t in section_tags if isinstance(t.get("sentiment"), str)]
+    if sentiments:
+        merged["sentiment"] = Counter(s.lower() for s in sentiments).most_common(1)[0][0]
+
+    summaries = [t.get("summary") for t in section_tags if isinstance(t.get("summary"), str)]
+    if summaries:
+        merged["summary"] = " ".join(summaries[:3])
+
+    for field in _LIST_FIELDS:
+        values = []
+        for tags in section_tags:
+            value = tags.get(field)
+            if isinstance(value, list):
+                values.extend(value)
+            elif isinstance(value, str):
+                values.append(value)
+        merged[field] = _unique(values)
+
+    entities = {}
+    for field in _ENTITY_FIELDS:
+        values = []
+        for tags in section_tags:
+            named = tags.get("named_entities")
+            if isinstance(named, dict) and isinstance(named.get(field), list):
+                values.extend(named[field])
+        entities[field] = _unique(values)
+    merged["named_entities"] = entities
+
+    return merged
+
+
+def tag_document(text: str, model: str = None, max_sections: int = None, section_chars: int = None, concurrency: int = None):
+    """
+    Tags a document from a bounded sample of its sections.
+
+    The sampled sections are sent to the LLM concurrently (at most `concurrency`
+    calls in flight) and their results merged. A failing section is logged and
+    skipped, so one bad call never aborts the ingestion.
+
+    Parameters:
+    - text: The full document text.
+    - model: Optional LLM model override.
+    - max_sections: Maximum number of sections sent to the LLM.
+    - section_chars: Maximum size of a section in characters.
+    - concurrency: Maximum number of concurrent LLM calls.
+
+    Returns:
+    - The merged metadata dictionary (empty if every call failed).
+    """
+    max_sections = max_sections or settings.TAGGING_MAX_SECTIONS
+    section_chars = section_chars or settings.TAGGING_SECTION_CHARS
+    concurrency = concurrency or settings.TAGGING_CONCURRENCY
+
+    sections = sample_sections(split_sections(text or "", section_chars), max_sections)
+    if not sections:
+        return {}
+
+    def safe_tag(section):
+        try:
+            return tag_section(section, model)
+        except Exception as e:
+            logger.warning(f"Tagging a section failed: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(sections)))) as executor:
+        results = [tags for tags in executor.map(safe_tag, sections) if tags]
+
+    logger.info(f"Tagged {len(results)} of {len(sections)} sampled sections")
+    return merge_tags(results)
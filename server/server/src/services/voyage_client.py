@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import random
+from typing import List
+
+import voyageai
+from voyageai import error as voyage_error
+
+from core.async_bridge import run_async, run_sync
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Per-request token limits from the Voyage documentation
+_EMBED_TOKEN_LIMITS = {
+    "voyage-3.5-lite": 1_000_000,
+    "voyage-3-lite": 1_000_000,
+    "voyage-3.5": 320_000,
+    "voyage-3": 320_000,
+    "voyage-3-large": 120_000,
+    "voyage-code-3": 120_000,
+    "voyage-finance-2": 120_000,
+    "voyage-law-2": 120_000,
+}
+_DEFAULT_EMBED_TOKEN_LIMIT = 120_000
+_MAX_EMBED_BATCH_SIZE = 1000
+
+# Rerank limits from the Voyage documentation: tokens of the query plus one
+# document, and per request (query tokens x documents + document tokens)
+_RERANK_CONTEXT_LIMITS = {
+    "rerank-2.5": 32_000,
+    "rerank-2.5-lite": 32_000,
+    "rerank-2": 16_000,
+    "rerank-2-lite": 8_000,
+    "rerank-1": 8_000,
+    "rerank-lite-1": 4_000,
+}
+_DEFAULT_RERANK_CONTEXT_LIMIT = 4_000
+_RERANK_TOKEN_LIMITS = {
+    "rerank-2.5": 600_000,
+    "rerank-2.5-lite": 600_000,
+    "rerank-2": 600_000,
+    "rerank-2-lite": 600_000,
+}
+_DEFAULT_RERANK_TOKEN_LIMIT = 300_000
+_MAX_RERANK_BATCH_SIZE = 1000
+# documents keep at least this many tokens, however long the query
+_MIN_RERANK_DOCUMENT_TOKENS = 64
+
+_RETRYABLE_ERRORS = (
+    voyage_error.RateLimitError,
+    voyage_error.ServiceUnavailableError,
+    voyage_error.ServerError,
+    voyage_error.Timeout,
+    voyage_error.APIConnectionError,
+    voyage_error.TryAgain,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap upper bound of the token count of a text. Voyage tokenizers average
+    about four characters per token on English text, three keeps us safe.
+    """
+    return len(text) // 3 + 1
+
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """
+    Cuts a text to at most max_tokens estimated tokens.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    return text[:max(0, (max_tokens - 1) * 3)]
+
+
+def make_batches(texts: List[str], max_tokens: int, max_size: int, overhead_tokens: int = 0):
+    """
+    Groups texts into consecutive batches that stay under max_tokens estimated
+    tokens and max_size texts, each text also costing overhead_tokens (e.g. the
+    query, which a rerank request counts once per document). Returns lists of
+    indexes into texts.
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+    for index, text in enumerate(texts):
+        tokens = estimate_tokens(text) + overhead_tokens
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_size):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+class VoyageClient:
+    """
+    Async Voyage client shared by the whole process.
+
+    Requests are split into batches that respect Voyage's per-request limits
+    (rerank documents are also truncated to the model's context),
+    sent concurrently with at most max_in_flight requests open, and retried
+    with jittered exponential backoff on rate limits and transient errors.
+    All calls run on the background loop from core.async_bridge.
+    """
+
+    def __init__(self, api_key: str = None, max_in_flight: int = None, max_retries: int = None,
+                 batch_size: int = None, rerank_batch_size: int = None,
+                 backoff_base: float = 0.5, backoff_cap: float = 20.0):
+        self.api_key = api_key or settings.VOYAGE_API_KEY
+        self.max_in_flight = max_in_flight or settings.VOYAGE_MAX_IN_FLIGHT
+        self.max_retries = settings.VOYAGE_MAX_RETRIES if max_retries is None else max_retries
+        self.batch_size = min(batch_size or settings.VOYAGE_EMBED_BATCH_SIZE, _MAX_EMBED_BATCH_SIZE)
+        self.rerank_batch_size = min(rerank_batch_size or settings.VOYAGE_RERANK_BATCH_SIZE, _MAX_RERANK_BATCH_SIZE)
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._client = None
+        self._semaphore = None
+
+    def _ensure_client(self):
+        # Created lazily so both live on the background loop
+        if self._client is None:
+            self._client = voyageai.AsyncClient(api_key=self.api_key, max_retries=0)
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._client
+
+    async def _call(self, operation: str, func, *args, **kwargs):
+        """
+        Calls func under the in-flight limit, retrying retryable errors with
+        full-jitter exponential backoff. The slot is released while sleeping.
+        """
+        self._ensure_client()
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    return await func(*args, **kwargs)
+            except _RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    logger.error(f"Voyage {operation} failed after {attempt + 1} attempts: {e}")
+                    raise
+                delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+                logger.warning(f"Voyage {operation} attempt {attempt + 1} failed ({e}), retrying in {delay:.2f}s")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _embed(self, texts: List[str], model: str, input_type: str = None):
+        client = self._ensure_client()
+        if not texts:
+            return []
+
+        max_tokens = _EMBED_TOKEN_LIMITS.get(model, _DEFAULT_EMBED_TOKEN_LIMIT)
+        batches = make_batches(texts, max_tokens, self.batch_size)
+
+        async def embed_batch(indexes):
+            result = await self._call(
+                "embed", client.embed, [texts[i] for i in indexes], model=model, input_type=input_type
+            )
+            return result.embeddings
+
+        results = await asyncio.gather(*(embed_batch(indexes) for indexes in batches))
+
+        # Put every embedding back at the position of its text
+        embeddings = [None] * len(texts)
+        for indexes, batch_embeddings in zip(batches, results):
+            for index, embedding in zip(indexes, batch_embeddings):
+                embeddings[index] = embedding
+        return embeddings
+
+    async def embed(self, texts: List[str], model: str, input_type: str = None):
+        """
+        Embeds texts from async code. Returns embeddings in input order.
+        """
+        return await run_async(self._embed(texts, model, input_type))
+
+    def embed_sync(self, texts: List[str], model: str, input_type: str = None):
+        """
+        Embeds texts from sync code. Returns embeddings in input order.
+        """
+        return run_sync(self._embed(texts, model, input_type))
+
+    async def _rerank(self, query: str, documents: List[str], model: str, top_k: int = None):
+        client = self._ensure_client()
+        if not documents:
+            return []
+
+        # Documents are cut so query + document fits the model's context, and
+        # sent in sub-requests under the per-request token limit
+        query_tokens = estimate_tokens(query)
+        context_limit = _RERANK_CONTEXT_LIMITS.get(model, _DEFAULT_RERANK_CONTEXT_LIMIT)
+        document_tokens = max(_MIN_RERANK_DOCUMENT_TOKENS, context_limit - query_tokens)
+        truncated = [truncate_text(document, document_tokens) for document in documents]
+        max_tokens = _RERANK_TOKEN_LIMITS.get(model, _DEFAULT_RERANK_TOKEN_LIMIT)
+        batches = make_batches(truncated, max_tokens, self.rerank_batch_size, overhead_tokens=query_tokens)
+
+        async def rerank_batch(indexes):
+            # each sub-request only needs to return its own top_k, the global top_k is among them
+            result = await self._call(
+                "rerank", client.rerank, query, [truncated[i] for i in indexes], model=model,
+                top_k=min(top_k, len(indexes)) if top_k else None, truncation=True
+            )
+            return [(indexes[r.index], r.relevance_score) for r in result.results]
+
+        results = await asyncio.gather(*(rerank_batch(indexes) for indexes in batches))
+
+        # Scores of one model are comparable across requests, merge them into one ranking
+        ranked = sorted((pair for batch in results for pair in batch), key=lambda pair: -pair[1])
+        return ranked[:top_k] if top_k else ranked
+
+    async def rerank(self, query: str, documents: List[str], model: str, top_k: int = None):
+        """
+        Reranks documents from async code. Returns (document index, relevance
+        score) pairs, best first, top_k of them (all by default).
+        """
+        return await run_async(self._rerank(query, documents, model, top_k))
+
+    def rerank_sync(self, query: str, documents: List[str], model: str, top_k: int = None):
+        """
+        Reranks documents from sync code. Returns (document index, relevance
+        score) pairs, best first, top_k of them (all by default).
+        """
+        return run_sync(self._rerank(query, documents, model, top_k))
+
+
+voyage_client = VoyageClient()